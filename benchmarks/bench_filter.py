@@ -0,0 +1,74 @@
+"""Benchmark keyword filtering: per-keyword regex searches vs. one compiled matcher vs. the token index.
+
+Usage:
+    python benchmarks/bench_filter.py [--classes 1000] [--preset dogs]
+"""
+import argparse
+import random
+import re
+import time
+
+from parseimagenet.helpers.filtering import fuzzy_match_wnids, match_wnids
+from parseimagenet.helpers.synset import SynsetTokenIndex, SynsetTrigramIndex
+from parseimagenet.keywords import KEYWORD_PRESETS
+
+
+def synthetic_synset_mapping(num_classes, seed=0):
+    """Build WordNet-like names mixing preset keywords with filler words."""
+    rng = random.Random(seed)
+    keywords = [keyword for preset in KEYWORD_PRESETS.values() for keyword in preset]
+    filler = ["red", "small", "great", "American", "European", "common", "crested", "spotted",
+              "striped", "tree", "ship", "house", "beetle", "shark", "lizard", "spider", "moth"]
+    mapping = {}
+    for i in range(num_classes):
+        names = [" ".join(rng.choice(filler + keywords) for _ in range(rng.randint(1, 3)))
+                 for _ in range(rng.randint(1, 4))]
+        mapping[f"n{i:08d}"] = ", ".join(names)
+    return mapping
+
+
+def per_keyword_search(synset_mapping, search_keywords):
+    """The previous implementation: one re.search per keyword per class."""
+    return [
+        wnid for wnid, category_name in synset_mapping.items()
+        if any(re.search(rf'\b{re.escape(keyword)}\b', category_name, re.IGNORECASE) for keyword in search_keywords)
+    ]
+
+
+def best_of(func, repeats, *args):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--classes', type=int, default=1000)
+    parser.add_argument('--preset', default='dogs', choices=list(KEYWORD_PRESETS))
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    synset_mapping = synthetic_synset_mapping(args.classes)
+    keywords = KEYWORD_PRESETS[args.preset]
+    print(f"{args.classes} classes, {len(keywords)} keywords ({args.preset})")
+
+    before, expected = best_of(per_keyword_search, args.repeats, synset_mapping, keywords)
+    after, result = best_of(match_wnids, args.repeats, synset_mapping, keywords)
+    assert result == expected
+    build, token_index = best_of(SynsetTokenIndex, 1, synset_mapping)
+    indexed, result = best_of(match_wnids, args.repeats, synset_mapping, keywords, token_index)
+    assert result == expected
+    print(f"per-keyword re.search  {before * 1000:8.2f} ms")
+    print(f"compiled matcher       {after * 1000:8.2f} ms  ({before / after:.1f}x)")
+    print(f"token index lookup     {indexed * 1000:8.2f} ms  ({before / indexed:.1f}x, built once in {build * 1000:.1f} ms)")
+
+    build, trigram_index = best_of(SynsetTrigramIndex, 1, synset_mapping)
+    fuzzy, result = best_of(fuzzy_match_wnids, args.repeats, trigram_index, keywords)
+    print(f"fuzzy trigram lookup   {fuzzy * 1000:8.2f} ms  ({len(result)} classes, built once in {build * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark serial vs. multi-process parsing of a synthetic train_cls.txt.
+
+Besides wall-clock times, the work of one parse is split into what the
+workers run in parallel (parsing byte ranges) and what stays serial
+(pickling the range results and merging them), which gives the speedup to
+expect on a machine with at least `workers` free cores even when the
+benchmark itself runs on fewer.
+
+Usage:
+    python benchmarks/bench_parse.py [--lines 1281167] [--workers 2 4 8]
+"""
+import argparse
+import os
+import pickle
+import tempfile
+import time
+from pathlib import Path
+
+from parseimagenet.helpers.annotations import _chunk_ranges, _parse_train_range, parse_train_annotations
+from parseimagenet.helpers.category_index import CategoryIndexBuilder
+
+
+def write_synthetic_train_cls(path, num_lines, num_classes=1000):
+    """Write a sorted train_cls.txt with num_lines entries spread over num_classes WNIDs."""
+    per_class, remainder = divmod(num_lines, num_classes)
+    line_number = 1
+    with open(path, 'w') as f:
+        for c in range(num_classes):
+            wnid = f"n{1440764 + c:08d}"
+            for i in range(per_class + (c < remainder)):
+                f.write(f"{wnid}/{wnid}_{i} {line_number}\n")
+                line_number += 1
+
+
+def time_parse(annotations_file, workers, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        index = parse_train_annotations(annotations_file, workers=workers)
+        best = min(best, time.perf_counter() - start)
+    return best, index
+
+
+def projected_parse(annotations_file, workers):
+    """Return (parallel_seconds, serial_seconds) of a workers-process parse, timed in this process."""
+    ranges = _chunk_ranges(annotations_file, workers)
+    parallel = 0.0
+    serial = 0.0
+    builder = CategoryIndexBuilder()
+    for start, stop in ranges:
+        begin = time.perf_counter()
+        blocks = _parse_train_range(str(annotations_file), start, stop)
+        parallel += time.perf_counter() - begin
+        begin = time.perf_counter()
+        for block in pickle.loads(pickle.dumps(blocks)):
+            builder.add_encoded_block(*block)
+        serial += time.perf_counter() - begin
+    begin = time.perf_counter()
+    builder.build()
+    serial += time.perf_counter() - begin
+    return parallel / min(workers, len(ranges)), serial
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=1281167)
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        annotations_file = Path(tmp) / "train_cls.txt"
+        write_synthetic_train_cls(annotations_file, args.lines)
+        print(f"{args.lines} lines, {annotations_file.stat().st_size / 1e6:.1f} MB, {os.cpu_count()} CPUs")
+
+        serial, reference = time_parse(annotations_file, None, args.repeats)
+        print(f"serial     {serial:7.3f}s")
+        for workers in args.workers:
+            elapsed, index = time_parse(annotations_file, workers, args.repeats)
+            assert index == reference and list(index) == list(reference)
+            parallel, merge = projected_parse(annotations_file, workers)
+            print(f"workers={workers:<3} {elapsed:7.3f}s  ({serial / elapsed:.2f}x)   "
+                  f"projected on {workers} cores: {parallel:.3f}s parallel + {merge:.3f}s merge "
+                  f"({serial / (parallel + merge):.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark image path resolution: per-image glob vs. the directory-listing cache.
+
+Usage:
+    python benchmarks/bench_resolve.py [--dirs 20] [--files 1300] [--samples 20000]
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from parseimagenet.helpers.listing import DirectoryListingCache
+from parseimagenet.helpers.sampling import resolve_image_paths
+
+
+def glob_resolve(stems, data_path):
+    """The previous implementation: one glob (directory scan) per image."""
+    paths = []
+    for stem in stems:
+        stem_path = data_path / stem
+        matches = list(stem_path.parent.glob(f"{stem_path.name}.*"))
+        paths.append(matches[0] if matches else stem_path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dirs', type=int, default=20)
+    parser.add_argument('--files', type=int, default=1300)
+    parser.add_argument('--samples', type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = Path(tmp)
+        stems = []
+        for d in range(args.dirs):
+            wnid = f"n{d:08d}"
+            (data_path / wnid).mkdir()
+            for i in range(args.files):
+                (data_path / wnid / f"{wnid}_{i}.JPEG").touch()
+                stems.append(f"{wnid}/{wnid}_{i}")
+        selected = random.Random(0).sample(stems, min(args.samples, len(stems)))
+        print(f"{args.dirs} directories x {args.files} files, resolving {len(selected)} stems")
+
+        start = time.perf_counter()
+        expected = glob_resolve(selected, data_path)
+        before = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = resolve_image_paths(selected, data_path)
+        after = time.perf_counter() - start
+        assert result == expected
+
+        listings = DirectoryListingCache()
+        listings.verify_extension(data_path)
+        start = time.perf_counter()
+        result = resolve_image_paths(selected, data_path, listings, assume_extension=True)
+        fast = time.perf_counter() - start
+        assert result == expected
+
+    print(f"per-image glob         {before * 1000:9.1f} ms")
+    print(f"directory listings     {after * 1000:9.1f} ms  ({before / after:.0f}x)")
+    print(f"verified extension     {fast * 1000:9.1f} ms  ({before / fast:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Benchmark disjoint split generation: shuffling a list of ids vs. split_ids().
+
+Usage:
+    python benchmarks/bench_split.py [--classes 1000] [--per_class 1281]
+"""
+import argparse
+import random
+import time
+
+from parseimagenet.helpers.splits import split_ids
+
+
+def shuffle_split(total, ratios, rng):
+    """Shuffle every id and cut the permutation into sorted parts."""
+    ids = list(range(total))
+    rng.shuffle(ids)
+    parts, start = [], 0
+    for ratio in ratios:
+        stop = start + round(ratio * total)
+        parts.append(sorted(ids[start:stop]))
+        start = stop
+    return parts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--classes', type=int, default=1000)
+    parser.add_argument('--per_class', type=int, default=1281)
+    args = parser.parse_args()
+
+    counts = [args.per_class] * args.classes
+    total = sum(counts)
+    print(f"{args.classes} classes x {args.per_class} images = {total} ids")
+
+    start = time.perf_counter()
+    shuffle_split(total, [0.8, 0.1, 0.1], random.Random(0))
+    before = time.perf_counter() - start
+    print(f"shuffle + sort           {before * 1000:9.1f} ms")
+
+    for label, weights, stratified in [
+        ("split 80/10/10", [0.8, 0.1, 0.1], False),
+        ("split 80/10/10 strat.", [0.8, 0.1, 0.1], True),
+        ("5 folds", [1] * 5, False),
+        ("5 folds stratified", [1] * 5, True),
+    ]:
+        start = time.perf_counter()
+        parts = split_ids(counts, weights, random.Random(0), stratified)
+        elapsed = time.perf_counter() - start
+        assert sum(map(len, parts)) == total
+        print(f"{label:24s} {elapsed * 1000:9.1f} ms  ({before / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,18 @@
 from pathlib import Path
 import argparse
 
-from .keywords import KEYWORD_PRESETS, get_available_presets
-from .helpers.validation import validate_params
-from .helpers.paths import resolve_paths
-from .helpers.annotations import parse_annotations
-from .helpers.filtering import filter_categories
-from .helpers.sampling import collect_and_sample, count_existing
-from .helpers.synset import get_synset_mapping
-from .utils import print_filter_results
-
-def get_image_paths_by_keywords(base_path, preset=None, keywords=None, num_images=200, source="train", silent=True):
+from .keywords import get_available_presets
+from .session import ImageNetSession
+
+# Most recently used sessions, keyed by (resolved base_path, use_cache, workers)
+_SESSIONS = {}
+_MAX_SESSIONS = 8
+
+def get_image_paths_by_keywords(base_path, preset=None, keywords=None, num_images=200, source="train", silent=True,
+                                use_cache=True, workers=None, box_filter=None, with_boxes=False, hypernyms=None,
+                                hierarchy_file=None, fuzzy=False, strategy="uniform", per_class=None, min_per_class=0,
+                                stream=False, seed=None, rng=None, verify=False, rank=None, world_size=None,
+                                class_weights=None, replacement=False):
     """
     Extract file paths for images matching specified keywords.
 
@@ -23,47 +25,163 @@ def get_image_paths_by_keywords(base_path, preset=None, keywords=None, num_image
         num_images: Number of random images to extract (default: 200)
         source: Which data split to use, "train" or "val" (default: "train")
         silent: If True, suppress all print output (default: True)
+        use_cache: If True, load annotations from a compiled on-disk index that is
+                   rebuilt automatically when the source files change (default: True)
+        workers: Number of processes used to parse train_cls.txt when the compiled
+                 index has to be (re)built (default: None, serial)
+        box_filter: Optional dict of bounding-box conditions an image must satisfy,
+                    read from LOC_<source>_solution.csv. Keys: min_boxes, max_boxes,
+                    min_area, max_area, cooccur (list of WNIDs) (default: None)
+        with_boxes: If True, return (path, boxes) pairs where boxes is a list of
+                    (wnid, xmin, ymin, xmax, ymax) tuples (default: False)
+        hypernyms: Optional list of WordNet ancestor WNIDs, e.g. ["n01503061"] for every
+                   bird. Classes under any of them are selected in addition to keyword
+                   matches, or on their own when no preset/keywords are given (default: None)
+        hierarchy_file: Path to the WordNet is-a file of "parent child" lines
+                        (default: <base_path>/wordnet.is_a.txt)
+        fuzzy: If True, also match category names whose trigram similarity to a keyword
+               is at least 0.4, catching typos and spelling variants. Pass a float in
+               (0, 1] to set the threshold (default: False)
+        strategy: How images are drawn (default: "uniform"):
+                  "uniform" samples num_images from all matching images pooled together,
+                  "stratified" gives every matching class an equal share of num_images,
+                  "proportional" splits num_images by class size. Quota a short class
+                  cannot fill is redistributed to the other classes.
+        per_class: Images per class for the stratified strategies, or all of a class's
+                   images if it has fewer; replaces num_images (default: None)
+        min_per_class: Minimum images per class for the stratified strategies, even if
+                       the total then exceeds num_images (default: 0)
+        stream: If True, sample straight from the annotation file with a reservoir instead
+                of loading the index, keeping memory at O(num_images) (default: False)
+        seed: Seed for a private random.Random used for this call only, leaving the
+              global random state untouched (default: None)
+        rng: A random.Random to sample with instead of seed (default: None). Without
+             seed or rng the module-level random functions are used, so random.seed()
+             still makes results reproducible
+        verify: If True, check that the selected files exist and replace missing ones
+                with other images from the same pool (streamed queries only drop
+                them) (default: False)
+        rank: Index of this worker when world_size workers share one sample
+              (default: None)
+        world_size: Number of workers sharing the sample. With a shared seed, each
+                    worker gets a disjoint, equally sized shard of the same global
+                    sample of num_images, computed without coordination
+                    (default: None)
+        class_weights: Dict mapping WNID to a relative class weight (classes not in it
+                       weigh 1.0), or a callable (wnid, class_size) -> weight such as
+                       lambda wnid, n: n ** 0.5 to damp large classes. Each image is drawn
+                       by picking a class in proportion to its weight, then an image of
+                       that class uniformly.
+                       Only with strategy="uniform" (default: None)
+        replacement: With class_weights, draw with replacement so images can repeat and
+                     num_images is always reached (default: False)
 
     Returns:
         List of Path objects to the selected images
     """
-    # VALIDATE PARAMS: keywords, preset, source
-    search_keywords = validate_params(preset, keywords, KEYWORD_PRESETS, source)
-
-    # RESOLVE PATHS: annotations_file, data_path
-    annotations_file, data_path = resolve_paths(base_path, source)
-
-    # GET SYNSET MAPPING: wnid -> category names
-    synset_mapping = get_synset_mapping(base_path)
-    if not silent:
-        print(f"Loaded {len(synset_mapping)} possible categories\n")
-
-    # PARSE ANNOTATIONS: category_images
-    category_images = parse_annotations(annotations_file, base_path, source)
-    if not silent:
-        print(f"Found {len(category_images)} unique categories\n")
-
-    # FILTER CATEGORIES: matching_wnids
-    matching_wnids = filter_categories(synset_mapping, category_images, search_keywords)
-    if not silent:
-        print_filter_results(search_keywords, matching_wnids, synset_mapping, category_images)
-
-    # COLLECT AND SAMPLE IMAGES: selected_paths, total_available
-    selected_paths, total_available = collect_and_sample(category_images, matching_wnids, num_images, data_path)
-    if not silent:
-        print(f"Total matching images available: {total_available}")
-
-    # COUNT EXISTING FILES: existing
-    if selected_paths:
-        if not silent:
-            existing = count_existing(selected_paths)
-            print(f"\nSelected {len(selected_paths)} images")
-            print(f"Verified {existing}/{len(selected_paths)} files exist on disk\n")
-        return selected_paths
-    else:
-        if not silent:
-            print("\nNo matching images found!\n")
-        return []
+    session = get_session(base_path, use_cache=use_cache, workers=workers)
+    return session.query(preset=preset, keywords=keywords, num_images=num_images, source=source, silent=silent,
+                         box_filter=box_filter, with_boxes=with_boxes, hypernyms=hypernyms,
+                         hierarchy_file=hierarchy_file, fuzzy=fuzzy, strategy=strategy, per_class=per_class,
+                         min_per_class=min_per_class, stream=stream, seed=seed, rng=rng,
+                         verify=verify, rank=rank, world_size=world_size, class_weights=class_weights,
+                         replacement=replacement)
+
+
+def iter_image_paths(base_path, preset=None, keywords=None, num_images=200, source="train", batch_size=None,
+                     use_cache=True, workers=None, box_filter=None, with_boxes=False, hypernyms=None,
+                     hierarchy_file=None, fuzzy=False, strategy="uniform", per_class=None, min_per_class=0,
+                     stream=False, seed=None, rng=None, rank=None, world_size=None, class_weights=None,
+                     replacement=False):
+    """
+    Yield image paths matching specified keywords as soon as each batch is resolved.
+
+    Takes the same arguments as get_image_paths_by_keywords() except silent and
+    verify, and selects the same images in the same order for the same seed.
+
+    Args:
+        batch_size: If given, yield lists of up to batch_size paths instead of
+                    single paths (default: None)
+
+    Returns:
+        Generator of Path objects, or of lists of them when batch_size is given
+    """
+    session = get_session(base_path, use_cache=use_cache, workers=workers)
+    return session.iter_query(preset=preset, keywords=keywords, num_images=num_images, source=source,
+                              batch_size=batch_size, box_filter=box_filter, with_boxes=with_boxes,
+                              hypernyms=hypernyms, hierarchy_file=hierarchy_file, fuzzy=fuzzy, strategy=strategy,
+                              per_class=per_class, min_per_class=min_per_class, stream=stream, seed=seed, rng=rng,
+                              rank=rank, world_size=world_size, class_weights=class_weights,
+                              replacement=replacement)
+
+
+def get_image_paths_batch(base_path, queries, max_workers=None, use_cache=True, workers=None, seed=None, rng=None):
+    """
+    Extract file paths for many keyword sets in one pass over the dataset.
+
+    Args:
+        base_path: Path to ImageNet-Subset directory
+        queries: Dict mapping a name to a dict of get_image_paths_by_keywords() arguments
+                 (preset, keywords, num_images, source, box_filter, with_boxes, hypernyms,
+                 hierarchy_file, fuzzy, strategy, per_class, min_per_class, seed), or a list of
+                 such dicts keyed by position
+        max_workers: Number of threads used to sample and resolve image paths (default: None, serial)
+        use_cache: If True, load annotations from the compiled on-disk index (default: True)
+        workers: Number of processes used to parse train_cls.txt when the compiled
+                 index has to be (re)built (default: None, serial)
+        seed: Seed from which every query derives its own generator, keyed by the
+              query name, so results do not depend on thread scheduling (default: None)
+        rng: A random.Random to derive the per-query generators from instead of seed
+             (default: None)
+
+    Returns:
+        Dict mapping each query name to its list of Path objects
+    """
+    session = get_session(base_path, use_cache=use_cache, workers=workers)
+    return session.query_batch(queries, max_workers=max_workers, seed=seed, rng=rng)
+
+
+def get_selection(base_path, preset=None, keywords=None, source="train", use_cache=True, workers=None,
+                  box_filter=None, hypernyms=None, hierarchy_file=None, fuzzy=False):
+    """
+    Return every image matching the given filters as a Selection of integer image ids.
+
+    Takes the same filtering arguments as get_image_paths_by_keywords(). Use
+    Selection.split() or Selection.kfold() to carve disjoint subsets and
+    Selection.paths() to resolve an id array to files.
+
+    Returns:
+        Selection over the matching images
+    """
+    session = get_session(base_path, use_cache=use_cache, workers=workers)
+    return session.select(preset=preset, keywords=keywords, source=source, box_filter=box_filter,
+                          hypernyms=hypernyms, hierarchy_file=hierarchy_file, fuzzy=fuzzy)
+
+
+def get_session(base_path, use_cache=True, workers=None):
+    """Return the shared ImageNetSession for a dataset, creating it on first use.
+
+    Sessions are kept in a small module-level cache keyed by the resolved
+    base_path and loading options, so repeated get_image_paths_by_keywords()
+    calls reuse the parsed state.
+    """
+    key = (str(Path(base_path).resolve()), use_cache, workers)
+    session = _SESSIONS.pop(key, None)
+    if session is None:
+        session = ImageNetSession(base_path, use_cache=use_cache, workers=workers)
+    _SESSIONS[key] = session
+    while len(_SESSIONS) > _MAX_SESSIONS:
+        _SESSIONS.pop(next(iter(_SESSIONS)))
+    return session
+
+
+def parse_class_weights(text):
+    """Parse "wnid=weight,wnid=weight" into a class_weights dict."""
+    class_weights = {}
+    for item in text.split(','):
+        wnid, _, weight = item.partition('=')
+        class_weights[wnid.strip()] = float(weight)
+    return class_weights
 
 
 def main():
@@ -81,6 +199,40 @@ def main():
     parser.add_argument('--base_path', type=str,
                         default='/Users/mrt/Documents/MrT/code/computer-vision/image-bank/ImageNet-Subset',
                         help='Path to ImageNet-Subset directory')
+    parser.add_argument('--no_cache', action='store_true',
+                        help='Parse the annotation text files directly instead of using the compiled index')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of processes used to parse train_cls.txt (default: serial)')
+    parser.add_argument('--hypernyms', type=str, default=None,
+                        help='Comma-separated WordNet WNIDs; adds every class under them (needs wordnet.is_a.txt, use --preset none to select by hierarchy only)')
+    parser.add_argument('--hierarchy_file', type=str, default=None,
+                        help='WordNet is-a file of "parent child" lines (default: <base_path>/wordnet.is_a.txt)')
+    parser.add_argument('--fuzzy', type=float, nargs='?', const=True, default=False,
+                        help='Also match names similar to a keyword; optional similarity threshold (default: 0.4)')
+    parser.add_argument('--strategy', type=str, default='uniform', choices=['uniform', 'stratified', 'proportional'],
+                        help='Sampling strategy (default: uniform)')
+    parser.add_argument('--per_class', type=int, default=None,
+                        help='Images per class for stratified sampling (replaces --num_images)')
+    parser.add_argument('--min_per_class', type=int, default=0,
+                        help='Minimum images per class for stratified sampling (default: 0)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Reservoir-sample straight from the annotation file without building the index')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Seed for reproducible sampling (default: unseeded)')
+    parser.add_argument('--verify', action='store_true',
+                        help='Replace selected images whose files are missing on disk')
+    parser.add_argument('--rank', type=int, default=None,
+                        help='Index of this worker in a distributed job (needs --world_size and --seed)')
+    parser.add_argument('--world_size', type=int, default=None,
+                        help='Number of workers sharing one sample (needs --rank and --seed)')
+    parser.add_argument('--class_weights', type=str, default=None,
+                        help='Comma-separated wnid=weight pairs; other matching classes weigh 1 (e.g. n01530575=5)')
+    parser.add_argument('--replacement', action='store_true',
+                        help='With --class_weights, draw with replacement')
+    parser.add_argument('--materialize', type=str, default=None,
+                        help='Also place the selected images in an <dir>/<wnid>/<file> tree; reruns resume')
+    parser.add_argument('--link', type=str, default='hardlink', choices=['hardlink', 'symlink', 'reflink', 'copy'],
+                        help='How --materialize places files (default: hardlink)')
 
     args = parser.parse_args()
 
@@ -89,15 +241,32 @@ def main():
         args.preset = None
 
     base_path = Path(args.base_path)
+    keywords = [k.strip() for k in args.keywords.split(',')] if args.keywords else None
+    hypernyms = [h.strip() for h in args.hypernyms.split(',')] if args.hypernyms else None
 
     # Extract image paths
     image_paths = get_image_paths_by_keywords(
         base_path,
         preset=args.preset,
-        keywords=[k.strip() for k in args.keywords.split(',')] if args.keywords else None,
+        keywords=keywords,
         num_images=args.num_images,
         source=args.source,
         silent=False,
+        use_cache=not args.no_cache,
+        workers=args.workers,
+        hypernyms=hypernyms,
+        hierarchy_file=args.hierarchy_file,
+        fuzzy=args.fuzzy,
+        strategy=args.strategy,
+        per_class=args.per_class,
+        min_per_class=args.min_per_class,
+        stream=args.stream,
+        seed=args.seed,
+        verify=args.verify,
+        rank=args.rank,
+        world_size=args.world_size,
+        class_weights=parse_class_weights(args.class_weights) if args.class_weights else None,
+        replacement=args.replacement,
     )
 
     # Print first 10 paths as example
@@ -106,5 +275,15 @@ def main():
         for i, path in enumerate(image_paths[:10], 1):
             print(f"{i}. {path}")
 
+    if args.materialize and image_paths:
+        selection = get_selection(base_path, preset=args.preset, keywords=keywords, source=args.source,
+                                  use_cache=not args.no_cache, workers=args.workers, hypernyms=hypernyms,
+                                  hierarchy_file=args.hierarchy_file, fuzzy=args.fuzzy)
+        placed, missing = selection.materialize(args.materialize, ids=selection.ids_of(image_paths),
+                                                strategy=args.link)
+        print(f"\nPlaced {placed} files under {args.materialize}")
+        if missing:
+            print(f"Skipped {len(missing)} missing source files, e.g. {missing[0]}")
+
 if __name__ == "__main__":
     main()
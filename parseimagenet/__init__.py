@@ -1,11 +1,14 @@
 from .keywords import get_available_presets, KEYWORD_PRESETS
 from .helpers.synset import get_synset_mapping
-from .ParseImageNetSubset import get_image_paths_by_keywords
+from .ParseImageNetSubset import get_image_paths_batch, get_image_paths_by_keywords, get_selection, iter_image_paths
+from .session import ImageNetSession
+from .selection import Selection
+from .helpers.manifest import Manifest
 from .keywords.bird_breeds import bird_breeds
 from .keywords.dog_breeds import dog_breeds, wild_canid_breeds
 from .keywords.snake_breeds import snake_breeds
 
 __all__ = [
-    'get_image_paths_by_keywords', 'get_available_presets', 'get_synset_mapping', 'KEYWORD_PRESETS',
+    'get_image_paths_by_keywords', 'iter_image_paths', 'get_image_paths_batch', 'get_selection', 'ImageNetSession', 'Selection', 'Manifest', 'get_available_presets', 'get_synset_mapping', 'KEYWORD_PRESETS',
     'bird_breeds', 'dog_breeds', 'wild_canid_breeds', 'snake_breeds'
 ]
@@ -0,0 +1,65 @@
+import random
+from array import array
+
+
+class AliasTable:
+    """Walker/Vose alias table for O(1) draws from a discrete distribution.
+
+    Building the table is O(n). Each draw then takes one uniform random
+    number: its integer part picks a column, its fractional part decides
+    between the column itself and the column's alias.
+
+    Args:
+        weights: Non-negative weights, at least one positive.
+
+    Raises:
+        ValueError: If a weight is negative or not finite, or all are zero.
+    """
+
+    def __init__(self, weights):
+        weights = [float(weight) for weight in weights]
+        if any(not 0 <= weight < float("inf") for weight in weights):
+            raise ValueError(f"weights must be finite and non-negative, got {weights}")
+        total = sum(weights)
+        if total <= 0:
+            raise ValueError("At least one weight must be positive")
+        n = len(weights)
+        scaled = [weight * n / total for weight in weights]
+        self.prob = array('d', [1.0]) * n
+        self.alias = array('l', range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Leftovers are 1 up to rounding error
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def __len__(self):
+        return len(self.prob)
+
+    def __repr__(self):
+        return f"AliasTable({len(self)} outcomes)"
+
+    def draw(self, rng=None):
+        """Return one outcome index."""
+        u = (rng or random).random() * len(self.prob)
+        i = int(u)
+        return i if u - i < self.prob[i] else self.alias[i]
+
+    def sample(self, k, rng=None):
+        """Return k independent outcome indices."""
+        rand = (rng or random).random
+        n = len(self.prob)
+        prob, alias = self.prob, self.alias
+        outcomes = []
+        append = outcomes.append
+        for _ in range(k):
+            u = rand() * n
+            i = int(u)
+            append(i if u - i < prob[i] else alias[i])
+        return outcomes
@@ -1,73 +1,320 @@
-from collections import defaultdict
+import mmap
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby, islice, repeat
+from operator import le
+from pathlib import Path
 
+from .category_index import CategoryIndexBuilder
 
-def parse_train_annotations(annotations_file):
+_READ_HINT = 1 << 20
+_CHUNKS_PER_WORKER = 4
+_MIN_CHUNK_BYTES = 1 << 20
+
+
+def parse_train_annotations(annotations_file, wnids=None, workers=None, is_sorted=None):
     """Parse train_cls.txt and group image stems by WNID.
 
+    When wnids is given and the file is sorted by WNID (as ILSVRC ships it),
+    each class's contiguous block is located by binary search over a memory
+    map and only those blocks are decoded. Unsorted files are parsed in full.
+
     Args:
         annotations_file: Path to train_cls.txt.
+        wnids: Optional iterable of WNIDs to extract; None parses every class.
+        workers: Number of processes for a full parse (default: None, serial).
+                 The file is split into newline-aligned byte ranges that are
+                 parsed in a process pool and merged in file order, so the
+                 result is identical to the serial parse.
+        is_sorted: Result of an earlier is_sorted_by_wnid() on this file;
+                   None checks it (default: None). Only used with wnids.
 
     Returns:
-        defaultdict[str, list[str]] mapping WNID to image path stems.
+        CategoryIndex mapping WNID to image path stems.
     """
-    category_images = defaultdict(list)
-    with open(annotations_file, 'r') as f:
-        for line in f:
-            parts = line.strip().split()
-            if len(parts) >= 1:
-                image_path = parts[0]
-                wnid = image_path.split('/')[0]
-                category_images[wnid].append(image_path)
-    return category_images
+    if wnids is not None:
+        if is_sorted is None:
+            is_sorted = is_sorted_by_wnid(annotations_file)
+        if is_sorted:
+            return _extract_sorted_blocks(annotations_file, wnids)
+        return parse_train_annotations(annotations_file, workers=workers).subset(wnids)
+
+    ranges = _chunk_ranges(annotations_file, workers) if workers and workers > 1 else []
+    if len(ranges) > 1:
+        builder = CategoryIndexBuilder()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = pool.map(_parse_train_range, repeat(str(annotations_file)), *zip(*ranges))
+            for blocks in chunks:
+                for block in blocks:
+                    builder.add_encoded_block(*block)
+        return builder.build()
+
+    builder = CategoryIndexBuilder()
+    with open(annotations_file, 'rb') as f:
+        while True:
+            lines = f.readlines(_READ_HINT)
+            if not lines:
+                break
+            _add_train_lines(builder, lines)
+    return builder.build()
+
+
+def _chunk_ranges(annotations_file, workers):
+    """Split a file into newline-aligned (start, stop) byte ranges for a process pool."""
+    with open(annotations_file, 'rb') as f:
+        size = f.seek(0, 2)
+        num_chunks = max(1, min(workers * _CHUNKS_PER_WORKER, size // _MIN_CHUNK_BYTES))
+        bounds = [0]
+        for i in range(1, num_chunks):
+            f.seek(max(size * i // num_chunks, bounds[-1]))
+            f.readline()
+            bounds.append(f.tell())
+        bounds.append(size)
+    return [(start, stop) for start, stop in zip(bounds, bounds[1:]) if start < stop]
+
+
+def _parse_train_range(annotations_file, start, stop):
+    """Process-pool worker: parse one byte range into picklable index blocks."""
+    builder = CategoryIndexBuilder()
+    with open(annotations_file, 'rb') as f:
+        f.seek(start)
+        _add_train_lines(builder, f.read(stop - start).split(b'\n'))
+    return builder.blocks()
+
+
+def _add_train_lines(builder, lines, only_wnid=None):
+    """Append the image paths of raw train_cls.txt lines to a builder."""
+    image_paths = [parts[0] for parts in map(bytes.split, lines) if parts]
+    wnids = [image_path.partition(b'/')[0] for image_path in image_paths]
+    # Lines are grouped by WNID, so each run is appended to the index in one step
+    start = 0
+    for wnid, run in groupby(wnids):
+        stop = start + sum(1 for _ in run)
+        if only_wnid is None or wnid == only_wnid:
+            builder.add_encoded_stems(wnid.decode(), image_paths[start:stop])
+        start = stop
+
+
+def _extract_sorted_blocks(annotations_file, wnids):
+    """Decode only the blocks of the requested WNIDs from a sorted train_cls.txt."""
+    builder = CategoryIndexBuilder()
+    with open(annotations_file, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            return builder.build()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            blocks = []
+            for wnid in dict.fromkeys(wnids):
+                key = wnid.encode()
+                start = _bisect_lines(mm, key, inclusive=False)
+                stop = _bisect_lines(mm, key, inclusive=True)
+                if start < stop:
+                    blocks.append((start, stop, key))
+            # File order keeps the class order identical to a full parse
+            for start, stop, key in sorted(blocks):
+                _add_train_lines(builder, mm[start:stop].split(b'\n'), only_wnid=key)
+    return builder.build()
 
 
-def parse_val_annotations(annotations_file, base_path):
+def _line_key(mm, start):
+    """Return (wnid, next_line_start) for the first non-blank line at or after start."""
+    size = len(mm)
+    while start < size:
+        end = mm.find(b'\n', start)
+        end = size if end == -1 else end + 1
+        parts = mm[start:end].split(None, 1)
+        if parts:
+            return parts[0].partition(b'/')[0], end
+        start = end
+    return None, size
+
+
+def _bisect_lines(mm, key, inclusive):
+    """Byte offset of the first line whose WNID is >= key (> key when inclusive)."""
+    lo, hi = 0, len(mm)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        newline = mm.rfind(b'\n', lo, mid)
+        start = lo if newline == -1 else newline + 1
+        line_key, end = _line_key(mm, start)
+        if line_key is not None and (line_key <= key if inclusive else line_key < key):
+            lo = end
+        else:
+            hi = start
+    return lo
+
+
+def is_sorted_by_wnid(annotations_file):
+    """Check, in one pass over every line, that train_cls.txt is sorted by WNID.
+
+    Binary search is only exact when no line is out of order, so sampling a
+    few lines is not enough: a single misplaced line would be silently lost.
+    """
+    previous = b""
+    with open(annotations_file, 'rb') as f:
+        while True:
+            lines = f.readlines(_READ_HINT)
+            if not lines:
+                return True
+            keys = [parts[0].partition(b'/')[0] for parts in map(bytes.split, lines) if parts]
+            if not keys:
+                continue
+            if keys[0] < previous or not all(map(le, keys, islice(keys, 1, None))):
+                return False
+            previous = keys[-1]
+
+
+def parse_val_annotations(annotations_file, base_path, wnids=None):
     """Parse val.txt + LOC_val_solution.csv and group image stems by WNID.
 
+    The files are joined by _join_val(), which streams both and reads only
+    the first label of each PredictionString. When wnids is given, solution
+    rows of other classes are dropped before the join, so a narrow query
+    never holds the full ImageId table.
+
     Args:
         annotations_file: Path to val.txt.
         base_path: Path to ImageNet-Subset directory (to locate LOC_val_solution.csv).
+        wnids: Optional iterable of WNIDs to extract; None keeps every class.
 
     Returns:
-        defaultdict[str, list[str]] mapping WNID to image ID stems.
+        CategoryIndex mapping WNID to image ID stems.
+    """
+    wanted = None if wnids is None else {wnid.encode() for wnid in wnids}
+    builder = CategoryIndexBuilder()
+    for image_id, wnid in _join_val(annotations_file, Path(base_path) / "LOC_val_solution.csv", wanted):
+        builder.add_encoded_stems(wnid.decode(), [image_id])
+    return builder.build()
+
+
+def _join_val(annotations_file, val_solution_file, wanted):
+    """Yield (image_id, wnid) for every val.txt ID with a wanted solution row, in val.txt order.
+
+    When the solution rows are ordered by ImageId (as ILSVRC ships them),
+    which one streaming pass checks first, they are merge-joined against
+    val.txt in constant memory. Should val.txt turn out unordered part-way,
+    its remaining IDs are joined against a hash of the solution rows, as are
+    all of them when the solution rows are unordered.
     """
-    val_solution_file = base_path / "LOC_val_solution.csv"
-    image_to_wnid = {}
-    with open(val_solution_file, 'r') as f:
+    joined = 0
+    if _ids_increasing(_iter_val_solution(val_solution_file)):
+        joined = yield from _merge_join_val(annotations_file, val_solution_file, wanted)
+        if joined is None:
+            return
+    yield from _hash_join_val(annotations_file, val_solution_file, wanted, joined)
+
+
+def _iter_val_ids(annotations_file):
+    """Yield the image ID of every non-blank line of val.txt."""
+    with open(annotations_file, 'rb') as f:
         for line in f:
-            line = line.strip()
-            if not line or line.startswith("ImageId"):
-                continue
-            parts = line.split(",")
-            if len(parts) >= 2:
-                image_id = parts[0]
-                wnid = parts[1].split()[0]
-                image_to_wnid[image_id] = wnid
-
-    category_images = defaultdict(list)
-    with open(annotations_file, 'r') as f:
+            parts = line.split(None, 1)
+            if parts:
+                yield parts[0]
+
+
+def _iter_val_solution(val_solution_file):
+    """Yield (image_id, first_wnid) for every labelled row of LOC_val_solution.csv."""
+    with open(val_solution_file, 'rb') as f:
         for line in f:
-            parts = line.strip().split()
-            if len(parts) >= 1:
-                image_id = parts[0]
-                if image_id in image_to_wnid:
-                    wnid = image_to_wnid[image_id]
-                    category_images[wnid].append(image_id)
-    return category_images
+            image_id, comma, prediction = line.strip().partition(b',')
+            if not comma or image_id.startswith(b"ImageId"):
+                continue
+            prediction = prediction.lstrip()
+            end = prediction.find(b' ')
+            wnid = prediction if end == -1 else prediction[:end]
+            if wnid:
+                yield image_id, wnid
+
+
+def _ids_increasing(rows):
+    """Return whether the IDs of (image_id, wnid) rows strictly increase."""
+    previous_id = None
+    for row_id, _ in rows:
+        if previous_id is not None and row_id <= previous_id:
+            return False
+        previous_id = row_id
+    return True
+
+
+def _merge_join_val(annotations_file, val_solution_file, wanted):
+    """Join val.txt against ImageId-ordered solution rows without buffering either one.
+
+    Returns:
+        None once val.txt is joined, or the number of val.txt IDs joined
+        before one was found out of order.
+    """
+    rows = _iter_val_solution(val_solution_file)
+    row_id, row_wnid = next(rows, (None, None))
+    previous_image_id = b""
+    for position, image_id in enumerate(_iter_val_ids(annotations_file)):
+        if image_id < previous_image_id:
+            return position
+        previous_image_id = image_id
+        while row_id is not None and row_id < image_id:
+            row_id, row_wnid = next(rows, (None, None))
+        if row_id == image_id and (wanted is None or row_wnid in wanted):
+            yield image_id, row_wnid
+    return None
+
+
+def _hash_join_val(annotations_file, val_solution_file, wanted, skip=0):
+    """Join val.txt, past its first skip IDs, against a hash of the (optionally pre-filtered) solution rows."""
+    image_to_wnid = {
+        image_id: wnid for image_id, wnid in _iter_val_solution(val_solution_file)
+        if wanted is None or wnid in wanted
+    }
+    for image_id in islice(_iter_val_ids(annotations_file), skip, None):
+        wnid = image_to_wnid.get(image_id)
+        if wnid is not None:
+            yield image_id, wnid
+
+
+def iter_annotations(annotations_file, base_path, source, wnids=None):
+    """Yield the stem of every annotated image without building an index.
+
+    train_cls.txt is read in fixed-size batches of lines and filtered by WNID
+    as it streams, so memory stays constant however long the file is. For
+    val, val.txt and LOC_val_solution.csv go through the same join as
+    parse_val_annotations(), which keeps constant memory on ordered files.
+
+    Args:
+        annotations_file: Path to the annotation file.
+        base_path: Path to ImageNet-Subset directory.
+        source: "train" or "val".
+        wnids: Optional iterable of WNIDs to keep; None yields every class.
+
+    Yields:
+        Image stem strings in file order.
+    """
+    wanted = None if wnids is None else {wnid.encode() for wnid in wnids}
+    if source != "train":
+        for image_id, _ in _join_val(annotations_file, Path(base_path) / "LOC_val_solution.csv", wanted):
+            yield image_id.decode()
+        return
+
+    with open(annotations_file, 'rb') as f:
+        while True:
+            lines = f.readlines(_READ_HINT)
+            if not lines:
+                break
+            for parts in map(bytes.split, lines):
+                if parts and (wanted is None or parts[0].partition(b'/')[0] in wanted):
+                    yield parts[0].decode()
 
 
-def parse_annotations(annotations_file, base_path, source):
+def parse_annotations(annotations_file, base_path, source, wnids=None, workers=None, is_sorted=None):
     """Dispatch to the appropriate annotation parser based on source.
 
     Args:
         annotations_file: Path to the annotation file.
         base_path: Path to ImageNet-Subset directory.
         source: "train" or "val".
+        wnids: Optional iterable of WNIDs to restrict parsing to (None for all).
+        workers: Number of processes for a full train parse (default: None, serial).
+        is_sorted: Known sortedness of train_cls.txt, see parse_train_annotations().
 
     Returns:
-        defaultdict[str, list[str]] mapping WNID to image stems.
+        CategoryIndex mapping WNID to image stems.
     """
     if source == "train":
-        return parse_train_annotations(annotations_file)
-    else:
-        return parse_val_annotations(annotations_file, base_path)
+        return parse_train_annotations(annotations_file, wnids, workers, is_sorted)
+    return parse_val_annotations(annotations_file, base_path, wnids)
@@ -0,0 +1,243 @@
+from array import array
+from itertools import compress, repeat
+from operator import mul, sub
+from pathlib import Path
+
+from .cache import load_compiled
+from .category_index import _code_typecode
+
+
+class BoxIndex:
+    """Packed bounding boxes parsed from a LOC_*_solution.csv file.
+
+    Images are sorted by ImageId and own a contiguous range of box rows. Each
+    box row stores its image row (int32), class code (int16, or int32 beyond
+    32k classes) and four coordinates (xmin, ymin, xmax, ymax) in a flat
+    int16/int32 array.
+
+    Attributes:
+        wnids: List of box class WNIDs; a WNID's position is its class code.
+        image_blob: ASCII bytes holding every ImageId back to back.
+        image_offsets: array of num_images + 1 byte offsets into image_blob.
+        box_offsets: array of num_images + 1 box row boundaries, one image per range.
+        box_images: int32 image row of every box.
+        box_codes: int16/int32 class code of every box.
+        coords: Flat array of 4 * num_boxes coordinates.
+    """
+
+    def __init__(self, wnids, image_blob, image_offsets, box_offsets, box_images, box_codes, coords):
+        self.wnids = wnids
+        self.image_blob = image_blob
+        self.image_offsets = image_offsets
+        self.box_offsets = box_offsets
+        self.box_images = box_images
+        self.box_codes = box_codes
+        self.coords = coords
+        self._code_of = {wnid: code for code, wnid in enumerate(wnids)}
+        self._areas = None
+
+    @classmethod
+    def from_csv(cls, solution_file):
+        """Build the index from LOC_train_solution.csv or LOC_val_solution.csv in one pass."""
+        code_of = {}
+        image_ids = []
+        counts = []
+        box_codes = array('i')
+        coords = array('i')
+        with open(solution_file, 'rb') as f:
+            for line in f:
+                image_id, comma, prediction = line.strip().partition(b',')
+                if not comma or image_id.startswith(b"ImageId"):
+                    continue
+                tokens = prediction.split()
+                labels = tokens[0::5]
+                del tokens[0::5]
+                if len(tokens) != 4 * len(labels):
+                    continue  # truncated PredictionString
+                image_ids.append(image_id)
+                counts.append(len(labels))
+                box_codes.fromlist([code_of.setdefault(label, len(code_of)) for label in labels])
+                coords.fromlist(list(map(int, tokens)))
+
+        box_offsets = array('q', [0])
+        for count in counts:
+            box_offsets.append(box_offsets[-1] + count)
+        order = sorted(range(len(image_ids)), key=image_ids.__getitem__)
+        if order != list(range(len(image_ids))):
+            image_ids, box_offsets, box_codes, coords = _reorder(order, image_ids, box_offsets, box_codes, coords)
+
+        box_images = array('i')
+        for row in range(len(image_ids)):
+            box_images.extend(repeat(row, box_offsets[row + 1] - box_offsets[row]))
+        image_offsets = array('q', [0])
+        for image_id in image_ids:
+            image_offsets.append(image_offsets[-1] + len(image_id))
+        if not coords or (min(coords) >= -2 ** 15 and max(coords) < 2 ** 15):
+            coords = array('h', coords)
+        box_codes = array(_code_typecode(len(code_of)), box_codes)
+        wnids = [label.decode() for label in code_of]
+        return cls(wnids, b"".join(image_ids), image_offsets, box_offsets, box_images, box_codes, coords)
+
+    def __len__(self):
+        return len(self.box_offsets) - 1
+
+    def __repr__(self):
+        return f"BoxIndex({len(self)} images, {self.num_boxes} boxes, {len(self.wnids)} classes)"
+
+    @property
+    def num_boxes(self):
+        return len(self.box_codes)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the index buffers."""
+        arrays = (self.image_offsets, self.box_offsets, self.box_images, self.box_codes, self.coords)
+        return len(self.image_blob) + sum(a.itemsize * len(a) for a in arrays)
+
+    def image_id(self, row):
+        """Return the ImageId stored at an image row."""
+        return self.image_blob[self.image_offsets[row]:self.image_offsets[row + 1]].decode()
+
+    def boxes(self, image_id):
+        """Return the boxes of an image as (wnid, xmin, ymin, xmax, ymax) tuples.
+
+        Unknown images have no boxes and return [].
+        """
+        start, stop = self._box_range(image_id)
+        coords = self.coords
+        return [
+            (self.wnids[self.box_codes[box]], *coords[4 * box:4 * box + 4])
+            for box in range(start, stop)
+        ]
+
+    def box_count(self, image_id):
+        start, stop = self._box_range(image_id)
+        return stop - start
+
+    def areas(self):
+        """Return the area of every box, computed once and kept."""
+        if self._areas is None:
+            c = self.coords
+            self._areas = array('q', map(mul, map(sub, c[2::4], c[0::4]), map(sub, c[3::4], c[1::4])))
+        return self._areas
+
+    def select(self, min_boxes=None, max_boxes=None, min_area=None, max_area=None, cooccur=None):
+        """Return the ImageIds whose boxes satisfy every given condition.
+
+        Args:
+            min_boxes: Minimum number of boxes in the image.
+            max_boxes: Maximum number of boxes in the image.
+            min_area: Keep images with at least one box of at least this area.
+            max_area: Keep images with at least one box of at most this area.
+                      With both bounds, one box must fall inside the range.
+            cooccur: Iterable of WNIDs that must all have a box in the image.
+
+        Returns:
+            set of ImageId strings.
+        """
+        rows = None
+        if min_boxes is not None or max_boxes is not None:
+            low = 0 if min_boxes is None else min_boxes
+            high = float("inf") if max_boxes is None else max_boxes
+            counts = map(sub, self.box_offsets[1:], self.box_offsets[:-1])
+            rows = {row for row, count in enumerate(counts) if low <= count <= high}
+        if min_area is not None or max_area is not None:
+            low = float("-inf") if min_area is None else min_area
+            high = float("inf") if max_area is None else max_area
+            in_range = [low <= area <= high for area in self.areas()]
+            rows = _intersect(rows, set(compress(self.box_images, in_range)))
+        for wnid in cooccur or ():
+            code = self._code_of.get(wnid)
+            has_class = () if code is None else map(code.__eq__, self.box_codes)
+            rows = _intersect(rows, set(compress(self.box_images, has_class)))
+        if rows is None:
+            rows = range(len(self))
+        return {self.image_id(row) for row in rows}
+
+    def to_sections(self):
+        """Serialize the index into (meta, sections) for the compiled cache file."""
+        meta = {"codes_typecode": self.box_codes.typecode, "coords_typecode": self.coords.typecode}
+        sections = [
+            "\n".join(self.wnids).encode(),
+            bytes(self.image_blob),
+            self.image_offsets.tobytes(),
+            self.box_offsets.tobytes(),
+            self.box_images.tobytes(),
+            self.box_codes.tobytes(),
+            self.coords.tobytes(),
+        ]
+        return meta, sections
+
+    @classmethod
+    def from_sections(cls, meta, sections):
+        """Rebuild an index from the output of to_sections()."""
+        wnid_blob, image_blob, *buffers = sections
+        typecodes = ['q', 'q', 'i', meta["codes_typecode"], meta["coords_typecode"]]
+        arrays = []
+        for typecode, buffer in zip(typecodes, buffers):
+            arrays.append(array(typecode))
+            arrays[-1].frombytes(buffer)
+        wnids = bytes(wnid_blob).decode().split("\n") if wnid_blob else []
+        return cls(wnids, bytes(image_blob), *arrays)
+
+    def _box_range(self, image_id):
+        """Return the (start, stop) box rows of an ImageId by binary search."""
+        key = image_id.encode()
+        lo = self._bisect(key, inclusive=False)
+        hi = self._bisect(key, inclusive=True)
+        return self.box_offsets[lo], self.box_offsets[hi]
+
+    def _bisect(self, key, inclusive):
+        blob, offsets = self.image_blob, self.image_offsets
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = blob[offsets[mid]:offsets[mid + 1]]
+            if value < key or (inclusive and value == key):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
+def load_box_index(base_path, source, use_cache=True, cache_dir=None):
+    """Return the BoxIndex of a split, served from the compiled cache when fresh.
+
+    Args:
+        base_path: Path to ImageNet-Subset directory.
+        source: "train" or "val".
+        use_cache: If False, always parse the CSV and skip the cache.
+        cache_dir: Directory for compiled indexes (default: default_cache_dir(base_path)).
+
+    Returns:
+        BoxIndex for the split.
+
+    Raises:
+        FileNotFoundError: If LOC_<source>_solution.csv is missing.
+    """
+    solution_file = Path(base_path) / f"LOC_{source}_solution.csv"
+    return load_compiled(base_path, f"boxes-{source}.bin", [solution_file], lambda: BoxIndex.from_csv(solution_file),
+                         BoxIndex.from_sections, use_cache, cache_dir)
+
+
+def image_id_of(stem_or_path):
+    """Return the LOC_*_solution.csv ImageId of an image stem or resolved path."""
+    return Path(stem_or_path).name.partition('.')[0]
+
+
+def _intersect(rows, other):
+    return other if rows is None else rows & other
+
+
+def _reorder(order, image_ids, box_offsets, box_codes, coords):
+    """Permute per-image rows (and their box ranges) into the given order."""
+    new_ids = [image_ids[row] for row in order]
+    new_offsets = array('q', [0])
+    new_codes = array(box_codes.typecode)
+    new_coords = array(coords.typecode)
+    for row in order:
+        start, stop = box_offsets[row], box_offsets[row + 1]
+        new_offsets.append(new_offsets[-1] + stop - start)
+        new_codes += box_codes[start:stop]
+        new_coords += coords[4 * start:4 * stop]
+    return new_ids, new_offsets, new_codes, new_coords
@@ -0,0 +1,323 @@
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+from .annotations import is_sorted_by_wnid, parse_annotations
+from .category_index import CategoryIndex
+from .synset import get_synset_mapping
+
+CACHE_VERSION = 3
+_MAGIC = b"PININDEX"
+_HASH_WINDOW = 64 * 1024
+
+
+def default_cache_dir(base_path):
+    """Return the directory holding compiled indexes for a dataset.
+
+    Uses $PARSEIMAGENET_CACHE_DIR when set, otherwise the user cache directory
+    ($XDG_CACHE_HOME or ~/.cache). Each dataset gets its own subdirectory keyed
+    on its resolved base path so several datasets never share an index.
+
+    Args:
+        base_path: Path to ImageNet-Subset directory (str or Path).
+
+    Returns:
+        Path to the cache directory (not created).
+    """
+    root = os.environ.get("PARSEIMAGENET_CACHE_DIR")
+    if root is None:
+        root = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "parseimagenet"
+    key = hashlib.blake2b(str(Path(base_path).resolve()).encode(), digest_size=8).hexdigest()
+    return Path(root) / key
+
+
+def source_signature(paths):
+    """Fingerprint source files by size, mtime and a hash of their head and tail.
+
+    Args:
+        paths: Iterable of Path objects.
+
+    Returns:
+        List of [name, size, mtime_ns, digest] entries, one per file.
+
+    Raises:
+        FileNotFoundError: If any source file is missing.
+    """
+    signature = []
+    for path in paths:
+        stat = os.stat(path)
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            digest.update(f.read(_HASH_WINDOW))
+            if stat.st_size > 2 * _HASH_WINDOW:
+                f.seek(-_HASH_WINDOW, os.SEEK_END)
+                digest.update(f.read(_HASH_WINDOW))
+        signature.append([Path(path).name, stat.st_size, stat.st_mtime_ns, digest.hexdigest()])
+    return signature
+
+
+def index_sources(base_path, source, annotations_file):
+    """Return the source files a split's compiled index is built from.
+
+    Args:
+        base_path: Path to ImageNet-Subset directory.
+        source: "train" or "val".
+        annotations_file: Path to the annotation file for the split.
+
+    Returns:
+        List of Path objects.
+    """
+    base = Path(base_path)
+    sources = [base / "LOC_synset_mapping.txt", Path(annotations_file)]
+    if source == "val":
+        sources.append(base / "LOC_val_solution.csv")
+    return sources
+
+
+def load_index(base_path, source, annotations_file, use_cache=True, cache_dir=None, select=None, workers=None,
+               sortedness=None):
+    """Return (synset_mapping, category_images), served from a compiled index when fresh.
+
+    The compiled index is rebuilt automatically whenever any of the source files
+    (synset mapping, annotation list and, for val, LOC_val_solution.csv) change.
+    When no fresh index exists, select narrows the query to a few classes and
+    train_cls.txt is sorted, only those classes are read and the index is left
+    to a later full load. Otherwise a partial parse would not be cheaper than
+    a full one, so the full index is parsed and compiled. Whether
+    train_cls.txt is sorted takes a linear pass to find out, so the answer is
+    kept in the cache directory or, without a cache, in the caller's
+    sortedness dict; with neither, the partial path is skipped.
+
+    Args:
+        base_path: Path to ImageNet-Subset directory.
+        source: "train" or "val".
+        annotations_file: Path to the annotation file for the split.
+        use_cache: If False, always parse the text files and skip the cache.
+        cache_dir: Directory for compiled indexes (default: default_cache_dir(base_path)).
+        select: Optional callable taking the synset mapping and returning the
+                WNIDs the caller needs, or None when every class is needed.
+                It is only called when the result holds just those classes.
+        workers: Number of processes for a full train parse (default: None, serial).
+        sortedness: Optional dict mapping source signatures to whether
+                    train_cls.txt is sorted, filled in by this call and kept
+                    by the caller across queries.
+
+    Returns:
+        Tuple of (synset_mapping, category_images).
+
+    Raises:
+        FileNotFoundError: If a required source file is missing.
+    """
+    base = Path(base_path)
+    sources = index_sources(base, source, annotations_file)
+
+    if use_cache:
+        signature = source_signature(sources)
+        index_file = Path(cache_dir or default_cache_dir(base)) / f"index-{source}.bin"
+        cached = read_index_file(index_file, signature)
+        if cached is not None:
+            return cached
+
+    synset_mapping = get_synset_mapping(base)
+    if select is not None:
+        if source == "val":
+            # Joined in one pass either way; the cache gets the full index
+            is_sorted = None
+            partial = not use_cache
+        elif use_cache or sortedness is not None:
+            if not use_cache:
+                signature = source_signature(sources)
+            key = tuple(map(tuple, signature))
+            is_sorted = sortedness.get(key) if sortedness is not None else None
+            if is_sorted is None:
+                if use_cache:
+                    order_file = Path(cache_dir or default_cache_dir(base)) / "order-train.bin"
+                    is_sorted = load_sortedness(order_file, signature, annotations_file)
+                else:
+                    is_sorted = is_sorted_by_wnid(annotations_file)
+                if sortedness is not None:
+                    sortedness[key] = is_sorted
+            partial = is_sorted
+        else:
+            partial = False  # no place to keep the order check, which costs as much as a full parse
+        if partial:
+            category_images = parse_annotations(annotations_file, base, source, select(synset_mapping), workers,
+                                                is_sorted)
+            return synset_mapping, category_images
+
+    category_images = parse_annotations(annotations_file, base, source, workers=workers)
+    if not use_cache:
+        return synset_mapping, category_images
+
+    try:
+        write_index_file(index_file, signature, synset_mapping, category_images)
+    except OSError:
+        pass  # read-only or full cache location: fall back to uncached behaviour
+    return synset_mapping, category_images
+
+
+def load_compiled(base_path, file_name, sources, build, from_sections, use_cache=True, cache_dir=None):
+    """Return an object served from a compiled cache file when fresh, else built and cached.
+
+    Args:
+        base_path: Path to ImageNet-Subset directory.
+        file_name: Name of the cache file inside the cache directory.
+        sources: Paths of the source files the object is built from.
+        build: Callable returning the object parsed from the sources; the
+               object must provide to_sections() -> (meta, sections).
+        from_sections: Callable rebuilding the object from (meta, sections).
+        use_cache: If False, always call build and skip the cache.
+        cache_dir: Directory for compiled indexes (default: default_cache_dir(base_path)).
+
+    Raises:
+        FileNotFoundError: If a source file is missing.
+    """
+    if not use_cache:
+        return build()
+
+    signature = source_signature(sources)
+    cache_file = Path(cache_dir or default_cache_dir(base_path)) / file_name
+    cached = read_sections_file(cache_file, signature)
+    if cached is not None:
+        try:
+            return from_sections(*cached)
+        except (ValueError, KeyError, TypeError):
+            pass
+
+    compiled = build()
+    try:
+        write_sections_file(cache_file, signature, *compiled.to_sections())
+    except OSError:
+        pass  # read-only or full cache location: fall back to uncached behaviour
+    return compiled
+
+
+def load_sortedness(order_file, signature, annotations_file):
+    """Return whether train_cls.txt is sorted by WNID, checked once per source signature.
+
+    The result of the linear is_sorted_by_wnid() pass is stored in order_file
+    so later cold keyword queries can go straight to the binary search.
+    """
+    loaded = read_sections_file(order_file, signature)
+    if loaded is not None and isinstance(loaded[0], dict) and isinstance(loaded[0].get("sorted"), bool):
+        return loaded[0]["sorted"]
+    is_sorted = is_sorted_by_wnid(annotations_file)
+    try:
+        write_sections_file(order_file, signature, {"sorted": is_sorted}, [])
+    except OSError:
+        pass  # read-only or full cache location: check again next time
+    return is_sorted
+
+
+def write_index_file(index_file, signature, synset_mapping, category_images):
+    """Serialize a synset mapping and CategoryIndex into a compiled index file.
+
+    Args:
+        index_file: Destination Path.
+        signature: Source signature from source_signature().
+        synset_mapping: Dict mapping WNID to category name string.
+        category_images: CategoryIndex mapping WNID to image stems.
+    """
+    synset_blob = "".join(f"{wnid}\t{name}\n" for wnid, name in synset_mapping.items()).encode()
+    index_meta, index_sections = category_images.to_sections()
+    write_sections_file(index_file, signature, index_meta, [synset_blob] + index_sections)
+
+
+def read_index_file(index_file, signature):
+    """Load a compiled index file if it matches the given source signature.
+
+    Args:
+        index_file: Path to the compiled index.
+        signature: Expected source signature from source_signature().
+
+    Returns:
+        Tuple of (synset_mapping, category_images), or None when the file is
+        missing, stale, corrupt or written by an incompatible version.
+    """
+    loaded = read_sections_file(index_file, signature)
+    if loaded is None:
+        return None
+    meta, sections = loaded
+    try:
+        category_images = CategoryIndex.from_sections(meta, sections[1:])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+    synset_mapping = {}
+    for line in bytes(sections[0]).decode().splitlines():
+        wnid, name = line.split("\t", 1)
+        synset_mapping[wnid] = name
+    return synset_mapping, category_images
+
+
+def write_sections_file(path, signature, meta, sections):
+    """Atomically write binary sections plus a JSON header to a cache file.
+
+    Layout: 8-byte magic, uint32 header length, JSON header (format version,
+    byte order, source signature, caller meta, section lengths), then the raw
+    sections back to back.
+
+    Args:
+        path: Destination Path.
+        signature: Source signature from source_signature().
+        meta: JSON-serializable dict stored alongside the sections.
+        sections: List of bytes-like objects.
+    """
+    header = json.dumps({
+        "version": CACHE_VERSION,
+        "byteorder": sys.byteorder,
+        "signature": signature,
+        "meta": meta,
+        "sections": [len(s) for s in sections],
+    }).encode()
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_file, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(len(header).to_bytes(4, 'little'))
+            f.write(header)
+            for section in sections:
+                f.write(section)
+        os.replace(tmp_file, path)
+    finally:
+        if tmp_file.exists():
+            tmp_file.unlink()
+
+
+def read_sections_file(path, signature):
+    """Read a file written by write_sections_file() if it matches signature.
+
+    Returns:
+        Tuple of (meta, sections) with sections as memoryviews, or None when the
+        file is missing, stale, corrupt or written by an incompatible version.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = memoryview(f.read())
+    except OSError:
+        return None
+
+    try:
+        if bytes(data[:8]) != _MAGIC:
+            return None
+        header_len = int.from_bytes(data[8:12], 'little')
+        header = json.loads(bytes(data[12:12 + header_len]))
+        if (header["version"] != CACHE_VERSION or header["byteorder"] != sys.byteorder
+                or header["signature"] != signature):
+            return None
+
+        sections = []
+        pos = 12 + header_len
+        for length in header["sections"]:
+            sections.append(data[pos:pos + length])
+            pos += length
+        if pos != len(data):
+            return None
+        return header["meta"], sections
+    except (ValueError, KeyError, TypeError):
+        return None
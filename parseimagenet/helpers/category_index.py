@@ -0,0 +1,298 @@
+from array import array
+from collections.abc import Mapping, Sequence
+from itertools import accumulate, chain, repeat
+
+
+def _offset_typecode(limit):
+    """Smallest unsigned array typecode able to hold values up to limit."""
+    return 'I' if limit < 2 ** 32 else 'Q'
+
+
+def _code_typecode(num_classes):
+    """int16 class codes, widened only for taxonomies beyond 32k classes."""
+    return 'h' if num_classes <= 2 ** 15 else 'i'
+
+
+class CategoryIndex(Mapping):
+    """Compact WNID -> image stem grouping backed by contiguous buffers.
+
+    All stems live in a single UTF-8 blob, delimited by an offsets array and
+    grouped by class, so the index holds a handful of buffers instead of one
+    Python string per image. Stems that share their class's ``wnid/`` prefix
+    (every train stem) are stored with that prefix stripped.
+
+    The index is a read-only Mapping: ``index[wnid]`` returns a lazy StemSlice,
+    so code written against the old ``dict[str, list[str]]`` keeps working.
+
+    Attributes:
+        wnids: List of WNIDs in first-appearance order; a WNID's position is its class code.
+        class_offsets: array of len(wnids) + 1 row boundaries, one class per range.
+        stem_offsets: array of total + 1 byte offsets into blob, one stem per range.
+        codes: int16 array holding the class code of every row.
+        prefixes: Per-class prefix restored in front of each stored stem.
+        blob: bytes holding every stored stem back to back.
+    """
+
+    def __init__(self, wnids, prefixes, class_offsets, stem_offsets, codes, blob):
+        self.wnids = wnids
+        self.prefixes = prefixes
+        self.class_offsets = class_offsets
+        self.stem_offsets = stem_offsets
+        self.codes = codes
+        self.blob = blob
+        self._code_of = {wnid: code for code, wnid in enumerate(wnids)}
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """Build an index from an iterable of (wnid, stem) pairs.
+
+        Classes keep first-appearance order and stems keep their order within
+        each class, matching the grouping a defaultdict(list) would produce.
+        """
+        builder = CategoryIndexBuilder()
+        for wnid, stem in pairs:
+            builder.add(wnid, stem)
+        return builder.build()
+
+    @classmethod
+    def empty(cls):
+        return CategoryIndexBuilder().build()
+
+    # Mapping interface
+    def __getitem__(self, wnid):
+        return StemSlice(self, self._code_of[wnid])
+
+    def __iter__(self):
+        return iter(self.wnids)
+
+    def __len__(self):
+        return len(self.wnids)
+
+    def __contains__(self, wnid):
+        return wnid in self._code_of
+
+    def __repr__(self):
+        return f"CategoryIndex({len(self.wnids)} classes, {self.total} images)"
+
+    # Compact accessors
+    @property
+    def total(self):
+        """Total number of stems across all classes."""
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the index buffers."""
+        return (len(self.blob) + self.stem_offsets.itemsize * len(self.stem_offsets)
+                + self.class_offsets.itemsize * len(self.class_offsets)
+                + self.codes.itemsize * len(self.codes))
+
+    def code(self, wnid):
+        """Return the integer class code of a WNID."""
+        return self._code_of[wnid]
+
+    def count(self, wnid):
+        """Return the number of stems in a class in O(1)."""
+        code = self._code_of[wnid]
+        return self.class_offsets[code + 1] - self.class_offsets[code]
+
+    def row_range(self, wnid):
+        """Return the (start, stop) row range of a class."""
+        code = self._code_of[wnid]
+        return self.class_offsets[code], self.class_offsets[code + 1]
+
+    def stem(self, row):
+        """Decode the stem stored at a global row index."""
+        code = self.codes[row]
+        raw = self.blob[self.stem_offsets[row]:self.stem_offsets[row + 1]]
+        return self.prefixes[code] + raw.decode()
+
+    def wnid_of(self, row):
+        """Return the WNID owning a global row index."""
+        return self.wnids[self.codes[row]]
+
+    def to_sections(self):
+        """Serialize the index into (meta, sections) for the compiled index file."""
+        meta = {
+            "stem_typecode": self.stem_offsets.typecode,
+            "code_typecode": self.codes.typecode,
+        }
+        stripped = bytes(1 if prefix else 0 for prefix in self.prefixes)
+        sections = [
+            "\n".join(self.wnids).encode(),
+            stripped,
+            self.class_offsets.tobytes(),
+            self.stem_offsets.tobytes(),
+            self.codes.tobytes(),
+            bytes(self.blob),
+        ]
+        return meta, sections
+
+    @classmethod
+    def from_sections(cls, meta, sections):
+        """Rebuild an index from the output of to_sections()."""
+        wnid_blob, stripped, class_offsets_bytes, stem_offsets_bytes, codes_bytes, blob = sections
+        wnids = bytes(wnid_blob).decode().split("\n") if wnid_blob else []
+        prefixes = [f"{wnid}/" if flag else "" for wnid, flag in zip(wnids, bytes(stripped))]
+        class_offsets = array('q')
+        class_offsets.frombytes(class_offsets_bytes)
+        stem_offsets = array(meta["stem_typecode"])
+        stem_offsets.frombytes(stem_offsets_bytes)
+        codes = array(meta["code_typecode"])
+        codes.frombytes(codes_bytes)
+        return cls(wnids, prefixes, class_offsets, stem_offsets, codes, bytes(blob))
+
+    def filter_stems(self, predicate, wnids=None):
+        """Return a new index keeping only stems for which predicate(stem) is true.
+
+        Args:
+            predicate: Callable taking a stem string.
+            wnids: Optional iterable restricting which classes are scanned.
+        """
+        wanted = None if wnids is None else set(wnids)
+        builder = CategoryIndexBuilder()
+        for wnid in self.wnids:
+            if wanted is None or wnid in wanted:
+                builder.add_encoded_stems(wnid, [stem.encode() for stem in self[wnid] if predicate(stem)])
+        return builder.build()
+
+    def subset(self, wnids):
+        """Return a new index restricted to the given WNIDs, keeping this index's class order."""
+        wanted = set(wnids)
+        builder = CategoryIndexBuilder()
+        for wnid in self.wnids:
+            if wnid in wanted:
+                start, stop = self.row_range(wnid)
+                offsets = self.stem_offsets[start:stop + 1]
+                builder.add_encoded_block(
+                    wnid, self.prefixes[self._code_of[wnid]],
+                    self.blob[offsets[0]:offsets[-1]],
+                    [end - begin for begin, end in zip(offsets, offsets[1:])],
+                )
+        return builder.build()
+
+
+class StemSlice(Sequence):
+    """Lazy, read-only view of the stems of one class in a CategoryIndex."""
+
+    __slots__ = ("_index", "_code", "_start", "_stop")
+
+    def __init__(self, index, code):
+        self._index = index
+        self._code = code
+        self._start = index.class_offsets[code]
+        self._stop = index.class_offsets[code + 1]
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("StemSlice index out of range")
+        return self._index.stem(self._start + i)
+
+    def __iter__(self):
+        index = self._index
+        prefix = index.prefixes[self._code]
+        offsets = index.stem_offsets
+        blob = index.blob
+        for row in range(self._start, self._stop):
+            yield prefix + blob[offsets[row]:offsets[row + 1]].decode()
+
+    def __eq__(self, other):
+        if isinstance(other, (StemSlice, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"StemSlice({list(self)!r})"
+
+
+class CategoryIndexBuilder:
+    """Incrementally group (wnid, stem) pairs into a CategoryIndex.
+
+    Each class accumulates its stored stems in a bytearray plus an array of
+    their byte lengths; global offsets are computed once in build().
+    """
+
+    def __init__(self):
+        self._classes = {}
+
+    def add(self, wnid, stem):
+        """Append one stem to its class."""
+        self.add_encoded_stems(wnid, [stem.encode()])
+
+    def add_encoded_stems(self, wnid, stems):
+        """Append a run of UTF-8 encoded stems to one class in a single step."""
+        if not stems:
+            return
+        encoded_prefix = f"{wnid}/".encode()
+        entry = self._classes.get(wnid)
+        if entry is None:
+            prefix = f"{wnid}/" if stems[0].startswith(encoded_prefix) else ""
+            entry = self._classes[wnid] = [prefix, bytearray(), array('I')]
+        if entry[0] and not all(map(bytes.startswith, stems, repeat(encoded_prefix))):
+            self._unstrip(entry)
+        prefix, data, lengths = entry
+        if prefix:
+            cut = len(encoded_prefix)
+            stems = [stem[cut:] for stem in stems]
+        lengths.fromlist(list(map(len, stems)))
+        data += b"".join(stems)
+
+    def add_encoded_block(self, wnid, prefix, data, lengths):
+        """Append an already encoded run of stems (used when merging chunks)."""
+        entry = self._classes.get(wnid)
+        if entry is None:
+            self._classes[wnid] = [prefix, bytearray(data), array('I', lengths)]
+            return
+        if entry[0] != prefix:
+            if entry[0]:
+                self._unstrip(entry)
+            if prefix:
+                data, lengths = _prepend(prefix, data, lengths)
+        entry[1] += data
+        entry[2].extend(lengths)
+
+    def blocks(self):
+        """Return the accumulated classes as (wnid, prefix, data, lengths) tuples.
+
+        The tuples are cheap to pickle and can be replayed into another builder
+        with add_encoded_block(), which is how parallel parse chunks are merged.
+        """
+        return [(wnid, prefix, bytes(data), lengths) for wnid, (prefix, data, lengths) in self._classes.items()]
+
+    @staticmethod
+    def _unstrip(entry):
+        """Re-attach a class's shared prefix so a non-matching stem can join it."""
+        entry[1], entry[2] = _prepend(entry[0], entry[1], entry[2])
+        entry[0] = ""
+
+    def build(self):
+        entries = list(self._classes.values())
+        wnids = list(self._classes)
+        blob = b"".join(entry[1] for entry in entries)
+        stem_offsets = array(_offset_typecode(len(blob)),
+                             accumulate(chain.from_iterable(entry[2] for entry in entries), initial=0))
+        class_offsets = array('q', accumulate((len(entry[2]) for entry in entries), initial=0))
+        codes = array(_code_typecode(len(wnids)))
+        for code, entry in enumerate(entries):
+            codes += array(codes.typecode, [code]) * len(entry[2])
+        prefixes = [entry[0] for entry in entries]
+        return CategoryIndex(wnids, prefixes, class_offsets, stem_offsets, codes, blob)
+
+
+def _prepend(prefix, data, lengths):
+    """Return (data, lengths) with prefix re-attached to every encoded stem."""
+    encoded_prefix = prefix.encode()
+    new_data = bytearray()
+    start = 0
+    for length in lengths:
+        new_data += encoded_prefix
+        new_data += data[start:start + length]
+        start += length
+    return new_data, array('I', (length + len(encoded_prefix) for length in lengths))
@@ -1,23 +1,179 @@
 import re
+from functools import lru_cache
 
+from .synset import FUZZY_THRESHOLD
 
-def filter_categories(synset_mapping, category_images, search_keywords):
+
+def filter_categories(synset_mapping, category_images, search_keywords, token_index=None,
+                      hierarchy=None, hypernyms=None, fuzzy_index=None, fuzzy_threshold=FUZZY_THRESHOLD,
+                      matched=None):
     """Return WNIDs that match the given keywords (or all WNIDs if keywords is None).
 
     Args:
         synset_mapping: Dict mapping WNID to category name string.
-        category_images: Dict mapping WNID to list of image stems.
+        category_images: CategoryIndex (or dict) mapping WNID to image stems.
         search_keywords: List of keyword strings, or None for all categories.
+        token_index: Optional SynsetTokenIndex built from synset_mapping, used
+                     to look keywords up instead of scanning every name.
+        hierarchy: WordNetHierarchy used to resolve hypernyms.
+        hypernyms: Optional list of ancestor WNIDs. Classes under any of them are
+                   selected in addition to keyword matches; with search_keywords
+                   None only the hierarchy decides.
+        fuzzy_index: Optional SynsetTrigramIndex built from synset_mapping. When
+                     given, classes similar to a keyword are matched as well.
+        fuzzy_threshold: Minimum trigram similarity for a fuzzy match.
+        matched: Optional precomputed match_wnids() result for search_keywords.
 
     Returns:
         List of matching WNID strings.
     """
-    if search_keywords is None:
+    if search_keywords is None and hypernyms is None:
         return list(category_images.keys())
 
-    matching_wnids = []
-    for wnid, category_name in synset_mapping.items():
-        if any(re.search(rf'\b{re.escape(keyword)}\b', category_name, re.IGNORECASE) for keyword in search_keywords):
-            if wnid in category_images:
-                matching_wnids.append(wnid)
-    return matching_wnids
+    selected = select_wnids(synset_mapping, search_keywords, token_index, hierarchy, hypernyms,
+                            fuzzy_index, fuzzy_threshold, matched)
+    return [wnid for wnid in selected if wnid in category_images]
+
+
+def select_wnids(synset_mapping, search_keywords, token_index=None, hierarchy=None, hypernyms=None,
+                 fuzzy_index=None, fuzzy_threshold=FUZZY_THRESHOLD, matched=None):
+    """Return WNIDs matching any keyword or lying under any hypernym, in synset mapping order.
+
+    Args:
+        synset_mapping: Dict mapping WNID to category name string.
+        search_keywords: List of keyword strings, or None.
+        token_index: Optional SynsetTokenIndex built from synset_mapping.
+        hierarchy: WordNetHierarchy, required when hypernyms is given.
+        hypernyms: Optional list of ancestor WNIDs.
+        fuzzy_index: Optional SynsetTrigramIndex for fuzzy keyword matches.
+        fuzzy_threshold: Minimum trigram similarity for a fuzzy match.
+        matched: Optional precomputed match_wnids() result for search_keywords.
+
+    Returns:
+        List of matching WNID strings.
+
+    Raises:
+        ValueError: If hypernyms is given without a hierarchy or names unknown WNIDs.
+    """
+    if matched is None:
+        matched = match_wnids(synset_mapping, search_keywords, token_index) if search_keywords is not None else []
+    extra = set()
+    if hypernyms is not None:
+        if hierarchy is None:
+            raise ValueError("hypernyms requires a WordNet hierarchy (wordnet.is_a.txt)")
+        extra.update(hierarchy.select(synset_mapping, hypernyms))
+    if fuzzy_index is not None and search_keywords is not None:
+        extra.update(fuzzy_match_wnids(fuzzy_index, search_keywords, fuzzy_threshold))
+    if not extra:
+        return matched
+    extra.update(matched)
+    return [wnid for wnid in synset_mapping if wnid in extra]
+
+
+def fuzzy_match_wnids(fuzzy_index, search_keywords, threshold=FUZZY_THRESHOLD):
+    """Return WNIDs whose name is similar to any keyword, in synset mapping order.
+
+    Args:
+        fuzzy_index: SynsetTrigramIndex over the synset mapping.
+        search_keywords: List of keyword strings.
+        threshold: Minimum trigram similarity in [0, 1].
+
+    Returns:
+        List of WNID strings.
+    """
+    found = set()
+    for keyword in dict.fromkeys(search_keywords):
+        found.update(wnid for wnid, _ in fuzzy_index.search(keyword, threshold))
+    return [wnid for wnid in fuzzy_index.wnids if wnid in found]
+
+
+def match_wnids(synset_mapping, search_keywords, token_index=None):
+    """Return every WNID in the synset mapping whose name matches any keyword.
+
+    Unlike filter_categories this does not need parsed annotations, so it can
+    decide which classes to parse before the annotation file is read.
+
+    With a token_index only the candidate classes it returns are checked
+    against the compiled matcher, so results are identical to a full scan.
+
+    Args:
+        synset_mapping: Dict mapping WNID to category name string.
+        search_keywords: List of keyword strings.
+        token_index: Optional SynsetTokenIndex built from synset_mapping.
+
+    Returns:
+        List of matching WNID strings in synset mapping order.
+    """
+    matcher = compile_keyword_matcher(search_keywords)
+    if matcher is None:
+        return []
+    search = matcher.search
+    if token_index is not None:
+        positions = _candidate_positions(token_index, search_keywords)
+        if positions is not None:
+            wnids, names = token_index.wnids, token_index.names
+            return [wnids[i] for i in sorted(positions) if search(names[i])]
+    return [wnid for wnid, category_name in synset_mapping.items() if search(category_name)]
+
+
+def match_wnids_batch(synset_mapping, keyword_sets, token_index=None):
+    """Match several keyword lists against the synset mapping in one scan.
+
+    One matcher over the union of every list rejects most names in a single
+    pass; only the names it accepts are tested against each list.
+
+    Args:
+        synset_mapping: Dict mapping WNID to category name string.
+        keyword_sets: List of keyword lists.
+        token_index: Optional SynsetTokenIndex built from synset_mapping.
+
+    Returns:
+        List with one list of matching WNIDs per keyword list, each in synset mapping order.
+    """
+    keyword_sets = [list(keywords) for keywords in keyword_sets]
+    candidates = match_wnids(synset_mapping, [keyword for keywords in keyword_sets for keyword in keywords],
+                             token_index)
+    results = []
+    for keywords in keyword_sets:
+        matcher = compile_keyword_matcher(keywords)
+        if matcher is None:
+            results.append([])
+            continue
+        search = matcher.search
+        results.append([wnid for wnid in candidates if search(synset_mapping[wnid])])
+    return results
+
+
+def _candidate_positions(token_index, search_keywords):
+    """Union of the index candidates of every keyword, or None to scan all names."""
+    positions = set()
+    for keyword in dict.fromkeys(search_keywords):
+        found = token_index.candidates(keyword)
+        if found is None:
+            return None
+        positions |= found
+    return positions
+
+
+def compile_keyword_matcher(search_keywords):
+    """Return one compiled pattern matching any keyword as a whole word, case-insensitively.
+
+    Equivalent to testing re.search(rf'\b{re.escape(keyword)}\b', name, re.IGNORECASE)
+    for every keyword, but each name is scanned once. Patterns are cached per
+    keyword set, so repeated queries with the same preset compile nothing.
+
+    Args:
+        search_keywords: Iterable of keyword strings.
+
+    Returns:
+        Compiled re.Pattern, or None when there are no keywords.
+    """
+    return _compile_keyword_matcher(tuple(search_keywords))
+
+
+@lru_cache(maxsize=64)
+def _compile_keyword_matcher(search_keywords):
+    keywords = list(dict.fromkeys(search_keywords))
+    if not keywords:
+        return None
+    return re.compile(r'\b(?:' + '|'.join(map(re.escape, keywords)) + r')\b', re.IGNORECASE)
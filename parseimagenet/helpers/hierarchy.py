@@ -0,0 +1,205 @@
+from array import array
+from bisect import bisect_right
+from itertools import chain
+from pathlib import Path
+
+from .cache import load_compiled
+
+HIERARCHY_FILE = "wordnet.is_a.txt"
+
+
+class WordNetHierarchy:
+    """WordNet is-a hierarchy with its descendant closure precomputed as interval labels.
+
+    One depth-first walk gives every synset a post-order number. Each synset
+    then stores the merged, sorted intervals of post-order numbers covering
+    all of its descendants (itself included). WordNet is nearly a tree, so
+    almost every synset holds a single interval and "is x under h" is one
+    bisect over h's intervals.
+
+    Attributes:
+        wnids: List of WNIDs; a WNID's position is its node code.
+        post: int32 post-order number of every node.
+        interval_offsets: array of len(wnids) + 1 boundaries into starts/ends, one node per range.
+        starts: int32 first post-order number of every interval.
+        ends: int32 last post-order number (inclusive) of every interval.
+    """
+
+    def __init__(self, wnids, post, interval_offsets, starts, ends):
+        self.wnids = wnids
+        self.post = post
+        self.interval_offsets = interval_offsets
+        self.starts = starts
+        self.ends = ends
+        self._code_of = {wnid: code for code, wnid in enumerate(wnids)}
+
+    @classmethod
+    def from_file(cls, is_a_file):
+        """Build the hierarchy from a wordnet.is_a.txt file of "parent child" lines."""
+        edges = []
+        with open(is_a_file, 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2:
+                    edges.append(parts)
+        return cls.from_edges(edges)
+
+    @classmethod
+    def from_edges(cls, edges):
+        """Build the hierarchy from an iterable of (parent, child) WNID pairs.
+
+        Edges closing a cycle are ignored, so malformed input cannot loop forever.
+        """
+        code_of = {}
+        children = []
+        has_parent = []
+        for parent, child in edges:
+            for wnid in (parent, child):
+                if wnid not in code_of:
+                    code_of[wnid] = len(code_of)
+                    children.append([])
+                    has_parent.append(False)
+            children[code_of[parent]].append(code_of[child])
+            has_parent[code_of[child]] = True
+
+        num_nodes = len(code_of)
+        post = array('i', [-1]) * num_nodes
+        intervals = [()] * num_nodes
+        counter = 0
+        roots = [code for code in range(num_nodes) if not has_parent[code]]
+        for root in chain(roots, range(num_nodes)):
+            if post[root] != -1:
+                continue
+            post[root] = -2  # on the current path
+            stack = [(root, iter(children[root]), counter)]
+            while stack:
+                node, pending, entry = stack[-1]
+                for child in pending:
+                    if post[child] == -1:
+                        post[child] = -2
+                        stack.append((child, iter(children[child]), counter))
+                        break
+                else:
+                    stack.pop()
+                    post[node] = counter
+                    # The spanning subtree is [entry, counter]; children reached
+                    # earlier through another parent add their own intervals.
+                    intervals[node] = _merge(chain([(entry, counter)],
+                                                   *(intervals[child] for child in children[node])))
+                    counter += 1
+
+        interval_offsets = array('q', [0])
+        starts = array('i')
+        ends = array('i')
+        for node_intervals in intervals:
+            starts.extend(start for start, _ in node_intervals)
+            ends.extend(end for _, end in node_intervals)
+            interval_offsets.append(len(starts))
+        return cls(list(code_of), post, interval_offsets, starts, ends)
+
+    def __len__(self):
+        return len(self.wnids)
+
+    def __contains__(self, wnid):
+        return wnid in self._code_of
+
+    def __repr__(self):
+        return f"WordNetHierarchy({len(self.wnids)} synsets, {len(self.starts)} intervals)"
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the closure buffers."""
+        return (self.post.itemsize * len(self.post) + self.interval_offsets.itemsize * len(self.interval_offsets)
+                + self.starts.itemsize * len(self.starts) + self.ends.itemsize * len(self.ends))
+
+    def is_under(self, wnid, hypernym):
+        """Return True if wnid is hypernym or one of its descendants."""
+        if wnid == hypernym:
+            return True
+        code = self._code_of.get(wnid)
+        parent = self._code_of.get(hypernym)
+        if code is None or parent is None:
+            return False
+        number = self.post[code]
+        lo, hi = self.interval_offsets[parent], self.interval_offsets[parent + 1]
+        i = bisect_right(self.starts, number, lo, hi) - 1
+        return i >= lo and number <= self.ends[i]
+
+    def select(self, wnids, hypernyms):
+        """Return the WNIDs lying under any of the given hypernyms, in input order.
+
+        Args:
+            wnids: Iterable of candidate WNIDs (e.g. the synset mapping).
+            hypernyms: Iterable of ancestor WNIDs.
+
+        Returns:
+            List of WNID strings.
+
+        Raises:
+            ValueError: If a hypernym is not part of the hierarchy.
+        """
+        hypernyms = list(dict.fromkeys(hypernyms))
+        unknown = [hypernym for hypernym in hypernyms if hypernym not in self._code_of]
+        if unknown:
+            raise ValueError(f"Unknown hypernym WNIDs: {unknown}")
+        return [wnid for wnid in wnids if any(self.is_under(wnid, hypernym) for hypernym in hypernyms)]
+
+    def to_sections(self):
+        """Serialize the hierarchy into (meta, sections) for the compiled cache file."""
+        sections = [
+            "\n".join(self.wnids).encode(),
+            self.post.tobytes(),
+            self.interval_offsets.tobytes(),
+            self.starts.tobytes(),
+            self.ends.tobytes(),
+        ]
+        return {}, sections
+
+    @classmethod
+    def from_sections(cls, meta, sections):
+        """Rebuild a hierarchy from the output of to_sections()."""
+        wnid_blob, post_bytes, offsets_bytes, starts_bytes, ends_bytes = sections
+        wnids = bytes(wnid_blob).decode().split("\n") if wnid_blob else []
+        post = array('i')
+        post.frombytes(post_bytes)
+        interval_offsets = array('q')
+        interval_offsets.frombytes(offsets_bytes)
+        starts = array('i')
+        starts.frombytes(starts_bytes)
+        ends = array('i')
+        ends.frombytes(ends_bytes)
+        if len(post) != len(wnids) or len(interval_offsets) != len(wnids) + 1 or len(starts) != len(ends):
+            raise ValueError("inconsistent hierarchy sections")
+        return cls(wnids, post, interval_offsets, starts, ends)
+
+
+def load_hierarchy(base_path, hierarchy_file=None, use_cache=True, cache_dir=None):
+    """Return the WordNetHierarchy of a dataset, served from the compiled cache when fresh.
+
+    Args:
+        base_path: Path to ImageNet-Subset directory.
+        hierarchy_file: Path to the is-a file (default: <base_path>/wordnet.is_a.txt).
+        use_cache: If False, always parse the text file and skip the cache.
+        cache_dir: Directory for compiled indexes (default: default_cache_dir(base_path)).
+
+    Returns:
+        WordNetHierarchy.
+
+    Raises:
+        FileNotFoundError: If the is-a file is missing.
+    """
+    is_a_file = Path(hierarchy_file) if hierarchy_file is not None else Path(base_path) / HIERARCHY_FILE
+    return load_compiled(base_path, "hierarchy.bin", [is_a_file], lambda: WordNetHierarchy.from_file(is_a_file),
+                         WordNetHierarchy.from_sections, use_cache, cache_dir)
+
+
+def _merge(intervals):
+    """Sort and merge overlapping or adjacent (start, end) intervals into a tuple."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return tuple(merged)
@@ -0,0 +1,147 @@
+import os
+from pathlib import Path
+
+from .cache import read_sections_file, write_sections_file
+
+
+class DirectoryListingCache:
+    """Per-directory file listings used to resolve image stems to files.
+
+    Each directory is listed once with os.scandir and indexed by every prefix
+    of its file names that ends before a '.', which is exactly what a
+    ``<stem>.*`` glob matches. Listings are revalidated against the
+    directory's mtime once per resolve() call, so resolving paths costs one
+    stat and at most one scandir per directory, however many images it holds.
+
+    Attributes:
+        extensions: Dict mapping a data directory to the single file extension
+                    verified for every file beneath it by verify_extension(),
+                    or None when verification failed.
+        dirty: True when listings changed since the cache was loaded or saved.
+    """
+
+    def __init__(self):
+        self._listings = {}
+        self.extensions = {}
+        self.dirty = False
+
+    def __len__(self):
+        return len(self._listings)
+
+    def __repr__(self):
+        return f"DirectoryListingCache({len(self._listings)} directories)"
+
+    def resolve(self, stems, data_path, assume_extension=False):
+        """Resolve image stems to full paths, keeping the bare stem path when no file matches.
+
+        Args:
+            stems: Iterable of stems relative to data_path ("wnid/name" or "name").
+            data_path: Base data directory Path.
+            assume_extension: If True and verify_extension() confirmed a single
+                              extension for data_path, append it without
+                              touching the file system.
+
+        Returns:
+            List of Path objects, one per stem.
+        """
+        data_path = Path(data_path)
+        extension = self.extensions.get(str(data_path)) if assume_extension else None
+        if extension is not None:
+            return [data_path / f"{stem}{extension}" for stem in stems]
+
+        fresh = {}
+        full_paths = []
+        for stem in stems:
+            stem_path = data_path / stem
+            directory = stem_path.parent
+            names = fresh.get(directory)
+            if names is None:
+                names = fresh[directory] = self.listing(directory)
+            name = names.get(stem_path.name)
+            full_paths.append(directory / name if name is not None else stem_path)
+        return full_paths
+
+    def listing(self, directory):
+        """Return the {stem: file name} index of a directory, relisting it when its mtime changed."""
+        key = str(directory)
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return {}
+        entry = self._listings.get(key)
+        if entry is not None and entry[0] == mtime_ns:
+            return entry[1]
+        with os.scandir(directory) as entries:
+            names = _index_names(entry.name for entry in entries)
+        self._listings[key] = (mtime_ns, names)
+        self.dirty = True
+        return names
+
+    def verify_extension(self, data_path):
+        """List every directory of a split and record its extension if all files share one.
+
+        Args:
+            data_path: Base data directory Path; its files and those of its
+                       immediate subdirectories are checked.
+
+        Returns:
+            The shared extension (e.g. ".JPEG"), or None when files differ.
+        """
+        data_path = Path(data_path)
+        directories = [data_path]
+        try:
+            with os.scandir(data_path) as entries:
+                directories.extend(Path(entry.path) for entry in entries if entry.is_dir())
+        except OSError:
+            directories = []
+        suffixes = set()
+        for directory in directories:
+            for stem, name in self.listing(directory).items():
+                if "." not in stem:
+                    suffixes.add(name[len(stem):])
+        extension = suffixes.pop() if len(suffixes) == 1 else None
+        self.extensions[str(data_path)] = extension
+        self.dirty = True
+        return extension
+
+    def save(self, cache_file):
+        """Persist the listings to cache_file (see write_sections_file())."""
+        directories = []
+        names = []
+        for directory, (mtime_ns, index) in self._listings.items():
+            files = list(dict.fromkeys(index.values()))
+            directories.append([directory, mtime_ns, len(files)])
+            names.extend(files)
+        meta = {"directories": directories, "extensions": self.extensions}
+        write_sections_file(cache_file, [], meta, ["\n".join(names).encode()])
+        self.dirty = False
+
+    @classmethod
+    def load(cls, cache_file):
+        """Load listings saved by save(), or return an empty cache if the file is unusable."""
+        cache = cls()
+        loaded = read_sections_file(cache_file, [])
+        if loaded is None:
+            return cache
+        meta, sections = loaded
+        try:
+            names = bytes(sections[0]).decode().split("\n")
+            start = 0
+            for directory, mtime_ns, count in meta["directories"]:
+                cache._listings[directory] = (mtime_ns, _index_names(names[start:start + count]))
+                start += count
+            cache.extensions = dict(meta["extensions"])
+        except (ValueError, KeyError, TypeError, IndexError):
+            return cls()
+        return cache
+
+
+def _index_names(names):
+    """Map every dot-terminated prefix of each file name to the first name carrying it."""
+    index = {}
+    for name in names:
+        dot = name.find(".", 1)
+        while dot > 0:
+            index.setdefault(name[:dot], name)
+            dot = name.find(".", dot + 1)
+    return index
@@ -0,0 +1,179 @@
+import json
+import mmap
+import os
+import sys
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+_MAGIC = b"PINMANIF"
+# Sections start on multiples of this, so NumPy can map them without copying
+_ALIGN = 64
+
+
+def write_manifest(path, root, entries, classes, with_sizes=False):
+    """Write image entries to a memory-mappable binary manifest.
+
+    Layout: 8-byte magic, uint32 header length, JSON header (version, byte
+    order, count, root, classes and the offset/length/typecode of every
+    section), then the sections, each aligned to 64 bytes:
+
+    - "offsets": uint64 x (count + 1), byte offsets of each path in "paths"
+    - "labels": int32 x count, index into classes
+    - "sizes": int64 x count, file size in bytes or -1 (only with_sizes)
+    - "paths": UTF-8 path blob, relative to root
+
+    Args:
+        path: Destination Path; written atomically.
+        root: Directory the stored paths are relative to.
+        entries: Iterable of (relative_path, label) or, with with_sizes,
+                 (relative_path, label, size) tuples.
+        classes: List of class names (WNIDs) the labels index.
+        with_sizes: Whether entries carry file sizes.
+
+    Returns:
+        Number of entries written.
+    """
+    offsets = array('Q', [0])
+    labels = array('i')
+    sizes = array('q')
+    blob = bytearray()
+    for entry in entries:
+        blob += entry[0].encode()
+        offsets.append(len(blob))
+        labels.append(entry[1])
+        if with_sizes:
+            sizes.append(entry[2])
+
+    sections = {"offsets": offsets, "labels": labels}
+    if with_sizes:
+        sections["sizes"] = sizes
+    sections["paths"] = blob
+
+    # The header size depends on the offsets it lists; two passes settle it
+    layout = {}
+    header = b""
+    for _ in range(2):
+        position = _aligned(12 + len(header))
+        for name, data in sections.items():
+            nbytes = len(data) * (data.itemsize if isinstance(data, array) else 1)
+            layout[name] = {"offset": position, "length": nbytes,
+                            "typecode": data.typecode if isinstance(data, array) else "B"}
+            position = _aligned(position + nbytes)
+        header = json.dumps({
+            "version": MANIFEST_VERSION,
+            "byteorder": sys.byteorder,
+            "count": len(labels),
+            "root": str(root),
+            "classes": list(classes),
+            "sections": layout,
+        }).encode()
+    header += b" " * (layout["offsets"]["offset"] - 12 - len(header))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_file, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(len(header).to_bytes(4, 'little'))
+            f.write(header)
+            for name, data in sections.items():
+                f.write(b"\0" * (layout[name]["offset"] - f.tell()))
+                f.write(data)
+        os.replace(tmp_file, path)
+    finally:
+        if tmp_file.exists():
+            tmp_file.unlink()
+    return len(labels)
+
+
+def _aligned(position):
+    return -(-position // _ALIGN) * _ALIGN
+
+
+class Manifest(Sequence):
+    """Read-only, memory-mapped view of a manifest written by write_manifest().
+
+    Nothing is parsed beyond the small JSON header: the offset, label and size
+    arrays are memoryviews into the mapped file, so worker processes opening
+    the same manifest share its page cache. A Manifest pickles as its file
+    path and re-maps the file on unpickling.
+
+    Args:
+        path: Path to the manifest file.
+
+    Attributes:
+        root: Path the stored paths are relative to.
+        classes: List of class names indexed by the labels.
+        labels: memoryview of int32 labels.
+        sizes: memoryview of int64 file sizes (-1 when unknown), or None.
+        sections: Dict of section name -> {"offset", "length", "typecode"},
+                  e.g. for numpy.frombuffer(..., offset=...).
+
+    Raises:
+        ValueError: If the file is not a manifest, has an unsupported version
+                    or was written on a machine of different byte order.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            if f.read(8) != _MAGIC:
+                raise ValueError(f"{self.path} is not a manifest file")
+            header = json.loads(f.read(int.from_bytes(f.read(4), 'little')))
+            if header["version"] != MANIFEST_VERSION or header["byteorder"] != sys.byteorder:
+                raise ValueError(f"{self.path}: unsupported manifest version or byte order")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.root = Path(header["root"])
+        self.classes = header["classes"]
+        self.sections = header["sections"]
+        self._count = header["count"]
+        view = memoryview(self._mmap)
+        self._offsets = self._section(view, "offsets")
+        self.labels = self._section(view, "labels")
+        self.sizes = self._section(view, "sizes") if "sizes" in self.sections else None
+        self._paths = self._section(view, "paths")
+
+    def _section(self, view, name):
+        section = self.sections[name]
+        data = view[section["offset"]:section["offset"] + section["length"]]
+        return data if section["typecode"] == "B" else data.cast(section["typecode"])
+
+    def __len__(self):
+        return self._count
+
+    def __repr__(self):
+        return f"Manifest({str(self.path)!r}, {self._count} images, {len(self.classes)} classes)"
+
+    def __getitem__(self, index):
+        """Return (Path, label) of an entry."""
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("manifest index out of range")
+        raw = self._paths[self._offsets[index]:self._offsets[index + 1]]
+        return self.root / bytes(raw).decode(), self.labels[index]
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Release the memory mapping."""
+        for name in ("_offsets", "labels", "sizes", "_paths"):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        self._mmap.close()
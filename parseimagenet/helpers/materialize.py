@@ -0,0 +1,169 @@
+import errno
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+STRATEGIES = ("hardlink", "symlink", "reflink", "copy")
+MATERIALIZE_WORKERS = 16
+JOURNAL_NAME = ".materialize-journal"
+JOURNAL_VERSION = 2
+# Files per task and per journal record
+_CHUNK = 256
+# Linux ioctl cloning a whole file (btrfs, XFS, bcachefs, ...)
+_FICLONE = 0x40049409
+_NO_REFLINK = (errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY, errno.EBADF)
+
+
+def materialize(items, out_dir, strategy="hardlink", max_workers=MATERIALIZE_WORKERS, resume=True):
+    """Build an ImageFolder-style tree out_dir/<wnid>/<file name> from image files.
+
+    Files are placed _CHUNK at a time on a thread pool, after creating every
+    class directory once up front. Each finished chunk is appended to a small
+    journal in out_dir, keyed by a digest of the job, so rerunning an
+    interrupted job with the same items skips the chunks already done and
+    rerunning a finished one does nothing. Files of unfinished chunks are
+    replaced, never trusted. Sources that do not exist are skipped and
+    recorded with their chunk, so a rerun reports them again without
+    retrying the chunk.
+
+    Args:
+        items: Iterable of (source Path, wnid) pairs. Repeated destinations
+               are placed once.
+        out_dir: Root directory of the tree.
+        strategy: "hardlink", "symlink" (absolute target), "reflink" (a
+                  copy-on-write clone where the file system supports it,
+                  else a copy) or "copy" (default: "hardlink").
+        max_workers: Threads placing files (default: MATERIALIZE_WORKERS).
+        resume: Continue from the journal of an identical earlier job
+                (default: True). If False, every file is placed again.
+
+    Returns:
+        Tuple of (placed, missing): the number of files placed by this call
+        and the list of source Paths of the job that do not exist, in item
+        order, including those recorded by an earlier run.
+
+    Raises:
+        ValueError: If strategy is unknown.
+        OSError: If an existing file cannot be placed, e.g. hardlinks across
+                 devices.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"strategy must be one of {STRATEGIES}, got {strategy!r}")
+    jobs = {}
+    for source, wnid in items:
+        jobs.setdefault(f"{wnid}/{Path(source).name}", source)
+    jobs = list(jobs.items())
+    chunks = [jobs[start:start + _CHUNK] for start in range(0, len(jobs), _CHUNK)]
+
+    digest = hashlib.blake2b(strategy.encode(), digest_size=16)
+    for destination, source in jobs:
+        digest.update(f"{source}\0{destination}\n".encode())
+    header = {"version": JOURNAL_VERSION, "strategy": strategy, "count": len(jobs), "digest": digest.hexdigest()}
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    journal_path = out_dir / JOURNAL_NAME
+    done = _read_journal(journal_path, header) if resume else {}
+    pending = [i for i in range(len(chunks)) if i not in done]
+
+    for wnid in {destination.partition('/')[0] for i in pending for destination, _ in chunks[i]}:
+        (out_dir / wnid).mkdir(exist_ok=True)
+
+    place = _PLACERS[strategy]
+    placed = 0
+    missing = dict(done)
+    # Rewritten in full, so a record torn by a crash is never appended to
+    with open(journal_path, 'w') as journal, ThreadPoolExecutor(max_workers) as pool:
+        journal.write(json.dumps(header) + "\n")
+        journal.writelines(json.dumps([i, *done[i]]) + "\n" for i in sorted(done))
+        journal.flush()
+        futures = {pool.submit(_place_chunk, chunks[i], out_dir, place): i for i in pending}
+        try:
+            for future in as_completed(futures):
+                i = futures[future]
+                count, missing[i] = future.result()
+                placed += count
+                journal.write(json.dumps([i, *missing[i]]) + "\n")
+                journal.flush()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return placed, [Path(source) for i in sorted(missing) for source in missing[i]]
+
+
+def _read_journal(path, header):
+    """Return {chunk number: missing sources} recorded for this job, or an empty dict."""
+    try:
+        with open(path) as f:
+            if json.loads(f.readline()) != header:
+                return {}
+            # A trailing record torn by a crash fails to parse and is dropped
+            records = [json.loads(line) for line in f if line.endswith("\n")]
+            return {record[0]: record[1:] for record in records}
+    except (OSError, ValueError):
+        return {}
+
+
+def _place_chunk(chunk, out_dir, place):
+    """Place a chunk of files; return (placed, missing sources as str)."""
+    missing = []
+    for destination, source in chunk:
+        source = Path(source)
+        try:
+            place(source, out_dir / destination)
+        except FileNotFoundError:
+            if source.exists():
+                raise
+            missing.append(str(source))
+    return len(chunk) - len(missing), missing
+
+
+def _hardlink(source, destination):
+    _link(os.link, source, destination)
+
+
+def _symlink(source, destination):
+    # os.symlink() would happily create a dangling link
+    if not source.exists():
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), str(source))
+    _link(os.symlink, os.path.abspath(source), destination)
+
+
+def _link(make, source, destination):
+    try:
+        make(source, destination)
+    except FileExistsError:
+        destination.unlink()
+        make(source, destination)
+
+
+def _copy(source, destination):
+    tmp_file = destination.with_name(destination.name + ".tmp")
+    shutil.copyfile(source, tmp_file)
+    os.replace(tmp_file, destination)
+
+
+def _reflink(source, destination):
+    if fcntl is None:
+        return _copy(source, destination)
+    tmp_file = destination.with_name(destination.name + ".tmp")
+    with open(source, 'rb') as src, open(tmp_file, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        except OSError as e:
+            if e.errno not in _NO_REFLINK:
+                raise
+            shutil.copyfileobj(src, dst)
+    os.replace(tmp_file, destination)
+
+
+_PLACERS = {"hardlink": _hardlink, "symlink": _symlink, "reflink": _reflink, "copy": _copy}
@@ -0,0 +1,63 @@
+import hashlib
+from collections.abc import Sequence
+
+_MASK64 = (1 << 64) - 1
+
+
+class FeistelPermutation(Sequence):
+    """A pseudo-random bijection of range(n), evaluated one index at a time.
+
+    Indices are encrypted with a Feistel network over the smallest number of
+    bits covering n, split into two halves whose widths swap every round
+    when the bit count is odd; results outside range(n) are encrypted again
+    (cycle walking) until they fall inside, which keeps the mapping a
+    bijection of range(n) at fewer than two encryptions per lookup on
+    average. The permutation itself takes O(1) memory, so any slice of it
+    can be computed without materializing the rest.
+
+    Args:
+        n: Size of the permuted range.
+        seed: Value the round keys are derived from (int, str or bytes).
+        rounds: Number of Feistel rounds, rounded up to an even number (default: 4).
+    """
+
+    def __init__(self, n, seed, rounds=4):
+        if n < 0:
+            raise ValueError(f"n must be non-negative, got {n}")
+        self.n = n
+        self.seed = seed
+        bits = max(2, (n - 1).bit_length())
+        self._widths = (bits - bits // 2, bits // 2)
+        self._keys = [
+            int.from_bytes(hashlib.blake2b(repr((seed, i)).encode(), digest_size=8).digest(), 'little')
+            for i in range(rounds + rounds % 2)
+        ]
+
+    def __len__(self):
+        return self.n
+
+    def __repr__(self):
+        return f"FeistelPermutation({self.n}, seed={self.seed!r})"
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.n))]
+        if index < 0:
+            index += self.n
+        if not 0 <= index < self.n:
+            raise IndexError("permutation index out of range")
+        value = self._encrypt(index)
+        while value >= self.n:
+            value = self._encrypt(value)
+        return value
+
+    def _encrypt(self, value):
+        left_bits, right_bits = self._widths
+        left, right = value >> right_bits, value & ((1 << right_bits) - 1)
+        for key in self._keys:
+            # (left, right) -> (right, left ^ F(right)); the halves swap widths
+            x = ((right ^ key) * 0x9E3779B97F4A7C15) & _MASK64
+            x = ((x ^ (x >> 29)) * 0xBF58476D1CE4E5B9) & _MASK64
+            left, right = right, left ^ ((x >> 32) & ((1 << left_bits) - 1))
+            left_bits, right_bits = right_bits, left_bits
+        return (left << right_bits) | right
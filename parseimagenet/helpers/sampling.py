@@ -1,49 +1,555 @@
+import hashlib
+import os
 import random
+from array import array
+from bisect import bisect_right
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate, islice
+from math import exp, floor, log
 
+from .alias import AliasTable
+from .category_index import CategoryIndex, _offset_typecode
+from .listing import DirectoryListingCache
+from .permutation import FeistelPermutation
 
-def collect_and_sample(category_images, matching_wnids, num_images, data_path):
+# Directories holding at least this many of the checked paths are listed once
+# instead of stat-ing every file
+SCAN_THRESHOLD = 16
+# Paths stat-ed per task when verifying in parallel
+_STAT_CHUNK = 64
+# Threads used by ImageNetSession to verify selected files
+VERIFY_WORKERS = 16
+
+
+def collect_and_sample(category_images, matching_wnids, num_images, data_path, listings=None, rng=None):
     """Gather all images for matching WNIDs, sample a subset, and resolve full paths.
 
     Args:
-        category_images: Dict mapping WNID to list of image stems.
+        category_images: CategoryIndex (or dict) mapping WNID to image stems.
         matching_wnids: List of WNIDs to collect images from.
         num_images: Maximum number of images to sample.
         data_path: Base data directory Path.
+        listings: Optional DirectoryListingCache reused across calls.
+        rng: Optional random.Random (default: the module-level random functions).
 
     Returns:
         Tuple of (full_paths, all_count) where full_paths is a list of Path objects
         and all_count is the total number of matching images available.
     """
-    all_matching_images = []
-    for wnid in matching_wnids:
-        all_matching_images.extend(category_images[wnid])
+    selected, total = sample_stems(category_images, matching_wnids, num_images, rng=rng)
+    return resolve_image_paths(selected, data_path, listings), total
+
+
+def sample_stems(category_images, matching_wnids, num_images, strategy="uniform", per_class=None, min_per_class=0,
+                 rng=None, lazy=False):
+    """Sample up to num_images stems from the matching classes.
 
-    if len(all_matching_images) > 0:
-        num_to_select = min(num_images, len(all_matching_images))
-        selected = random.sample(all_matching_images, num_to_select)
+    Positions are drawn uniformly from range(total) over the concatenation of
+    the matching classes and mapped back to (class, offset) by bisecting the
+    cumulative class counts, so the cost grows with num_images rather than
+    with the number of matching images. The draw is the same one random.sample
+    makes over the concatenated list, so seeded results are unchanged.
+
+    strategy "stratified" and "proportional" draw as sample_stratified().
+    rng is a random.Random (see make_rng()); None uses the module-level
+    random functions, so random.seed() keeps working. With lazy, the sample
+    is returned as a PositionStems view over a compact position array that
+    decodes stems on access.
+
+    Returns:
+        Tuple of (stems, all_count) where all_count is the total number of
+        matching images available.
+    """
+    counts = _class_counts(category_images, matching_wnids)
+    total = sum(counts)
+    if strategy != "uniform":
+        positions = _stratified_positions(matching_wnids, counts, num_images, per_class, min_per_class,
+                                          strategy == "proportional", rng)
+    elif total == 0:
+        positions = []
     else:
-        selected = []
-
-    # Resolve stems to full paths
-    full_paths = []
-    for stem in selected:
-        stem_path = data_path / stem
-        matches = list(stem_path.parent.glob(f"{stem_path.name}.*"))
-        if matches:
-            full_paths.append(matches[0])
-        else:
-            full_paths.append(stem_path)
+        positions = (rng or random).sample(range(total), min(num_images, total))
+    if lazy:
+        positions = array(_offset_typecode(total), positions)
+        return PositionStems(category_images, matching_wnids, positions, counts), total
+    return stems_at(category_images, matching_wnids, positions, counts), total
+
+
+def sample_excluding(start, stop, k, excluded, rng=None, taken=None):
+    """Draw up to k distinct ints from range(start, stop) that are not in excluded.
+
+    Values are drawn by rejection, which takes O(k) draws while at most half
+    of the range is excluded; denser ranges are enumerated instead. Either
+    way the cost is bounded by O(k + len(excluded)), not by the range size.
+
+    Args:
+        start, stop: Bounds of the range.
+        k: Number of values wanted.
+        excluded: Set of ints that must not be drawn.
+        rng: Optional random.Random (default: the module-level random functions).
+        taken: Number of excluded values inside the range, if already known;
+               counted from excluded otherwise.
+
+    Returns:
+        List of min(k, free values) ints in draw order.
+    """
+    rng = rng or random
+    size = stop - start
+    if taken is None:
+        taken = sum(start <= value < stop for value in excluded)
+    k = min(k, size - taken)
+    if k <= 0:
+        return []
+    if 2 * (taken + k) > size:
+        return rng.sample([value for value in range(start, stop) if value not in excluded], k)
+    chosen = {}
+    while len(chosen) < k:
+        value = start + rng.randrange(size)
+        if value not in excluded:
+            chosen[value] = None
+    return list(chosen)
+
+
+def sample_shard(category_images, matching_wnids, num_images, rank, world_size, key):
+    """Return one worker's shard of a uniform sample shared by world_size workers.
+
+    The global sample is the first num_images entries of a Feistel
+    permutation of the matching images keyed by key, so every worker agrees
+    on it without coordination. Worker rank takes every world_size-th entry
+    starting at rank, and computes only those, so a shard costs
+    O(num_images / world_size). Shards are disjoint and equally sized; the
+    remainder of num_images that does not divide evenly is dropped.
+
+    Args:
+        category_images: CategoryIndex (or dict) mapping WNID to image stems.
+        matching_wnids: List of WNIDs to sample from.
+        num_images: Size of the global sample.
+        rank: Index of this worker in range(world_size).
+        world_size: Number of workers.
+        key: Permutation seed shared by all workers.
+
+    Returns:
+        Tuple of (stems, all_count) where all_count is the total number of
+        matching images available.
+    """
+    counts = _class_counts(category_images, matching_wnids)
+    total = sum(counts)
+    permutation = FeistelPermutation(total, key)
+    stop = min(num_images, total) // world_size * world_size
+    return stems_at(category_images, matching_wnids, permutation[rank:stop:world_size], counts), total
+
+
+def shard_slice(items, rank, world_size):
+    """Return worker rank's equally sized share of items, interleaved like sample_shard()."""
+    return items[rank:len(items) // world_size * world_size:world_size]
+
+
+def stems_at(category_images, matching_wnids, positions, counts=None):
+    """Return the stems at positions in the concatenation of the matching classes.
+
+    Args:
+        category_images: CategoryIndex (or dict) mapping WNID to image stems.
+        matching_wnids: List of WNIDs, in concatenation order.
+        positions: Iterable of ints in range(total matching images).
+        counts: Per-class counts of matching_wnids, if already known.
+
+    Returns:
+        List of stems, one per position.
+    """
+    view = PositionStems(category_images, matching_wnids, (), counts)
+    return [view.stem_at(position) for position in positions]
+
+
+class PositionStems(Sequence):
+    """The stems at given positions of the matching classes, decoded on access.
+
+    Args:
+        category_images: CategoryIndex (or dict) mapping WNID to image stems.
+        matching_wnids: List of WNIDs, in concatenation order.
+        positions: Sequence of ints in range(total matching images).
+        counts: Per-class counts of matching_wnids, if already known.
+
+    Attributes:
+        positions: The positions given.
+        counts: List of per-class counts of matching_wnids.
+    """
+
+    def __init__(self, category_images, matching_wnids, positions, counts=None):
+        if counts is None:
+            counts = _class_counts(category_images, matching_wnids)
+        self.positions = positions
+        self._category_images = category_images
+        self._wnids = list(matching_wnids)
+        self.counts = counts
+        self._bounds = list(accumulate(counts))
+        self._starts = None
+        if isinstance(category_images, CategoryIndex):
+            self._starts = [category_images.row_range(wnid)[0] for wnid in matching_wnids]
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.stem_at(position) for position in self.positions[index]]
+        return self.stem_at(self.positions[index])
+
+    def stem_at(self, position):
+        """Return the stem at a position in the concatenation of the matching classes."""
+        i = bisect_right(self._bounds, position)
+        offset = position - self._bounds[i] + self.counts[i]
+        if self._starts is not None:
+            return self._category_images.stem(self._starts[i] + offset)
+        return self._category_images[self._wnids[i]][offset]
+
+
+def reservoir_sample(items, k, rng=None):
+    """Draw a uniform sample of k items from an iterable of unknown length.
+
+    Uses Li's Algorithm L: after the reservoir fills, the number of items to
+    skip before the next replacement is drawn directly, so random numbers are
+    only generated for the O(k log(n/k)) replacements. Memory is O(k). The
+    reservoir is shuffled at the end, so the result has the same distribution
+    as random.sample over the materialized items.
+
+    Args:
+        items: Iterable to sample from; consumed completely.
+        k: Sample size.
+        rng: Optional random.Random (default: the module-level random functions).
+
+    Returns:
+        Tuple of (sample, count) where count is the number of items seen.
+    """
+    rng = rng or random
+    iterator = iter(items)
+    reservoir = list(islice(iterator, k)) if k > 0 else []
+    count = len(reservoir)
+    if count == k and k > 0:
+        weight = exp(log(1.0 - rng.random()) / k)
+        while True:
+            skip = floor(log(1.0 - rng.random()) / log(1.0 - weight)) if weight < 1.0 else 0
+            skipped = sum(1 for _ in islice(iterator, skip))
+            count += skipped
+            item = next(iterator, _END) if skipped == skip else _END
+            if item is _END:
+                break
+            count += 1
+            reservoir[rng.randrange(k)] = item
+            weight *= exp(log(1.0 - rng.random()) / k)
+    else:
+        count += sum(1 for _ in iterator)
+    rng.shuffle(reservoir)
+    return reservoir, count
+
+
+_END = object()
+
+
+def sample_weighted(category_images, matching_wnids, num_images, class_weights, replacement=False, rng=None):
+    """Sample stems with per-class probabilities given by class_weights.
+
+    An AliasTable over the matching classes is built once, so every draw
+    picks its class in O(1) and then an image of that class uniformly.
+    Without replacement, each class keeps a sparse Fisher-Yates swap map so
+    its images are drawn without rejection, and a class that runs out is
+    removed by rebuilding the table over the remaining classes.
+
+    Args:
+        category_images: CategoryIndex (or dict) mapping WNID to image stems.
+        matching_wnids: List of WNIDs to sample from.
+        num_images: Number of draws; without replacement at most the number
+                    of images in classes with a positive weight.
+        class_weights: Dict mapping WNID to weight (missing WNIDs weigh 1.0),
+                       or a callable (wnid, count) -> weight.
+        replacement: Draw with replacement, so an image can repeat (default: False).
+        rng: Optional random.Random (default: the module-level random functions).
+
+    Returns:
+        Tuple of (stems, all_count) where all_count is the total number of
+        matching images available.
+
+    Raises:
+        ValueError: If a weight is negative or not finite.
+    """
+    rng = rng or random
+    rand = rng.random
+    counts = _class_counts(category_images, matching_wnids)
+    total = sum(counts)
+    weights = class_weight_list(class_weights, matching_wnids, counts)
+    weights = [weight if count else 0.0 for weight, count in zip(weights, counts)]
+    if not any(weights):
+        return [], total
+    # Draws are collected as ints: rows of a CategoryIndex, else positions in the concatenation
+    is_index = isinstance(category_images, CategoryIndex)
+    if is_index:
+        bases = [category_images.row_range(wnid)[0] for wnid in matching_wnids]
+    else:
+        bases = [0] + list(accumulate(counts))
+
+    def to_stems(picks):
+        if is_index:
+            return list(map(category_images.stem, picks))
+        return stems_at(category_images, matching_wnids, picks, counts)
+
+    if replacement:
+        picks = [bases[c] + int(rand() * counts[c]) for c in AliasTable(weights).sample(num_images, rng)]
+        return to_stems(picks), total
+
+    limit = min(num_images, sum(count for weight, count in zip(weights, counts) if weight))
+    taken = [0] * len(counts)
+    swaps = [{} for _ in counts]
+    table = AliasTable(weights)
+    prob, alias, n = table.prob, table.alias, len(counts)
+    picks = []
+    while len(picks) < limit:
+        u = rand() * n
+        c = int(u)
+        if u - c >= prob[c]:
+            c = alias[c]
+        t = taken[c]
+        if t == counts[c]:
+            # Exhausted class: drop it from the distribution
+            weights[c] = 0.0
+            table = AliasTable(weights)
+            prob, alias = table.prob, table.alias
+            continue
+        swap = swaps[c]
+        j = t + int(rand() * (counts[c] - t))
+        picks.append(bases[c] + swap.get(j, j))
+        swap[j] = swap.get(t, t)
+        taken[c] = t + 1
+    return to_stems(picks), total
+
+
+def class_weight_list(class_weights, matching_wnids, counts):
+    """Return the weight of every matching class from a dict or a (wnid, count) callable."""
+    if callable(class_weights):
+        weights = [float(class_weights(wnid, count)) for wnid, count in zip(matching_wnids, counts)]
+    else:
+        weights = [float(class_weights.get(wnid, 1.0)) for wnid in matching_wnids]
+    if any(not 0 <= weight < float("inf") for weight in weights):
+        raise ValueError("class_weights must be finite and non-negative")
+    return weights
+
+
+def sample_stratified(category_images, matching_wnids, num_images, per_class=None, min_per_class=0,
+                      proportional=False, rng=None):
+    """Sample a fixed quota of stems from every matching class.
+
+    Quotas are computed from the per-class counts alone (see allocate_quotas());
+    each class then draws its quota of row offsets with random.sample, so no
+    image list is ever built. Stems are returned grouped by class in
+    matching_wnids order.
+
+    Every class draws from its own substream, derived from one value taken
+    from rng and the class's WNID, so a class's sample does not depend on
+    the order in which classes are processed.
+
+    Args:
+        category_images: CategoryIndex (or dict) mapping WNID to image stems.
+        matching_wnids: List of WNIDs to sample from.
+        num_images: Total budget, split equally (or by class size when
+                    proportional) across classes. Ignored when per_class is set.
+        per_class: Images per class, fewer for classes with fewer images; no
+                   class gets more than max(per_class, min_per_class).
+        min_per_class: Minimum images per class, honoured even beyond the budget.
+        proportional: Split num_images in proportion to class sizes.
+        rng: Optional random.Random (default: the module-level random functions).
+
+    Returns:
+        Tuple of (stems, all_count) where all_count is the total number of
+        matching images available.
+    """
+    counts = _class_counts(category_images, matching_wnids)
+    positions = _stratified_positions(matching_wnids, counts, num_images, per_class, min_per_class, proportional, rng)
+    return stems_at(category_images, matching_wnids, positions, counts), sum(counts)
+
+
+def _stratified_positions(matching_wnids, counts, num_images, per_class, min_per_class, proportional, rng):
+    """Positions of a stratified sample in the concatenation of the matching classes."""
+    total = per_class * len(counts) if per_class is not None else num_images
+    quotas = allocate_quotas(counts, total, weights=counts if proportional and per_class is None else None,
+                             minimum=min_per_class, maximum=per_class)
+    root = (rng or random).getrandbits(64)
+    positions = []
+    start = 0
+    for wnid, count, quota in zip(matching_wnids, counts, quotas):
+        if quota:
+            positions.extend(start + offset for offset in substream(root, wnid).sample(range(count), quota))
+        start += count
+    return positions
+
+
+def make_rng(seed=None, rng=None):
+    """Return the generator a query samples with.
+
+    Args:
+        seed: Seed for a private random.Random, or None.
+        rng: A random.Random to use directly, or None.
+
+    Returns:
+        rng when given, else random.Random(seed) when seed is given, else None,
+        meaning the module-level random functions (seeded by random.seed()).
+
+    Raises:
+        ValueError: If both seed and rng are given.
+    """
+    if seed is not None and rng is not None:
+        raise ValueError("Pass either seed or rng, not both")
+    if rng is not None:
+        return rng
+    if seed is not None:
+        return random.Random(seed)
+    return None
+
 
-    return full_paths, len(all_matching_images)
+def substream(root, *keys):
+    """Return an independent random.Random identified by a root value and keys.
+
+    The substream is seeded with a hash of root and keys, so it is the same
+    whichever thread creates it and in whatever order. Draw root once from
+    the parent generator before fanning work out.
+
+    Args:
+        root: int taken from the parent generator (e.g. rng.getrandbits(64)).
+        keys: Strings or ints naming the substream (a WNID, a query name...).
+    """
+    digest = hashlib.blake2b(repr((root,) + keys).encode(), digest_size=8).digest()
+    return random.Random(int.from_bytes(digest, 'little'))
 
 
-def count_existing(paths):
+def allocate_quotas(counts, total, weights=None, minimum=0, maximum=None):
+    """Split a sample budget across classes without exceeding any class's size.
+
+    Every class first receives min(minimum, count). The rest of the budget is
+    shared by weight (equally when weights is None) using largest remainders;
+    whatever a short class cannot take is redistributed over the classes that
+    still have room, until the budget or the room runs out.
+
+    Args:
+        counts: Number of available images per class.
+        total: Total number of images to allocate.
+        weights: Optional per-class weights (e.g. counts for proportional quotas).
+        minimum: Minimum quota per class, allocated even when it exceeds total.
+        maximum: Optional cap on any quota beyond minimum; budget a class
+                 cannot take under the cap is left unallocated.
+
+    Returns:
+        List of per-class quotas.
+    """
+    quotas = [min(minimum, count) for count in counts]
+    if maximum is not None:
+        counts = [max(min(count, maximum), quota) for count, quota in zip(counts, quotas)]
+    remaining = min(total, sum(counts)) - sum(quotas)
+    if weights is None:
+        weights = [1] * len(counts)
+    active = [c for c, count in enumerate(counts) if quotas[c] < count and weights[c] > 0]
+    while remaining > 0 and active:
+        weight_sum = sum(weights[c] for c in active)
+        shares = [remaining * weights[c] / weight_sum for c in active]
+        given = [int(share) for share in shares]
+        leftover = remaining - sum(given)
+        by_remainder = sorted(range(len(active)), key=lambda i: given[i] - shares[i])
+        for i in by_remainder[:leftover]:
+            given[i] += 1
+        still_active = []
+        for c, share in zip(active, given):
+            take = min(share, counts[c] - quotas[c])
+            quotas[c] += take
+            remaining -= take
+            if quotas[c] < counts[c]:
+                still_active.append(c)
+        active = still_active
+    return quotas
+
+
+def _class_counts(category_images, matching_wnids):
+    """Per-class image counts, read in O(1) per class from a CategoryIndex."""
+    if isinstance(category_images, CategoryIndex):
+        return [category_images.count(wnid) for wnid in matching_wnids]
+    return [len(category_images[wnid]) for wnid in matching_wnids]
+
+
+def resolve_image_paths(stems, data_path, listings=None, assume_extension=False):
+    """Resolve image stems to full paths, keeping the bare stem path when no file matches.
+
+    Each directory is listed once per call (or once per listings cache)
+    instead of globbing it for every stem.
+
+    Args:
+        stems: List of image stems relative to data_path.
+        data_path: Base data directory Path.
+        listings: Optional DirectoryListingCache reused across calls.
+        assume_extension: Use the extension verified by listings.verify_extension()
+                          without touching the file system.
+    """
+    if listings is None:
+        listings = DirectoryListingCache()
+    return listings.resolve(stems, data_path, assume_extension)
+
+
+def count_existing(paths, max_workers=None):
     """Return count of paths that exist on disk.
 
     Args:
         paths: Iterable of Path objects.
+        max_workers: Threads used to check the files (default: None, serial).
 
     Returns:
         int count of existing files.
     """
-    return sum(1 for p in paths if p.exists())
+    return verify_paths(paths, max_workers)[0]
+
+
+def verify_paths(paths, max_workers=None, scan_threshold=SCAN_THRESHOLD):
+    """Check which paths exist on disk.
+
+    Paths are grouped by directory. A directory holding at least
+    scan_threshold of them is listed with one os.scandir; the rest are
+    stat-ed individually in chunks. With max_workers the directory listings
+    and stat chunks run on a thread pool, which hides the latency of network
+    storage.
+
+    Args:
+        paths: Iterable of Path objects.
+        max_workers: Threads used to check the files (default: None, serial).
+        scan_threshold: Paths per directory from which the directory is listed
+                        instead of stat-ing each file.
+
+    Returns:
+        Tuple of (existing_count, missing) where missing lists the paths that
+        do not exist, in input order.
+    """
+    paths = list(paths)
+    groups = {}
+    for i, path in enumerate(paths):
+        groups.setdefault(path.parent, []).append(i)
+
+    tasks = []
+    loose = []
+    for directory, indices in groups.items():
+        if len(indices) >= scan_threshold:
+            tasks.append((directory, indices))
+        else:
+            loose.extend(indices)
+    tasks.extend((None, loose[i:i + _STAT_CHUNK]) for i in range(0, len(loose), _STAT_CHUNK))
+
+    def check(task):
+        directory, indices = task
+        if directory is None:
+            return [i for i in indices if not paths[i].exists()]
+        try:
+            with os.scandir(directory) as entries:
+                names = {entry.name for entry in entries}
+        except OSError:
+            names = set()
+        return [i for i in indices if paths[i].name not in names]
+
+    if max_workers and len(tasks) > 1:
+        with ThreadPoolExecutor(max_workers) as executor:
+            results = list(executor.map(check, tasks))
+    else:
+        results = list(map(check, tasks))
+    missing = sorted(i for indices in results for i in indices)
+    return len(paths) - len(missing), [paths[i] for i in missing]
@@ -0,0 +1,109 @@
+import random
+from array import array
+from itertools import accumulate, compress
+
+from .category_index import _offset_typecode
+from .sampling import allocate_quotas
+
+# Labels are single bytes; 255 marks ids being moved between parts
+MAX_PARTS = 255
+_MOVING = 255
+# Resolution of the initial random labels: weights are quantized to 1/65536
+_LEVELS = 1 << 16
+
+
+def validate_ratios(ratios):
+    """Return split weights for ratios, plus a trailing leftover weight when they sum to less than 1.
+
+    Raises:
+        ValueError: If a ratio is not positive or the ratios sum to more than 1.
+    """
+    ratios = [float(ratio) for ratio in ratios]
+    if not ratios or any(ratio <= 0 for ratio in ratios):
+        raise ValueError(f"ratios must be positive, got {ratios}")
+    total = sum(ratios)
+    if total > 1 + 1e-9:
+        raise ValueError(f"ratios must sum to at most 1, got {total}")
+    return ratios + [1.0 - total] if total < 1 - 1e-9 else ratios
+
+
+def split_ids(counts, weights, rng=None, stratified=False):
+    """Partition the ids range(sum(counts)) into disjoint parts sized by weights.
+
+    Ids are positions in the concatenation of classes with the given counts.
+    Part sizes are exact: largest-remainder shares of the whole pool, or of
+    every class when stratified. Instead of shuffling a list of ids, every id
+    draws a 16-bit random value that a lookup table maps to a part label,
+    which runs at C speed over one bytes object; the few ids that make a
+    part over- or under-full are then moved between parts at random. Labels
+    are exchangeable across ids, so the result is a uniformly random
+    partition with the requested sizes.
+
+    Args:
+        counts: Per-class image counts.
+        weights: Positive part weights (at most MAX_PARTS of them).
+        rng: Optional random.Random (default: the module-level random functions).
+        stratified: Split every class by weights instead of the pool as a whole.
+
+    Returns:
+        List of compact id arrays, one per weight, each in ascending id order.
+    """
+    if len(weights) > MAX_PARTS:
+        raise ValueError(f"At most {MAX_PARTS} parts are supported, got {len(weights)}")
+    rng = rng or random
+    total = sum(counts)
+    typecode = _offset_typecode(total)
+    if total == 0:
+        return [array(typecode) for _ in weights]
+
+    # Initial labels: one 16-bit draw per id, mapped to a part through a table
+    bounds = [round(bound * _LEVELS / sum(weights)) for bound in accumulate(weights)]
+    table = bytearray(_LEVELS)
+    for part, (start, stop) in enumerate(zip([0] + bounds, bounds)):
+        table[start:stop] = bytes([part]) * (stop - start)
+    draws = array('H')
+    draws.frombytes(rng.getrandbits(16 * total).to_bytes(2 * total, 'little'))
+    labels = bytearray(map(table.__getitem__, draws))
+
+    # Fix up part sizes within every group (the whole pool, or each class)
+    if stratified:
+        starts = [0] + list(accumulate(counts))
+        groups = [(start, stop) for start, stop in zip(starts, starts[1:]) if stop > start]
+    else:
+        groups = [(0, total)]
+    for rotation, (start, stop) in enumerate(groups):
+        _fix_sizes(labels, start, stop, weights, rng, rotation % len(weights))
+
+    parts = []
+    for part in range(len(weights)):
+        mask = labels.translate(bytes(int(label == part) for label in range(256)))
+        parts.append(array(typecode, compress(range(total), mask)))
+    return parts
+
+
+def _fix_sizes(labels, start, stop, weights, rng, rotation=0):
+    """Relabel random ids in labels[start:stop] so every part gets its exact quota.
+
+    Rounding ties go to the earliest part; rotating the part order from group
+    to group spreads them evenly when many small classes are split.
+    """
+    size = stop - start
+    rotated = weights[rotation:] + weights[:rotation]
+    quotas = allocate_quotas([size] * len(weights), size, weights=rotated)
+    quotas = quotas[len(weights) - rotation:] + quotas[:len(weights) - rotation]
+    moving = []
+    for part, quota in enumerate(quotas):
+        surplus = labels.count(part, start, stop) - quota
+        while surplus > 0:
+            i = rng.randrange(start, stop)
+            if labels[i] == part:
+                labels[i] = _MOVING
+                moving.append(i)
+                surplus -= 1
+    if not moving:
+        return
+    rng.shuffle(moving)
+    for part, quota in enumerate(quotas):
+        deficit = quota - labels.count(part, start, stop)
+        for _ in range(deficit):
+            labels[moving.pop()] = part
@@ -1,5 +1,9 @@
+import re
+from array import array
+from collections import Counter
 from pathlib import Path
 
+
 def get_synset_mapping(base_path):
     """Read LOC_synset_mapping.txt and return a WNID-to-category-name mapping.
 
@@ -17,3 +21,179 @@ def get_synset_mapping(base_path):
             if len(parts) == 2:
                 synset_mapping[parts[0]] = parts[1]
     return synset_mapping
+
+
+_TOKEN = re.compile(r'\w+')
+_MAX_NGRAM = 3
+
+
+class SynsetTokenIndex:
+    """Inverted index from lowercased name tokens and token n-grams to classes.
+
+    Every synset name is split into word tokens, and each run of up to
+    max_ngram consecutive tokens ("golden", "golden retriever", ...) maps to
+    the positions of the classes containing it. Looking up a keyword is then a
+    few dict hits and set intersections instead of a scan over every name.
+
+    The index only narrows the search: candidates() returns a superset of the
+    classes a keyword matches, which callers confirm with the exact matcher.
+    Names containing non-ASCII characters are always returned as candidates,
+    because Unicode case folding does not line up with re.IGNORECASE.
+
+    Attributes:
+        wnids: List of WNIDs in synset mapping order.
+        names: List of category names, parallel to wnids.
+        max_ngram: Longest token run indexed as one key.
+    """
+
+    def __init__(self, synset_mapping, max_ngram=_MAX_NGRAM):
+        self.wnids = list(synset_mapping)
+        self.names = list(synset_mapping.values())
+        self.max_ngram = max_ngram
+        self._postings = {}
+        unindexed = []
+        for position, name in enumerate(self.names):
+            if not name.isascii():
+                unindexed.append(position)
+                continue
+            tokens = _tokenize(name)
+            for size in range(1, max_ngram + 1):
+                for start in range(len(tokens) - size + 1):
+                    self._postings.setdefault(tuple(tokens[start:start + size]), set()).add(position)
+        self._unindexed = frozenset(unindexed)
+
+    def __len__(self):
+        return len(self.wnids)
+
+    def __repr__(self):
+        return f"SynsetTokenIndex({len(self.wnids)} classes, {len(self._postings)} keys)"
+
+    def candidates(self, keyword):
+        """Return positions of classes whose name may contain keyword as a whole word.
+
+        Args:
+            keyword: Keyword string.
+
+        Returns:
+            Set of positions into wnids, or None when the keyword cannot be looked
+            up (no word characters, or non-ASCII) and every class is a candidate.
+        """
+        if not keyword.isascii():
+            return None
+        tokens = _tokenize(keyword)
+        if not tokens:
+            return None
+        size = min(len(tokens), self.max_ngram)
+        found = None
+        for start in range(len(tokens) - size + 1):
+            postings = self._postings.get(tuple(tokens[start:start + size]))
+            if postings is None:
+                found = set()
+                break
+            found = set(postings) if found is None else found & postings
+        return found | self._unindexed
+
+
+FUZZY_THRESHOLD = 0.4
+
+
+class SynsetTrigramIndex:
+    """Character trigram index over synset names for fuzzy keyword matching.
+
+    Every comma-separated synonym of a class, and every word in it, is one
+    match unit. Units are compared with a keyword by the Jaccard similarity of
+    their padded trigram sets (as in PostgreSQL's pg_trgm), so "warragal"
+    finds "warrigal" and "chihuahua" finds "Chihuahua dog". Multi-word
+    keywords are only compared with whole synonyms, so "labrador retriever"
+    does not match every retriever through the word "retriever". The index
+    maps each trigram to the units containing it, so only units sharing a
+    trigram with the keyword are scored.
+
+    Attributes:
+        wnids: List of WNIDs in synset mapping order.
+    """
+
+    def __init__(self, synset_mapping):
+        self.wnids = list(synset_mapping)
+        unit_of = {}
+        self._unit_sizes = array('i')
+        self._unit_is_word = array('b')
+        self._unit_classes = []
+        self._postings = {}
+        for position, name in enumerate(synset_mapping.values()):
+            for synonym in name.split(","):
+                words = _tokenize(synonym)
+                if not words:
+                    continue
+                # A word of a multi-word synonym is its own unit, kept apart from the same text as a synonym
+                units = [(" ".join(words), False)]
+                if len(words) > 1:
+                    units.extend((word, True) for word in dict.fromkeys(words))
+                for key in units:
+                    unit = unit_of.get(key)
+                    if unit is None:
+                        unit = unit_of[key] = len(self._unit_classes)
+                        grams = _trigrams(key[0])
+                        self._unit_sizes.append(len(grams))
+                        self._unit_is_word.append(key[1])
+                        self._unit_classes.append([])
+                        for gram in grams:
+                            self._postings.setdefault(gram, array('i')).append(unit)
+                    classes = self._unit_classes[unit]
+                    if not classes or classes[-1] != position:
+                        classes.append(position)
+
+    def __len__(self):
+        return len(self.wnids)
+
+    def __repr__(self):
+        return f"SynsetTrigramIndex({len(self.wnids)} classes, {len(self._unit_classes)} units)"
+
+    def search(self, keyword, threshold=FUZZY_THRESHOLD):
+        """Rank classes by their best unit's similarity to keyword.
+
+        Args:
+            keyword: Keyword string.
+            threshold: Minimum similarity in [0, 1] a class must reach.
+
+        Returns:
+            List of (wnid, similarity) tuples, most similar first.
+        """
+        tokens = _tokenize(keyword)
+        grams = _trigrams(" ".join(tokens))
+        if not grams:
+            return []
+        whole_only = len(tokens) > 1
+        shared = Counter()
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings is not None:
+                shared.update(postings)
+
+        best = {}
+        for unit, common in shared.items():
+            if whole_only and self._unit_is_word[unit]:
+                continue
+            similarity = common / (len(grams) + self._unit_sizes[unit] - common)
+            if similarity >= threshold:
+                for position in self._unit_classes[unit]:
+                    if similarity > best.get(position, 0.0):
+                        best[position] = similarity
+        ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))
+        return [(self.wnids[position], similarity) for position, similarity in ranked]
+
+
+def _trigrams(text):
+    """Return the set of trigrams of text padded as "  text ".
+
+    Trigrams spanning the space between two words are kept, so phrases that
+    merely share a word ("american alligator", "alligator lizard") score
+    lower than phrases that match as a whole.
+    """
+    padded = f"  {' '.join(text.split())} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _tokenize(text):
+    """Split text into lowercased word tokens, matching the regex \\w class."""
+    return _TOKEN.findall(text.lower())
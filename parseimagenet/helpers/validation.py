@@ -57,4 +57,135 @@ def _resolve_search_keywords(preset, keywords, keyword_presets):
         return None
 
 
+def validate_hypernyms(hypernyms):
+    """Validate a hypernym selection.
 
+    Args:
+        hypernyms: List of WNID strings, or None.
+
+    Returns:
+        The hypernym list, or None when no hierarchy selection is requested.
+
+    Raises:
+        TypeError: If hypernyms is not a list.
+    """
+    if hypernyms is None:
+        return None
+    if isinstance(hypernyms, str):
+        raise TypeError("hypernyms must be a list of WNIDs, not a single string. Use hypernyms=['n01503061'] instead.")
+    if not isinstance(hypernyms, list):
+        raise TypeError("hypernyms must be a list of WNIDs.")
+    return hypernyms
+
+
+def validate_fuzzy(fuzzy, default_threshold):
+    """Resolve the fuzzy matching option to a similarity threshold.
+
+    Args:
+        fuzzy: False/None to disable, True for default_threshold, or a float in (0, 1].
+        default_threshold: Threshold used when fuzzy is True.
+
+    Returns:
+        float threshold, or None when fuzzy matching is disabled.
+
+    Raises:
+        TypeError: If fuzzy is not a bool or number.
+        ValueError: If a numeric threshold is outside (0, 1].
+    """
+    if fuzzy is None or fuzzy is False:
+        return None
+    if fuzzy is True:
+        return default_threshold
+    if not isinstance(fuzzy, (int, float)):
+        raise TypeError("fuzzy must be a bool or a similarity threshold between 0 and 1.")
+    if not 0 < fuzzy <= 1:
+        raise ValueError(f"fuzzy threshold must be in (0, 1], got {fuzzy}")
+    return float(fuzzy)
+
+
+def validate_strategy(strategy, per_class, min_per_class):
+    """Validate the sampling strategy and its quota options.
+
+    Args:
+        strategy: "uniform", "stratified" or "proportional".
+        per_class: Images per class for the stratified strategies, or None.
+        min_per_class: Minimum images per class for the stratified strategies.
+
+    Raises:
+        ValueError: If strategy is unknown, a quota is negative, or quotas are
+                    given for uniform sampling.
+        TypeError: If a quota is not an int.
+    """
+    valid_strategies = ("uniform", "stratified", "proportional")
+    if strategy not in valid_strategies:
+        raise ValueError(f"Unknown strategy '{strategy}'. Must be one of: {list(valid_strategies)}")
+    for name, value in (("per_class", per_class), ("min_per_class", min_per_class)):
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise TypeError(f"{name} must be an int.")
+        if value < 0:
+            raise ValueError(f"{name} must be non-negative, got {value}")
+    if strategy == "uniform" and (per_class is not None or min_per_class):
+        raise ValueError("per_class and min_per_class require strategy='stratified' or 'proportional'")
+
+
+def validate_class_weights(class_weights, replacement, strategy, stream):
+    """Validate weighted class sampling options.
+
+    Args:
+        class_weights: Dict mapping WNID to weight, a (wnid, count) -> weight
+                       callable, or None.
+        replacement: Whether weighted draws may repeat images.
+        strategy: Sampling strategy; weighting needs "uniform".
+        stream: Whether the query streams the annotation file.
+
+    Raises:
+        TypeError: If class_weights is neither a dict nor callable.
+        ValueError: If class_weights is combined with another strategy or
+                    stream, or replacement is given without class_weights.
+    """
+    if class_weights is None:
+        if replacement:
+            raise ValueError("replacement=True requires class_weights")
+        return
+    if not (isinstance(class_weights, dict) or callable(class_weights)):
+        raise TypeError("class_weights must be a dict of WNID -> weight or a callable (wnid, count) -> weight.")
+    if strategy != "uniform" or stream:
+        raise ValueError("class_weights cannot be combined with a stratified strategy or stream=True")
+
+
+def validate_shard(rank, world_size):
+    """Validate a worker's shard of a distributed sample.
+
+    Args:
+        rank: Index of this worker, or None.
+        world_size: Number of workers, or None.
+
+    Raises:
+        ValueError: If only one of rank and world_size is given or rank is
+                    outside range(world_size).
+        TypeError: If rank or world_size is not an int.
+    """
+    if rank is None and world_size is None:
+        return
+    if rank is None or world_size is None:
+        raise ValueError("rank and world_size must be given together")
+    for name, value in (("rank", rank), ("world_size", world_size)):
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise TypeError(f"{name} must be an int.")
+    if world_size < 1 or not 0 <= rank < world_size:
+        raise ValueError(f"rank must be in range(world_size), got rank={rank}, world_size={world_size}")
+
+
+def validate_batch_size(batch_size):
+    """Validate an optional batch size.
+
+    Args:
+        batch_size: Number of items per batch, or None for single items.
+
+    Raises:
+        ValueError: If batch_size is not None or a positive int.
+    """
+    if batch_size is not None and (isinstance(batch_size, bool) or not isinstance(batch_size, int) or batch_size < 1):
+        raise ValueError(f"batch_size must be a positive int, got {batch_size!r}")
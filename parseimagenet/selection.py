@@ -0,0 +1,262 @@
+import random
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+from pathlib import Path
+
+from .helpers.manifest import write_manifest
+from .helpers.materialize import MATERIALIZE_WORKERS, materialize
+from .helpers.permutation import FeistelPermutation
+from .helpers.sampling import make_rng, stems_at
+from .helpers.splits import split_ids, validate_ratios
+from .helpers.validation import validate_batch_size
+
+
+class Selection:
+    """The images matching a query, addressed by compact integer ids.
+
+    Image ids are positions 0..len(selection)-1 in the concatenation of the
+    matching classes in wnids order, so a subset of the selection can be
+    held as an array of ints and turned into stems or paths only when needed.
+    Create one with ImageNetSession.select() or get_selection().
+
+    Attributes:
+        session: ImageNetSession the selection was made from.
+        source: "train" or "val".
+        category_images: CategoryIndex holding at least the matching classes.
+        wnids: Matching WNIDs, in id order.
+        counts: Number of images of each class in wnids.
+    """
+
+    def __init__(self, session, source, category_images, wnids):
+        self.session = session
+        self.source = source
+        self.category_images = category_images
+        self.wnids = list(wnids)
+        self.counts = [category_images.count(wnid) for wnid in self.wnids]
+
+    def __len__(self):
+        return sum(self.counts)
+
+    def __repr__(self):
+        return f"Selection({self.source!r}, {len(self.wnids)} classes, {len(self)} images)"
+
+    def stems(self, ids):
+        """Return the image stems of the given ids."""
+        return stems_at(self.category_images, self.wnids, ids, self.counts)
+
+    def paths(self, ids):
+        """Return the resolved image paths of the given ids."""
+        return self.session.resolve_paths(self.stems(ids), self.source)
+
+    def split(self, ratios, seed=None, rng=None, stratified=False):
+        """Split the selection into disjoint random parts.
+
+        Args:
+            ratios: Fraction of the images in each part, e.g. (0.8, 0.1, 0.1).
+                    Images beyond a total below 1 are left out.
+            seed: Seed for a private random.Random (default: None).
+            rng: random.Random to use instead of seed (default: None, the
+                 module-level random functions).
+            stratified: Apply the ratios to every class rather than to the
+                        pool as a whole (default: False).
+
+        Returns:
+            List of id arrays, one per ratio, each in ascending id order.
+
+        Raises:
+            ValueError: If a ratio is not positive or the ratios sum to more than 1.
+        """
+        weights = validate_ratios(ratios)
+        parts = split_ids(self.counts, weights, make_rng(seed, rng), stratified)
+        return parts[:len(ratios)]
+
+    def kfold(self, k, seed=None, rng=None, stratified=False):
+        """Split the selection into k disjoint folds of (nearly) equal size.
+
+        Takes the same seed, rng and stratified arguments as split(). Fold i
+        is the held-out part of round i; the other folds form its training set.
+
+        Returns:
+            List of k id arrays covering every image once.
+
+        Raises:
+            ValueError: If k is not an integer of at least 2.
+        """
+        if not isinstance(k, int) or isinstance(k, bool) or k < 2:
+            raise ValueError(f"k must be an integer of at least 2, got {k!r}")
+        return split_ids(self.counts, [1] * k, make_rng(seed, rng), stratified)
+
+    def epochs(self, seed=None, batch_size=None, epoch=0, position=0):
+        """Return an EpochIterator making endless reshuffled passes over the selection."""
+        return EpochIterator(self, seed, batch_size, epoch, position)
+
+    def export_manifest(self, path, ids=None, with_sizes=False, max_workers=None):
+        """Write images of the selection to a memory-mappable binary manifest.
+
+        Labels index the sorted WNIDs of the selection, the same class order
+        as torchvision's ImageFolder. Read the file back with Manifest.
+
+        Args:
+            path: Destination Path.
+            ids: Ids to export, in manifest order (default: None, all images).
+            with_sizes: Also record each file's size in bytes, -1 if it is
+                        missing (default: False).
+            max_workers: Threads used to stat files for with_sizes
+                         (default: None, serial).
+
+        Returns:
+            Number of images written.
+        """
+        if ids is None:
+            ids = range(len(self))
+        _, data_path = self.session.paths(self.source)
+        return write_manifest(path, data_path, self._manifest_entries(ids, data_path, with_sizes, max_workers),
+                              sorted(self.wnids), with_sizes)
+
+    def materialize(self, out_dir, ids=None, strategy="hardlink", max_workers=MATERIALIZE_WORKERS, resume=True):
+        """Link or copy images of the selection into an out_dir/<wnid>/<file> tree.
+
+        Takes the same strategy, max_workers and resume arguments as
+        helpers.materialize.materialize(); an interrupted call resumes where
+        it stopped when repeated with the same ids. Images whose files are
+        missing are skipped.
+
+        Args:
+            out_dir: Root directory of the tree.
+            ids: Ids to place (default: None, all images).
+
+        Returns:
+            Tuple of (placed, missing): the number of files placed by this
+            call and the list of image Paths that do not exist.
+        """
+        if ids is None:
+            ids = range(len(self))
+        items = [item for paths, wnids in self._labelled_chunks(ids) for item in zip(paths, wnids)]
+        return materialize(items, out_dir, strategy, max_workers, resume)
+
+    def ids_of(self, paths):
+        """Return the ids of resolved image paths of the selection.
+
+        Builds a lookup over every image of the selection, so keep ids rather
+        than paths where possible.
+
+        Raises:
+            KeyError: If a path is not part of the selection.
+        """
+        _, data_path = self.session.paths(self.source)
+        lookup = {stem: image_id for image_id, stem in enumerate(self.stems(range(len(self))))}
+        return [lookup[Path(path).relative_to(data_path).with_suffix('').as_posix()] for path in paths]
+
+    def _labelled_chunks(self, ids):
+        """Yield (paths, wnids) lists of ids, resolving _EXPORT_CHUNK paths at a time."""
+        bounds = list(accumulate(self.counts))
+        for start in range(0, len(ids), _EXPORT_CHUNK):
+            chunk = ids[start:start + _EXPORT_CHUNK]
+            yield self.paths(chunk), [self.wnids[bisect_right(bounds, image_id)] for image_id in chunk]
+
+    def _manifest_entries(self, ids, data_path, with_sizes, max_workers):
+        codes = {wnid: code for code, wnid in enumerate(sorted(self.wnids))}
+        with ThreadPoolExecutor(max_workers or 1) as pool:
+            for paths, wnids in self._labelled_chunks(ids):
+                sizes = pool.map(_file_size, paths) if with_sizes else paths
+                for path, wnid, size in zip(paths, wnids, sizes):
+                    yield str(path.relative_to(data_path)), codes[wnid], size
+
+
+_EXPORT_CHUNK = 65536
+
+
+def _file_size(path):
+    try:
+        return path.stat().st_size
+    except OSError:
+        return -1
+
+
+class EpochIterator:
+    """Endless passes over a Selection, in a fresh pseudo-random order every epoch.
+
+    Epoch e visits every image exactly once, in the order of a
+    FeistelPermutation of the image ids keyed by (seed, e), so no shuffled
+    list is ever built: each id is computed when it is reached and paths are
+    resolved _CHUNK at a time. The complete iteration state is the
+    (seed, epoch, position) triple, which state_dict() exports and
+    load_state_dict() restores, so a preempted job resumes mid-epoch at the
+    exact next image.
+
+    Args:
+        selection: Selection to iterate over.
+        seed: Seed of the per-epoch permutations (default: None, a random one).
+        batch_size: If given, yield lists of up to batch_size paths; the last
+                    batch of an epoch may be smaller (default: None).
+        epoch: Epoch to start at (default: 0).
+        position: Number of images of that epoch already consumed (default: 0).
+
+    Attributes:
+        seed, epoch, position: The iteration state.
+    """
+
+    _CHUNK = 256
+
+    def __init__(self, selection, seed=None, batch_size=None, epoch=0, position=0):
+        validate_batch_size(batch_size)
+        self.selection = selection
+        self.batch_size = batch_size
+        self._size = len(selection)
+        self.load_state_dict({
+            "seed": random.getrandbits(64) if seed is None else seed,
+            "epoch": epoch,
+            "position": position,
+        })
+
+    def __repr__(self):
+        return f"EpochIterator(seed={self.seed!r}, epoch={self.epoch}, position={self.position}/{self._size})"
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._size == 0:
+            raise StopIteration
+        if self.position >= self._size:
+            self.epoch += 1
+            self.position = 0
+            self._buffer = []
+        if self.batch_size is None:
+            if not self._buffer:
+                self._fill(self._CHUNK)
+            self.position += 1
+            return self._buffer.pop()
+        batch = self.selection.paths(self._ids(self.batch_size))
+        self.position += len(batch)
+        return batch
+
+    def state_dict(self):
+        """Return the iteration state as a small dict."""
+        return {"seed": self.seed, "epoch": self.epoch, "position": self.position, "size": self._size}
+
+    def load_state_dict(self, state):
+        """Restore a state returned by state_dict().
+
+        Raises:
+            ValueError: If the state belongs to a selection of a different size
+                        or its position is out of range.
+        """
+        if state.get("size", self._size) != self._size:
+            raise ValueError(f"State is for a selection of {state['size']} images, not {self._size}")
+        if not 0 <= state["position"] <= self._size or state["epoch"] < 0:
+            raise ValueError(f"Invalid epoch or position in {state}")
+        self.seed = state["seed"]
+        self.epoch = state["epoch"]
+        self.position = state["position"]
+        self._buffer = []
+
+    def _ids(self, count):
+        """The next count ids of the current epoch, without consuming them."""
+        permutation = FeistelPermutation(self._size, (self.seed, self.epoch))
+        return permutation[self.position:min(self.position + count, self._size)]
+
+    def _fill(self, count):
+        """Resolve the next count paths of the epoch into the buffer, in pop() order."""
+        self._buffer = self.selection.paths(self._ids(count))[::-1]
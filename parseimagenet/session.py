@@ -0,0 +1,641 @@
+import os
+from bisect import bisect_right
+from collections import Counter, OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+from pathlib import Path
+
+from .keywords import KEYWORD_PRESETS
+from .helpers.validation import (validate_batch_size, validate_class_weights, validate_fuzzy, validate_hypernyms,
+                                 validate_params, validate_shard, validate_strategy)
+from .helpers.paths import resolve_paths
+from .helpers.boxes import image_id_of, load_box_index
+from .helpers.cache import default_cache_dir, load_index, index_sources
+from .helpers.hierarchy import HIERARCHY_FILE, load_hierarchy
+from .helpers.filtering import filter_categories, match_wnids_batch, select_wnids
+from .helpers.synset import FUZZY_THRESHOLD, SynsetTokenIndex, SynsetTrigramIndex, get_synset_mapping
+from .helpers.listing import DirectoryListingCache
+from .selection import Selection
+from .helpers.annotations import iter_annotations
+from .helpers.sampling import (VERIFY_WORKERS, PositionStems, count_existing, make_rng, reservoir_sample,
+                               resolve_image_paths, sample_excluding, sample_shard, sample_stems, sample_weighted,
+                               shard_slice, substream, verify_paths)
+from .utils import print_filter_results
+
+
+class ImageNetSession:
+    """Parsed ImageNet state reused across queries against one dataset.
+
+    The synset mapping, per-split CategoryIndex and resolved data paths are
+    loaded lazily on first use and kept in memory, so repeated queries skip
+    file parsing entirely. Cached entries are revalidated against the source
+    files' size and mtime on every access and reloaded when they change.
+
+    Args:
+        base_path: Path to ImageNet-Subset directory.
+        use_cache: If True, load annotations from the compiled on-disk index (default: True).
+        cache_dir: Directory for compiled indexes (default: per-user cache dir).
+        workers: Number of processes used to parse train_cls.txt (default: None, serial).
+        max_cache_bytes: Memory cap for in-memory split caches. Least recently
+                         used entries are evicted beyond it (default: None, unbounded).
+        persist_listings: If True, save the directory listings used to resolve
+                          image files to the cache dir and reuse them across
+                          processes (default: False).
+        assume_extension: If True, verify once that every image of a split shares
+                          one extension (e.g. ".JPEG") and then build paths from
+                          it without listing directories (default: False).
+    """
+
+    def __init__(self, base_path, use_cache=True, cache_dir=None, workers=None, max_cache_bytes=None,
+                 persist_listings=False, assume_extension=False):
+        self.base_path = Path(base_path)
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self._paths = {}
+        self._synset_mapping = None
+        self._synset_stat = None
+        self._name_indexes = {}
+        self._sortedness = {}
+        self._cache = _LRUCache(max_cache_bytes)
+        self.persist_listings = persist_listings
+        self.assume_extension = assume_extension
+        self._listings = None
+
+    def __repr__(self):
+        return f"ImageNetSession({str(self.base_path)!r}, cached={list(self._cache.keys())})"
+
+    @property
+    def synset_mapping(self):
+        """Dict mapping WNID to category name, loaded once and revalidated by stat."""
+        stat = _stat_key([self.base_path / "LOC_synset_mapping.txt"])
+        if self._synset_mapping is None or stat != self._synset_stat:
+            self._synset_mapping = get_synset_mapping(self.base_path)
+            self._synset_stat = stat
+        return self._synset_mapping
+
+    @property
+    def token_index(self):
+        """SynsetTokenIndex over the current synset mapping, rebuilt when the mapping reloads."""
+        return self._name_index(SynsetTokenIndex, self.synset_mapping)
+
+    @property
+    def fuzzy_index(self):
+        """SynsetTrigramIndex over the current synset mapping, built on first fuzzy query."""
+        return self._name_index(SynsetTrigramIndex, self.synset_mapping)
+
+    def paths(self, source):
+        """Return (annotations_file, data_path) for a split."""
+        if source not in self._paths:
+            self._paths[source] = resolve_paths(self.base_path, source)
+        return self._paths[source]
+
+    def category_index(self, source):
+        """Return the full CategoryIndex of a split, loading it on first use."""
+        stat, category_images = self._cached_index(source)
+        if category_images is None:
+            synset_mapping, category_images = self._load_index(source)
+            self._remember(source, stat, synset_mapping, category_images)
+        return category_images
+
+    def boxes(self, source):
+        """Return the BoxIndex of a split's LOC_<source>_solution.csv, loading it on first use."""
+        solution_file = self.base_path / f"LOC_{source}_solution.csv"
+        stat = _stat_key([solution_file])
+        entry = self._cache.get(("boxes", source))
+        if entry is not None and entry[0] == stat:
+            return entry[1]
+        box_index = load_box_index(self.base_path, source, use_cache=self.use_cache, cache_dir=self.cache_dir)
+        self._cache.put(("boxes", source), (stat, box_index), box_index.nbytes)
+        return box_index
+
+    def hierarchy(self, hierarchy_file=None):
+        """Return the WordNetHierarchy read from hierarchy_file (default: <base_path>/wordnet.is_a.txt)."""
+        is_a_file = Path(hierarchy_file) if hierarchy_file is not None else self.base_path / HIERARCHY_FILE
+        stat = _stat_key([is_a_file])
+        entry = self._cache.get(("hierarchy", str(is_a_file)))
+        if entry is not None and entry[0] == stat:
+            return entry[1]
+        hierarchy = load_hierarchy(self.base_path, is_a_file, use_cache=self.use_cache, cache_dir=self.cache_dir)
+        self._cache.put(("hierarchy", str(is_a_file)), (stat, hierarchy), hierarchy.nbytes)
+        return hierarchy
+
+    def query(self, preset=None, keywords=None, num_images=200, source="train", silent=True,
+              box_filter=None, with_boxes=False, hypernyms=None, hierarchy_file=None, fuzzy=False,
+              strategy="uniform", per_class=None, min_per_class=0, stream=False, seed=None, rng=None,
+              verify=False, rank=None, world_size=None, class_weights=None, replacement=False):
+        """Extract file paths for images matching specified keywords.
+
+        Takes the same selection arguments as get_image_paths_by_keywords().
+
+        Returns:
+            List of Path objects to the selected images, or (Path, boxes) pairs
+            when with_boxes is True
+        """
+        selected, total_available, pool = self._sample(
+            preset, keywords, num_images, source, silent, box_filter, hypernyms, hierarchy_file, fuzzy,
+            strategy, per_class, min_per_class, stream, seed, rng, rank, world_size, class_weights, replacement)
+        selected_paths = self.resolve_paths(selected, source)
+
+        # VERIFY FILES: drop missing files, replacing them from the same pool
+        if verify:
+            selected_paths, dropped = self._verify(source, selected, selected_paths, *pool)
+            if not silent:
+                print(f"Dropped {dropped} missing files")
+
+        # COUNT EXISTING FILES: existing
+        if selected_paths:
+            if not silent:
+                existing = len(selected_paths) if verify else count_existing(selected_paths, VERIFY_WORKERS)
+                print(f"\nSelected {len(selected_paths)} images")
+                print(f"Verified {existing}/{len(selected_paths)} files exist on disk\n")
+            if with_boxes:
+                return self._with_boxes(source, selected_paths)
+            return selected_paths
+        else:
+            if not silent:
+                print("\nNo matching images found!\n")
+            return []
+
+    def iter_query(self, preset=None, keywords=None, num_images=200, source="train", batch_size=None,
+                   box_filter=None, with_boxes=False, hypernyms=None, hierarchy_file=None, fuzzy=False,
+                   strategy="uniform", per_class=None, min_per_class=0, stream=False, seed=None, rng=None,
+                   rank=None, world_size=None, class_weights=None, replacement=False):
+        """Yield the paths query() would return, resolving them batch by batch.
+
+        Validation, filtering and sampling are shared with query(), so the same
+        seed selects the same images in the same order. Uniform samples are
+        kept as a compact position array and only batch_size stems are
+        decoded and resolved at a time. Takes the arguments of query() except
+        silent and verify; invalid arguments raise before iteration starts.
+
+        Args:
+            batch_size: If given, yield lists of up to batch_size results
+                        instead of single results (default: None).
+
+        Yields:
+            Path objects (or (Path, boxes) pairs when with_boxes is True), or
+            lists of them when batch_size is given.
+        """
+        validate_batch_size(batch_size)
+        selected, _, _ = self._sample(
+            preset, keywords, num_images, source, True, box_filter, hypernyms, hierarchy_file, fuzzy,
+            strategy, per_class, min_per_class, stream, seed, rng, rank, world_size, class_weights, replacement,
+            lazy=True)
+        return self._iter_resolved(selected, source, batch_size, with_boxes)
+
+    def select(self, preset=None, keywords=None, source="train", silent=True, box_filter=None, hypernyms=None,
+               hierarchy_file=None, fuzzy=False):
+        """Return every image matching a query as a Selection, without sampling.
+
+        Takes the same selection arguments as get_image_paths_by_keywords().
+        """
+        search_keywords, selection = self._validate(preset, keywords, source, hypernyms, hierarchy_file, fuzzy)
+        category_images, matching_wnids = self._matching_pool(source, search_keywords, selection, box_filter,
+                                                              silent)
+        return Selection(self, source, category_images, matching_wnids)
+
+    def query_batch(self, queries, max_workers=None, seed=None, rng=None):
+        """Run many selections against a single load of the dataset.
+
+        Every query is validated up front, each split's index is loaded once
+        and all keyword lists are matched in one scan of the synset mapping.
+        Resolving the sampled stems to files can be spread over a thread pool.
+
+        Without seed or rng, queries sample from the module-level random
+        functions in query order, so results are reproducible under
+        random.seed(). With seed or rng, every query draws from its own
+        substream derived from the query name (or from its own "seed" entry)
+        and is sampled in the worker threads, so results do not depend on
+        thread scheduling.
+
+        Args:
+            queries: Dict mapping a name to a dict of query() keyword arguments
+                     (preset, keywords, num_images, source, box_filter, with_boxes,
+                     hypernyms, hierarchy_file, fuzzy, strategy, per_class,
+                     min_per_class, seed), or a list of such dicts,
+                     whose results are keyed by position.
+            max_workers: Threads used to sample and resolve image paths (default: None, serial).
+            seed: Seed for the batch's private generator (default: None).
+            rng: random.Random to derive the per-query substreams from (default: None).
+
+        Returns:
+            Dict mapping each query name to the result query() would return.
+
+        Raises:
+            TypeError: If a query has an unsupported argument.
+            ValueError: If both seed and rng are given.
+        """
+        rng = make_rng(seed, rng)
+        root = rng.getrandbits(64) if rng is not None else None
+        plans = []
+        for name, spec in (queries.items() if isinstance(queries, Mapping) else enumerate(queries)):
+            unknown = set(spec) - _BATCH_ARGS
+            if unknown:
+                raise TypeError(f"Unsupported arguments in batch query {name!r}: {sorted(unknown)}")
+            search_keywords, selection = self._validate(
+                spec.get("preset"), spec.get("keywords"), spec.get("source", "train"),
+                spec.get("hypernyms"), spec.get("hierarchy_file"), spec.get("fuzzy", False))
+            validate_strategy(spec.get("strategy", "uniform"), spec.get("per_class"), spec.get("min_per_class", 0))
+            if spec.get("seed") is not None:
+                query_rng = make_rng(spec["seed"])
+            else:
+                query_rng = substream(root, repr(name)) if root is not None else None
+            plans.append((name, spec, search_keywords, selection, query_rng))
+
+        sources = list(dict.fromkeys(spec.get("source", "train") for _, spec, _, _, _ in plans))
+        indexes = {source: self.category_index(source) for source in sources}
+        synset_mapping = self.synset_mapping
+        keyword_sets = list(dict.fromkeys(tuple(kw) for _, _, kw, _, _ in plans if kw is not None))
+        token_index = self._name_index(SynsetTokenIndex, synset_mapping)
+        matches = dict(zip(keyword_sets, match_wnids_batch(synset_mapping, keyword_sets, token_index)))
+
+        sampled = []
+        for name, spec, search_keywords, selection, query_rng in plans:
+            source = spec.get("source", "train")
+            category_images = indexes[source]
+            matching_wnids = filter_categories(
+                synset_mapping, category_images, search_keywords,
+                matched=matches.get(tuple(search_keywords)) if search_keywords is not None else None,
+                **self._selection_args(synset_mapping, selection))
+            if spec.get("box_filter") is not None:
+                category_images, matching_wnids = self._filter_boxes(
+                    source, spec["box_filter"], category_images, matching_wnids)
+            draw = (category_images, matching_wnids, spec.get("num_images", 200), spec.get("strategy", "uniform"),
+                    spec.get("per_class"), spec.get("min_per_class", 0), query_rng)
+            if query_rng is None:
+                # Shared global generator: draw now, in query order
+                draw = sample_stems(*draw)[0]
+            sampled.append((source, draw))
+
+        def resolve(item):
+            source, draw = item
+            stems = draw if isinstance(draw, list) else sample_stems(*draw)[0]
+            return self.resolve_paths(stems, source, save=False)
+
+        if max_workers:
+            with ThreadPoolExecutor(max_workers) as executor:
+                resolved = list(executor.map(resolve, sampled))
+        else:
+            resolved = list(map(resolve, sampled))
+
+        self._save_listings()
+        results = {}
+        for (name, spec, _, _, _), (source, _), paths in zip(plans, sampled, resolved):
+            results[name] = self._with_boxes(source, paths) if spec.get("with_boxes") else paths
+        return results
+
+    @property
+    def listings(self):
+        """DirectoryListingCache used to resolve image stems to files."""
+        if self._listings is None:
+            if self.persist_listings:
+                self._listings = DirectoryListingCache.load(self._listings_file())
+            else:
+                self._listings = DirectoryListingCache()
+        return self._listings
+
+    def resolve_paths(self, stems, source, save=True):
+        """Resolve image stems of a split to full paths through the directory listing cache.
+
+        Args:
+            stems: List of stems as stored in the split's CategoryIndex.
+            source: "train" or "val".
+            save: Persist changed listings when persist_listings is on (default: True).
+
+        Returns:
+            List of Path objects, one per stem.
+        """
+        _, data_path = self.paths(source)
+        listings = self.listings
+        if self.assume_extension and str(data_path) not in listings.extensions and stems:
+            listings.verify_extension(data_path)
+        paths = resolve_image_paths(stems, data_path, listings, self.assume_extension)
+        if save:
+            self._save_listings()
+        return paths
+
+    def clear(self):
+        """Drop every in-memory cache entry."""
+        self._listings = None
+        self._paths.clear()
+        self._synset_mapping = None
+        self._synset_stat = None
+        self._name_indexes.clear()
+        self._sortedness.clear()
+        self._cache.clear()
+
+    def _validate(self, preset, keywords, source, hypernyms, hierarchy_file, fuzzy):
+        """Return (search_keywords, selection) for one query, loading the hierarchy if needed."""
+        search_keywords = validate_params(preset, keywords, KEYWORD_PRESETS, source)
+        hypernyms = validate_hypernyms(hypernyms)
+        hierarchy = self.hierarchy(hierarchy_file) if hypernyms is not None else None
+        fuzzy_threshold = validate_fuzzy(fuzzy, FUZZY_THRESHOLD)
+        return search_keywords, {"hierarchy": hierarchy, "hypernyms": hypernyms, "fuzzy_threshold": fuzzy_threshold}
+
+    def _sample(self, preset, keywords, num_images, source, silent, box_filter, hypernyms, hierarchy_file, fuzzy,
+                strategy, per_class, min_per_class, stream, seed, rng, rank, world_size, class_weights=None,
+                replacement=False, lazy=False):
+        """Validate a query and sample its stems.
+
+        Returns:
+            Tuple of (selected, total_available, pool) where pool holds the
+            arguments _verify() needs to draw replacements.
+        """
+        # VALIDATE PARAMS: keywords, preset, source, hypernyms, fuzzy
+        search_keywords, selection = self._validate(preset, keywords, source, hypernyms, hierarchy_file, fuzzy)
+        validate_strategy(strategy, per_class, min_per_class)
+        rng = make_rng(seed, rng)
+        validate_shard(rank, world_size)
+        if world_size is not None and rng is None:
+            raise ValueError("rank and world_size require a seed (or rng) shared by all workers")
+        if stream and strategy != "uniform":
+            raise ValueError("stream=True only supports strategy='uniform'")
+        validate_class_weights(class_weights, replacement, strategy, stream)
+        # Only a plain uniform query can compute its shard alone; others slice the full seeded sample
+        own_shard = world_size is not None and strategy == "uniform" and class_weights is None and not stream
+
+        # RESOLVE PATHS: annotations_file, data_path
+        annotations_file, data_path = self.paths(source)
+
+        category_images = matching_wnids = positions = None
+        if stream:
+            # STREAM AND SAMPLE: reservoir over the annotation files, nothing is indexed
+            selected, total_available = self._stream_sample(source, search_keywords, selection, num_images,
+                                                            box_filter, silent, rng)
+        else:
+            # LOAD, FILTER CATEGORIES AND BOXES: category_images, matching_wnids
+            category_images, matching_wnids = self._matching_pool(source, search_keywords, selection, box_filter,
+                                                                  silent)
+
+            # COLLECT AND SAMPLE IMAGES: selected_paths, total_available
+            if own_shard:
+                # Only this worker's shard of the global sample is computed
+                selected, total_available = sample_shard(category_images, matching_wnids, num_images,
+                                                         rank, world_size, rng.getrandbits(64))
+            elif class_weights is not None:
+                selected, total_available = sample_weighted(category_images, matching_wnids, num_images,
+                                                            class_weights, replacement, rng)
+            else:
+                # Drawn as a position view so _verify() can replace missing files by position
+                selected, total_available = sample_stems(category_images, matching_wnids, num_images,
+                                                         strategy, per_class, min_per_class, rng, lazy=True)
+                positions = selected.positions
+                if not lazy:
+                    selected = list(selected)
+        if world_size is not None and not own_shard:
+            # Every worker drew the same full sample from the shared seed; keep this worker's share
+            selected = shard_slice(selected, rank, world_size)
+        if not silent:
+            print(f"Total matching images available: {total_available}")
+
+        # Replacements drawn by one worker could collide with another worker's shard, and
+        # weighted samples would be topped up uniformly, so both only drop missing files
+        replaceable = world_size is None and class_weights is None
+        pool = (category_images if replaceable else None, matching_wnids, strategy, rng, positions)
+        return selected, total_available, pool
+
+    def _iter_resolved(self, selected, source, batch_size, with_boxes):
+        """Resolve selected stems one batch at a time, yielding results or batches."""
+        chunk = batch_size or _ITER_CHUNK
+        for start in range(0, len(selected), chunk):
+            paths = self.resolve_paths(selected[start:start + chunk], source)
+            if with_boxes:
+                paths = self._with_boxes(source, paths)
+            if batch_size:
+                yield paths
+            else:
+                yield from paths
+
+    def _matching_pool(self, source, search_keywords, selection, box_filter=None, silent=True):
+        """Return (category_images, matching_wnids) for one query, after keyword and box filtering."""
+        # LOAD INDEX: synset_mapping (wnid -> category names), category_images
+        synset_mapping, category_images = self._query_index(source, search_keywords, selection)
+        if not silent:
+            print(f"Loaded {len(synset_mapping)} possible categories\n")
+            print(f"Found {len(category_images)} unique categories\n")
+
+        # FILTER CATEGORIES: matching_wnids
+        matching_wnids = filter_categories(synset_mapping, category_images, search_keywords,
+                                           **self._selection_args(synset_mapping, selection))
+        if not silent:
+            print_filter_results(search_keywords, matching_wnids, synset_mapping, category_images,
+                                 selection["hypernyms"])
+
+        # FILTER BY BOXES: keep only images whose bounding boxes satisfy box_filter
+        if box_filter is not None:
+            category_images, matching_wnids = self._filter_boxes(source, box_filter, category_images, matching_wnids)
+            if not silent:
+                print(f"Images passing box filter {box_filter}: {category_images.total}\n")
+        return category_images, matching_wnids
+
+    def _verify(self, source, stems, paths, category_images=None, matching_wnids=None, strategy="uniform", rng=None,
+                positions=None):
+        """Drop selected files that are missing on disk and draw replacements.
+
+        Replacements come from the not yet drawn positions of the matching
+        classes: from the whole pool for the uniform strategy, from the class
+        that lost the file otherwise. They are drawn by rejection against the
+        drawn positions (see sample_excluding()), so a round costs
+        O(num_images) however large the pool is. Replacements are appended
+        after the kept paths and verified in turn. Without category_images
+        (streamed, sharded or weighted queries) files are only dropped.
+
+        Returns:
+            Tuple of (paths, dropped) where dropped counts the missing files found.
+        """
+        kept = []
+        dropped = 0
+        if category_images is not None:
+            view = PositionStems(category_images, matching_wnids, ())
+            bounds = [0, *accumulate(view.counts)]
+            drawn = set(positions)
+        while paths:
+            _, missing = verify_paths(paths, VERIFY_WORKERS)
+            missing = set(missing)
+            dropped += len(missing)
+            kept.extend(path for path in paths if path not in missing)
+            if not missing or category_images is None:
+                break
+            lost = [position for position, path in zip(positions, paths) if path in missing]
+            if strategy == "uniform":
+                draws = {(0, bounds[-1]): (len(lost), len(drawn))}
+            else:
+                taken = Counter(bisect_right(bounds, position) for position in drawn)
+                lost = Counter(bisect_right(bounds, position) for position in lost)
+                draws = {(bounds[i - 1], bounds[i]): (k, taken[i]) for i, k in lost.items()}
+            positions = []
+            for (start, stop), (k, used) in draws.items():
+                positions.extend(sample_excluding(start, stop, k, drawn, rng, used))
+            drawn.update(positions)
+            paths = self.resolve_paths([view.stem_at(position) for position in positions], source)
+        return kept, dropped
+
+    def _stream_sample(self, source, search_keywords, selection, num_images, box_filter, silent, rng=None):
+        """Reservoir-sample stems straight from the annotation files in O(num_images) memory."""
+        annotations_file, _ = self.paths(source)
+        wnids = None
+        if search_keywords is not None or selection["hypernyms"] is not None:
+            synset_mapping = self.synset_mapping
+            wnids = select_wnids(synset_mapping, search_keywords, **self._selection_args(synset_mapping, selection))
+        if not silent:
+            print(f"Streaming {Path(annotations_file).name} for "
+                  f"{'all' if wnids is None else len(wnids)} categories\n")
+        stems = iter_annotations(annotations_file, self.base_path, source, wnids)
+        if box_filter is not None:
+            allowed = self.boxes(source).select(**box_filter)
+            stems = (stem for stem in stems if image_id_of(stem) in allowed)
+        return reservoir_sample(stems, num_images, rng)
+
+    def _filter_boxes(self, source, box_filter, category_images, matching_wnids):
+        """Keep only images whose bounding boxes satisfy box_filter."""
+        allowed = self.boxes(source).select(**box_filter)
+        category_images = category_images.filter_stems(lambda stem: image_id_of(stem) in allowed, matching_wnids)
+        return category_images, [wnid for wnid in matching_wnids if wnid in category_images]
+
+    def _listings_file(self):
+        return Path(self.cache_dir or default_cache_dir(self.base_path)) / "listings.bin"
+
+    def _save_listings(self):
+        if self.persist_listings and self._listings is not None and self._listings.dirty:
+            try:
+                self._listings.save(self._listings_file())
+            except OSError:
+                pass  # read-only or full cache location: keep the listings in memory only
+
+    def _with_boxes(self, source, paths):
+        box_index = self.boxes(source)
+        return [(path, box_index.boxes(image_id_of(path))) for path in paths]
+
+    def _query_index(self, source, search_keywords, selection):
+        """Return (synset_mapping, category_images) for one query.
+
+        An in-memory or warm on-disk index is always used. Otherwise keyword
+        and hypernym queries may only parse their matching classes; that
+        partial index is kept in the LRU cache under its WNID set until the
+        sources change or the full index is loaded.
+        """
+        stat, category_images = self._cached_index(source)
+        if category_images is None and search_keywords is None and selection["hypernyms"] is None:
+            category_images = self.category_index(source)
+        if category_images is not None:
+            return self.synset_mapping, category_images
+
+        synset_mapping = self.synset_mapping
+        wnids = select_wnids(synset_mapping, search_keywords, **self._selection_args(synset_mapping, selection))
+        key = ("subset", source, frozenset(wnids))
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] == stat:
+            return synset_mapping, entry[1]
+
+        parsed_subset = []
+
+        def select(mapping):
+            parsed_subset.append(True)
+            return wnids
+
+        synset_mapping, category_images = self._load_index(source, select=select)
+        if parsed_subset:
+            self._cache.put(key, (stat, category_images), category_images.nbytes)
+        else:
+            # Served by or compiled into the on-disk index, so the result is complete
+            self._remember(source, stat, synset_mapping, category_images)
+        return synset_mapping, category_images
+
+    def _cached_index(self, source):
+        """Return (stat_key, CategoryIndex or None) for the in-memory copy of a split."""
+        annotations_file, _ = self.paths(source)
+        stat = _stat_key(index_sources(self.base_path, source, annotations_file))
+        entry = self._cache.get(("index", source))
+        if entry is not None and entry[0] == stat:
+            return stat, entry[1]
+        return stat, None
+
+    def _load_index(self, source, select=None):
+        annotations_file, _ = self.paths(source)
+        return load_index(self.base_path, source, annotations_file, use_cache=self.use_cache,
+                          cache_dir=self.cache_dir, select=select, workers=self.workers,
+                          sortedness=self._sortedness)
+
+    def _selection_args(self, synset_mapping, selection):
+        """Keyword arguments for filter_categories()/select_wnids() beyond the keywords."""
+        args = {
+            "token_index": self._name_index(SynsetTokenIndex, synset_mapping),
+            "hierarchy": selection["hierarchy"],
+            "hypernyms": selection["hypernyms"],
+        }
+        if selection["fuzzy_threshold"] is not None:
+            args["fuzzy_index"] = self._name_index(SynsetTrigramIndex, synset_mapping)
+            args["fuzzy_threshold"] = selection["fuzzy_threshold"]
+        return args
+
+    def _name_index(self, index_cls, synset_mapping):
+        """Return an index_cls built over synset_mapping, reusing it while the mapping is unchanged."""
+        entry = self._name_indexes.get(index_cls)
+        # Cold keyword queries re-read the mapping, so compare contents, not identity
+        if entry is None or entry[0] != synset_mapping:
+            entry = self._name_indexes[index_cls] = (synset_mapping, index_cls(synset_mapping))
+        return entry[1]
+
+    def _remember(self, source, stat, synset_mapping, category_images):
+        # The full index answers every query, so partial indexes of the split are dead weight
+        for key in [key for key in self._cache.keys() if key[:2] == ("subset", source)]:
+            self._cache.pop(key)
+        self._cache.put(("index", source), (stat, category_images), category_images.nbytes)
+        self._synset_mapping = synset_mapping
+        self._synset_stat = stat[:1]
+
+
+# Stems resolved at a time by iter_query() when no batch_size is given
+_ITER_CHUNK = 256
+
+_BATCH_ARGS = frozenset({
+    "preset", "keywords", "num_images", "source", "box_filter", "with_boxes", "hypernyms", "hierarchy_file", "fuzzy",
+    "strategy", "per_class", "min_per_class", "seed",
+})
+
+
+def _stat_key(paths):
+    """Cheap freshness key: (size, mtime_ns) of every source file."""
+    key = []
+    for path in paths:
+        stat = os.stat(path)
+        key.append((stat.st_size, stat.st_mtime_ns))
+    return tuple(key)
+
+
+class _LRUCache:
+    """Byte-capped LRU cache; the most recently inserted entry is never evicted."""
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self.nbytes = 0
+
+    def keys(self):
+        return self._entries.keys()
+
+    def get(self, key):
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    def put(self, key, value, nbytes):
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, nbytes)
+        self.nbytes += nbytes
+        while self.max_bytes is not None and self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted_bytes) = self._entries.popitem(last=False)
+            self.nbytes -= evicted_bytes
+
+    def pop(self, key):
+        value, nbytes = self._entries.pop(key)
+        self.nbytes -= nbytes
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
@@ -1,6 +1,11 @@
-def print_filter_results(search_keywords, matching_wnids, synset_mapping, category_images):
-    """Print category match results (verbose mode only)."""
-    if search_keywords is None:
+def print_filter_results(search_keywords, matching_wnids, synset_mapping, category_images, hypernyms=None):
+    """Print category match results (verbose mode only).
+
+    category_images may be a CategoryIndex or a dict; only per-class counts are read.
+    """
+    if hypernyms is not None:
+        print(f"SELECTING UNDER HYPERNYMS:\n{hypernyms}\n")
+    if search_keywords is None and hypernyms is None:
         print("SELECTING FROM ALL CATEGORIES (no keyword filter)\n")
         for wnid in matching_wnids:
             category_name = synset_mapping.get(wnid, "unknown")
@@ -10,7 +15,8 @@ def print_filter_results(search_keywords, matching_wnids, synset_mapping, catego
         print(f"Total categories: {len(matching_wnids)}")
         print(f"{'=' * 80}\n")
     else:
-        print(f"SEARCHING WITH KEYWORDS:\n{search_keywords}\n")
+        if search_keywords is not None:
+            print(f"SEARCHING WITH KEYWORDS:\n{search_keywords}\n")
         for wnid in matching_wnids:
             category_name = synset_mapping.get(wnid, "unknown")
             count = len(category_images[wnid])
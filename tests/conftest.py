@@ -73,6 +73,14 @@ def _build_mock_imagenet(tmp_path, synset_lines=None, annotation_wnids=None, cre
     return tmp_path
 
 
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path_factory, monkeypatch):
+    """Point the compiled-index cache at a per-test temp dir instead of ~/.cache."""
+    cache_dir = tmp_path_factory.mktemp("parseimagenet-cache")
+    monkeypatch.setenv("PARSEIMAGENET_CACHE_DIR", str(cache_dir))
+    return cache_dir
+
+
 @pytest.fixture
 def mock_imagenet(tmp_path):
     """Full mock ImageNet with synset mapping, annotations, and JPEG files."""
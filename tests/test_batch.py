@@ -0,0 +1,75 @@
+"""Tests for get_image_paths_batch() and ImageNetSession.query_batch()."""
+import random
+
+import pytest
+
+from parseimagenet import ImageNetSession, get_image_paths_batch, get_image_paths_by_keywords
+from parseimagenet import session as session_module
+from parseimagenet.helpers.filtering import match_wnids, match_wnids_batch
+from parseimagenet.keywords import KEYWORD_PRESETS
+
+
+class TestMatchWnidsBatch:
+    """One scan gives the same matches as one match_wnids() call per list."""
+
+    def test_matches_individual_calls(self):
+        mapping = {
+            "n001": "golden retriever",
+            "n002": "hot dog, red hot",
+            "n003": "green mamba",
+            "n004": "goldfinch, Carduelis carduelis",
+        }
+        keyword_sets = [KEYWORD_PRESETS["dogs"], KEYWORD_PRESETS["birds"], ["hot", "mamba"], []]
+        expected = [match_wnids(mapping, keywords) for keywords in keyword_sets]
+        assert match_wnids_batch(mapping, keyword_sets) == expected
+
+
+class TestQueryBatch:
+    """Batch results match the single-query API."""
+
+    def test_named_queries(self, mock_imagenet):
+        results = get_image_paths_batch(mock_imagenet, {
+            "dogs": {"preset": "dogs", "num_images": 100},
+            "snakes": {"keywords": ["mamba"], "num_images": 100, "source": "val"},
+        })
+        assert set(results) == {"dogs", "snakes"}
+        assert {path.parent.name for path in results["dogs"]} == {"n02099601"}
+        assert len(results["snakes"]) == 5
+
+    def test_list_queries_keyed_by_position(self, mock_imagenet):
+        results = get_image_paths_batch(mock_imagenet, [{"preset": "birds"}, {"keywords": ["nothing"]}])
+        assert list(results) == [0, 1]
+        assert results[1] == []
+
+    @pytest.mark.parametrize("max_workers", [None, 3])
+    def test_same_as_sequential_queries(self, mock_imagenet, max_workers):
+        queries = [
+            {"preset": "birds", "num_images": 4},
+            {"preset": None, "num_images": 7, "source": "val"},
+            {"keywords": ["golden retriever", "mamba"], "num_images": 6},
+        ]
+        random.seed(11)
+        expected = [get_image_paths_by_keywords(mock_imagenet, **query) for query in queries]
+        random.seed(11)
+        results = get_image_paths_batch(mock_imagenet, queries, max_workers=max_workers)
+        assert [results[i] for i in range(len(queries))] == expected
+
+    def test_each_split_loaded_once(self, mock_imagenet, monkeypatch):
+        calls = []
+        original = session_module.load_index
+
+        def _counting(*args, **kwargs):
+            calls.append(args[1])
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(session_module, "load_index", _counting)
+        ImageNetSession(mock_imagenet).query_batch([{"preset": name} for name in KEYWORD_PRESETS])
+        assert calls == ["train"]
+
+    def test_invalid_query_raises_before_work(self, mock_imagenet):
+        with pytest.raises(ValueError, match="Unknown preset"):
+            get_image_paths_batch(mock_imagenet, [{"preset": "birds"}, {"preset": "nonexistent"}])
+
+    def test_unsupported_argument_raises(self, mock_imagenet):
+        with pytest.raises(TypeError, match="silent"):
+            get_image_paths_batch(mock_imagenet, {"q": {"preset": "birds", "silent": False}})
@@ -0,0 +1,147 @@
+"""Tests for the packed bounding-box index."""
+import pytest
+
+from parseimagenet import ImageNetSession, get_image_paths_by_keywords
+from parseimagenet.helpers.boxes import BoxIndex, image_id_of, load_box_index
+from parseimagenet.helpers.cache import default_cache_dir
+
+
+TRAIN_ROWS = [
+    # unsorted on purpose; n02099601_0000 has two boxes and a co-occurring goldfinch
+    "n02099601_0001,n02099601 10 10 20 20 ",
+    "n02099601_0000,n02099601 0 0 100 100 n01531178 5 5 15 25 ",
+    "n01531178_0000,n01531178 0 0 300 300 ",
+    "n01530575_0002,n01530575 1 2 3 4 n01530575 10 20 30 40 n01530575 0 0 1 1 ",
+]
+
+
+@pytest.fixture
+def boxed_imagenet(mock_imagenet):
+    (mock_imagenet / "LOC_train_solution.csv").write_text(
+        "ImageId,PredictionString\n" + "\n".join(TRAIN_ROWS) + "\n"
+    )
+    return mock_imagenet
+
+
+class TestBoxIndex:
+    """Parsing and per-image lookups."""
+
+    def test_counts(self, boxed_imagenet):
+        index = BoxIndex.from_csv(boxed_imagenet / "LOC_train_solution.csv")
+        assert len(index) == 4
+        assert index.num_boxes == 7
+
+    def test_boxes_for_image(self, boxed_imagenet):
+        index = BoxIndex.from_csv(boxed_imagenet / "LOC_train_solution.csv")
+        assert index.boxes("n02099601_0000") == [
+            ("n02099601", 0, 0, 100, 100),
+            ("n01531178", 5, 5, 15, 25),
+        ]
+
+    def test_unknown_image_has_no_boxes(self, boxed_imagenet):
+        index = BoxIndex.from_csv(boxed_imagenet / "LOC_train_solution.csv")
+        assert index.boxes("n09999999_0000") == []
+        assert index.box_count("n09999999_0000") == 0
+
+    def test_images_sorted_by_id(self, boxed_imagenet):
+        index = BoxIndex.from_csv(boxed_imagenet / "LOC_train_solution.csv")
+        ids = [index.image_id(row) for row in range(len(index))]
+        assert ids == sorted(ids)
+
+    def test_packed_int16_coordinates(self, boxed_imagenet):
+        index = BoxIndex.from_csv(boxed_imagenet / "LOC_train_solution.csv")
+        assert index.coords.typecode == "h"
+        assert index.box_codes.typecode == "h"
+        assert len(index.coords) == 4 * index.num_boxes
+
+    def test_wide_class_codes(self, tmp_path):
+        rows = [f"img_{i:05d},n{i:08d} 0 0 1 1 " for i in range(2 ** 15 + 1)]
+        (tmp_path / "solution.csv").write_text("ImageId,PredictionString\n" + "\n".join(rows) + "\n")
+        index = BoxIndex.from_csv(tmp_path / "solution.csv")
+        assert index.box_codes.typecode == "i"
+        assert index.boxes("img_32768") == [("n00032768", 0, 0, 1, 1)]
+        restored = BoxIndex.from_sections(*index.to_sections())
+        assert restored.box_codes == index.box_codes
+
+    def test_val_solution_parses(self, mock_imagenet):
+        index = BoxIndex.from_csv(mock_imagenet / "LOC_val_solution.csv")
+        assert len(index) == 25
+        assert index.boxes("ILSVRC2012_val_00000001") == [("n01530575", 0, 0, 100, 100)]
+
+
+class TestSelect:
+    """Filtering by box count, area and class co-occurrence."""
+
+    @pytest.fixture
+    def index(self, boxed_imagenet):
+        return BoxIndex.from_csv(boxed_imagenet / "LOC_train_solution.csv")
+
+    def test_no_conditions_selects_everything(self, index):
+        assert len(index.select()) == 4
+
+    def test_min_boxes(self, index):
+        assert index.select(min_boxes=2) == {"n02099601_0000", "n01530575_0002"}
+
+    def test_max_boxes(self, index):
+        assert index.select(max_boxes=1) == {"n02099601_0001", "n01531178_0000"}
+
+    def test_min_area(self, index):
+        assert index.select(min_area=10000) == {"n02099601_0000", "n01531178_0000"}
+
+    def test_area_range(self, index):
+        assert index.select(min_area=50, max_area=250) == {"n02099601_0001", "n02099601_0000"}
+
+    def test_cooccurrence(self, index):
+        assert index.select(cooccur=["n02099601", "n01531178"]) == {"n02099601_0000"}
+
+    def test_unknown_class_cooccurrence(self, index):
+        assert index.select(cooccur=["n00000000"]) == set()
+
+
+class TestCaching:
+    """The box index is compiled to the cache directory and reloaded from it."""
+
+    def test_round_trip_through_cache(self, boxed_imagenet):
+        built = load_box_index(boxed_imagenet, "train")
+        assert (default_cache_dir(boxed_imagenet) / "boxes-train.bin").exists()
+        loaded = load_box_index(boxed_imagenet, "train")
+        assert loaded.boxes("n01530575_0002") == built.boxes("n01530575_0002")
+        assert loaded.select(min_boxes=2) == built.select(min_boxes=2)
+
+    def test_missing_csv_raises(self, mock_imagenet):
+        with pytest.raises(FileNotFoundError):
+            load_box_index(mock_imagenet, "train")
+
+
+class TestQueries:
+    """Box filters and box output through the query API."""
+
+    def test_box_filter_restricts_selection(self, boxed_imagenet):
+        paths = get_image_paths_by_keywords(boxed_imagenet, num_images=100, box_filter={"min_boxes": 2})
+        assert sorted(p.name for p in paths) == ["n01530575_0002.JPEG", "n02099601_0000.JPEG"]
+
+    def test_box_filter_with_keywords(self, boxed_imagenet):
+        paths = get_image_paths_by_keywords(
+            boxed_imagenet, keywords=["golden retriever"], num_images=100,
+            box_filter={"cooccur": ["n01531178"]},
+        )
+        assert [p.name for p in paths] == ["n02099601_0000.JPEG"]
+
+    def test_with_boxes_returns_pairs(self, boxed_imagenet):
+        session = ImageNetSession(boxed_imagenet)
+        results = session.query(keywords=["goldfinch"], num_images=100, with_boxes=True,
+                                box_filter={"min_area": 1})
+        assert results == [
+            (boxed_imagenet / "ILSVRC" / "Data" / "CLS-LOC" / "train" / "n01531178" / "n01531178_0000.JPEG",
+             [("n01531178", 0, 0, 300, 300)]),
+        ]
+
+    def test_val_with_boxes(self, mock_imagenet):
+        results = get_image_paths_by_keywords(mock_imagenet, keywords=["green mamba"], source="val",
+                                              num_images=100, with_boxes=True)
+        assert len(results) == 5
+        assert all(boxes == [("n01740131", 0, 0, 100, 100)] for _, boxes in results)
+
+    def test_image_id_of(self):
+        assert image_id_of("n01/n01_0001") == "n01_0001"
+        assert image_id_of("/data/val/ILSVRC2012_val_00000001.JPEG") == "ILSVRC2012_val_00000001"
@@ -0,0 +1,117 @@
+"""Tests for the compact CategoryIndex produced by the annotation parsers."""
+from collections import defaultdict
+
+import pytest
+
+from parseimagenet.helpers.annotations import parse_annotations
+from parseimagenet.helpers.category_index import CategoryIndex
+from parseimagenet.helpers.paths import resolve_paths
+from tests.conftest import WNIDS
+
+
+PAIRS = [
+    ("n02", "n02/n02_0001"),
+    ("n01", "n01/n01_0001"),
+    ("n02", "n02/n02_0002"),
+    ("n01", "n01/n01_0002"),
+    ("n01", "n01/n01_0003"),
+]
+
+
+def _as_defaultdict(pairs):
+    grouped = defaultdict(list)
+    for wnid, stem in pairs:
+        grouped[wnid].append(stem)
+    return grouped
+
+
+class TestMappingInterface:
+    """CategoryIndex behaves like the old defaultdict(list) grouping."""
+
+    def test_grouping_matches_defaultdict(self):
+        index = CategoryIndex.from_pairs(PAIRS)
+        expected = _as_defaultdict(PAIRS)
+        assert list(index.keys()) == list(expected.keys())
+        for wnid in expected:
+            assert list(index[wnid]) == expected[wnid]
+
+    def test_len_and_membership(self):
+        index = CategoryIndex.from_pairs(PAIRS)
+        assert len(index) == 2
+        assert "n01" in index
+        assert "n99" not in index
+
+    def test_missing_wnid_raises_key_error(self):
+        index = CategoryIndex.from_pairs(PAIRS)
+        with pytest.raises(KeyError):
+            index["n99"]
+
+    def test_empty_index(self):
+        index = CategoryIndex.empty()
+        assert len(index) == 0
+        assert index.total == 0
+
+
+class TestCompactAccessors:
+    """O(1) counts, slicing and row lookups."""
+
+    def test_counts_and_total(self):
+        index = CategoryIndex.from_pairs(PAIRS)
+        assert index.count("n01") == 3
+        assert index.count("n02") == 2
+        assert index.total == 5
+
+    def test_slice_random_access(self):
+        index = CategoryIndex.from_pairs(PAIRS)
+        stems = index["n01"]
+        assert stems[0] == "n01/n01_0001"
+        assert stems[-1] == "n01/n01_0003"
+        assert stems[1:] == ["n01/n01_0002", "n01/n01_0003"]
+
+    def test_row_lookups(self):
+        index = CategoryIndex.from_pairs(PAIRS)
+        start, stop = index.row_range("n01")
+        assert [index.stem(row) for row in range(start, stop)] == list(index["n01"])
+        assert all(index.wnid_of(row) == "n01" for row in range(start, stop))
+
+    def test_int16_codes(self):
+        index = CategoryIndex.from_pairs(PAIRS)
+        assert index.codes.typecode == "h"
+        assert list(index.codes) == [0, 0, 1, 1, 1]
+
+    def test_shared_prefix_is_stripped(self):
+        index = CategoryIndex.from_pairs(PAIRS)
+        assert b"n01/" not in index.blob
+        assert index.prefixes == ["n02/", "n01/"]
+
+    def test_unprefixed_stem_in_prefixed_class(self):
+        index = CategoryIndex.from_pairs([("n01", "n01/a"), ("n01", "other/b"), ("n01", "n01/c")])
+        assert list(index["n01"]) == ["n01/a", "other/b", "n01/c"]
+
+    def test_subset_keeps_requested_classes(self):
+        index = CategoryIndex.from_pairs(PAIRS)
+        sub = index.subset(["n01", "n99"])
+        assert list(sub.keys()) == ["n01"]
+        assert list(sub["n01"]) == list(index["n01"])
+
+
+class TestSerialization:
+    """to_sections/from_sections round-trip the buffers unchanged."""
+
+    def test_round_trip(self):
+        index = CategoryIndex.from_pairs(PAIRS)
+        meta, sections = index.to_sections()
+        restored = CategoryIndex.from_sections(meta, sections)
+        assert restored == index
+
+
+class TestParsersReturnIndex:
+    """Both split parsers build a CategoryIndex."""
+
+    @pytest.mark.parametrize("source", ["train", "val"])
+    def test_parse_returns_category_index(self, mock_imagenet, source):
+        annotations_file, _ = resolve_paths(mock_imagenet, source)
+        index = parse_annotations(annotations_file, mock_imagenet, source)
+        assert isinstance(index, CategoryIndex)
+        assert list(index.keys()) == WNIDS
+        assert index.total == 25
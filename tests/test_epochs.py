@@ -0,0 +1,52 @@
+"""Tests for the resumable epoch iterator over a Selection."""
+from itertools import islice
+
+import pytest
+
+from parseimagenet import get_selection
+
+
+class TestEpochIterator:
+    """Every epoch is a fresh permutation that can be resumed mid-way."""
+
+    def test_each_epoch_visits_every_image_once(self, mock_imagenet):
+        selection = get_selection(mock_imagenet)
+        everything = sorted(selection.paths(range(len(selection))))
+        iterator = selection.epochs(seed=1)
+        first = list(islice(iterator, 25))
+        second = list(islice(iterator, 25))
+        assert sorted(first) == sorted(second) == everything
+        assert first != second
+        assert iterator.state_dict()["epoch"] == 1
+
+    def test_seeded(self, mock_imagenet):
+        selection = get_selection(mock_imagenet)
+        assert list(islice(selection.epochs(seed=4), 60)) == list(islice(selection.epochs(seed=4), 60))
+
+    def test_resume_mid_epoch(self, mock_imagenet):
+        selection = get_selection(mock_imagenet)
+        reference = list(islice(selection.epochs(seed=7), 70))
+        interrupted = selection.epochs(seed=7)
+        head = list(islice(interrupted, 33))
+        state = interrupted.state_dict()
+        assert (state["epoch"], state["position"]) == (1, 8)
+        resumed = selection.epochs()
+        resumed.load_state_dict(state)
+        assert head + list(islice(resumed, 37)) == reference
+
+    def test_batches_stop_at_epoch_end(self, mock_imagenet):
+        selection = get_selection(mock_imagenet, preset="birds")
+        iterator = selection.epochs(seed=0, batch_size=4)
+        assert [len(batch) for batch in islice(iterator, 4)] == [4, 4, 2, 4]
+
+    def test_invalid_batch_size(self, mock_imagenet):
+        with pytest.raises(ValueError, match="batch_size"):
+            get_selection(mock_imagenet).epochs(batch_size=0)
+
+    def test_empty_selection(self, mock_imagenet):
+        assert list(get_selection(mock_imagenet, keywords=["nothing"]).epochs(seed=0)) == []
+
+    def test_state_for_other_selection_rejected(self, mock_imagenet):
+        state = get_selection(mock_imagenet).epochs(seed=0).state_dict()
+        with pytest.raises(ValueError, match="25 images"):
+            get_selection(mock_imagenet, preset="birds").epochs().load_state_dict(state)
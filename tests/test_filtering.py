@@ -0,0 +1,190 @@
+"""Tests for keyword matching in helpers/filtering.py."""
+import re
+
+import pytest
+
+from parseimagenet.helpers.filtering import compile_keyword_matcher, filter_categories, fuzzy_match_wnids, match_wnids
+from parseimagenet.helpers.synset import SynsetTokenIndex, SynsetTrigramIndex
+from parseimagenet.keywords import KEYWORD_PRESETS
+
+
+NAMES = {
+    "n001": "golden retriever",
+    "n002": "dogwood, dogwood tree",
+    "n003": "hot dog, red hot",
+    "n004": "Chihuahua",
+    "n005": "ring-necked snake, ring snake",
+    "n006": "black-and-tan coonhound",
+    "n007": "African hunting dog, hyena dog, Cape hunting dog, Lycaon pictus",
+    "n008": "dog's-tooth violet",
+    "n009": "C++ compiler",
+    "n010": "",
+    "n011": "Kelvin \u212a-meter",
+    "n012": "golden_retriever puppy",
+}
+
+
+def _reference(synset_mapping, search_keywords):
+    """The original per-keyword implementation."""
+    return [
+        wnid for wnid, name in synset_mapping.items()
+        if any(re.search(rf'\b{re.escape(keyword)}\b', name, re.IGNORECASE) for keyword in search_keywords)
+    ]
+
+
+class TestSemantics:
+    """The compiled matcher keeps the per-keyword word-boundary semantics."""
+
+    @pytest.mark.parametrize("keywords", [
+        ["dog"],
+        ["DOG"],
+        ["retriever", "chihuahua"],
+        ["ring snake"],
+        ["ring-necked snake"],
+        ["black-and-tan"],
+        ["hunting dog", "dog"],
+        ["dog's"],
+        ["C++"],
+        ["hot", "hot dog"],
+        ["wood"],
+        [""],
+        ["dog", "dog"],
+    ])
+    def test_matches_reference(self, keywords):
+        assert match_wnids(NAMES, keywords) == _reference(NAMES, keywords)
+
+    @pytest.mark.parametrize("preset", list(KEYWORD_PRESETS))
+    def test_presets_match_reference(self, preset):
+        assert match_wnids(NAMES, KEYWORD_PRESETS[preset]) == _reference(NAMES, KEYWORD_PRESETS[preset])
+
+    def test_empty_keyword_list_matches_nothing(self):
+        assert match_wnids(NAMES, []) == []
+        assert compile_keyword_matcher([]) is None
+
+
+class TestMatcherCache:
+    """Matchers are compiled once per keyword set."""
+
+    def test_same_keywords_reuse_pattern(self):
+        assert compile_keyword_matcher(["dog", "cat"]) is compile_keyword_matcher(("dog", "cat"))
+
+    def test_different_keywords_get_new_pattern(self):
+        assert compile_keyword_matcher(["dog"]) is not compile_keyword_matcher(["cat"])
+
+
+class TestFilterCategories:
+    """filter_categories restricts matches to classes with annotations."""
+
+    def test_only_annotated_classes_returned(self):
+        assert filter_categories(NAMES, {"n001": [], "n004": []}, ["retriever", "chihuahua", "dog"]) == ["n001", "n004"]
+
+    def test_none_returns_all_annotated(self):
+        assert filter_categories(NAMES, {"n002": [], "n001": []}, None) == ["n002", "n001"]
+
+
+class TestTokenIndex:
+    """Token index lookups return exactly what a full scan returns."""
+
+    @pytest.mark.parametrize("keywords", [
+        ["dog"],
+        ["golden retriever"],
+        ["GOLDEN Retriever"],
+        ["Cape hunting dog"],
+        ["hunting dog, Cape"],
+        ["black-and-tan coonhound"],
+        ["ring"],
+        ["dog's"],
+        ["dog tree"],
+        ["C++"],
+        ["++"],
+        [""],
+        ["k-meter"],
+        ["golden_retriever"],
+        ["retriever"],
+        ["dog", "snake", "missing"],
+    ])
+    def test_matches_full_scan(self, keywords):
+        index = SynsetTokenIndex(NAMES)
+        assert match_wnids(NAMES, keywords, index) == _reference(NAMES, keywords)
+
+    @pytest.mark.parametrize("preset", list(KEYWORD_PRESETS))
+    def test_presets_match_full_scan(self, preset):
+        index = SynsetTokenIndex(NAMES)
+        assert match_wnids(NAMES, KEYWORD_PRESETS[preset], index) == _reference(NAMES, KEYWORD_PRESETS[preset])
+
+    def test_candidates_narrow_the_search(self):
+        index = SynsetTokenIndex(NAMES)
+        wnids = [index.wnids[i] for i in sorted(index.candidates("hunting dog"))]
+        assert wnids == ["n007", "n011"]  # n011 is non-ASCII and always a candidate
+
+    def test_phrases_longer_than_max_ngram(self):
+        index = SynsetTokenIndex(NAMES, max_ngram=2)
+        keywords = ["African hunting dog, hyena"]
+        assert match_wnids(NAMES, keywords, index) == _reference(NAMES, keywords) == ["n007"]
+
+    def test_unindexable_keyword_falls_back_to_scan(self):
+        index = SynsetTokenIndex(NAMES)
+        assert index.candidates("++") is None
+        assert index.candidates("caf\u00e9") is None
+
+    def test_filter_categories_with_index(self):
+        index = SynsetTokenIndex(NAMES)
+        assert filter_categories(NAMES, {"n001": [], "n004": []}, ["retriever", "chihuahua", "dog"], index) == ["n001", "n004"]
+
+
+FUZZY_NAMES = {
+    "n101": "dingo, warrigal, Canis dingo",
+    "n102": "Chihuahua dog",
+    "n103": "golden retriever",
+    "n104": "African hunting dog, hyena dog",
+    "n105": "hot dog, red hot",
+}
+
+
+class TestFuzzyMatching:
+    """Trigram index matches spelling variants and ranks by similarity."""
+
+    def test_typo_matches(self):
+        index = SynsetTrigramIndex(FUZZY_NAMES)
+        assert [wnid for wnid, _ in index.search("warragal")] == ["n101"]
+        assert [wnid for wnid, _ in index.search("retreiver")] == ["n103"]
+
+    def test_word_inside_synonym_matches(self):
+        index = SynsetTrigramIndex(FUZZY_NAMES)
+        assert index.search("chihuahua") == [("n102", 1.0)]
+
+    def test_ranked_by_similarity(self):
+        index = SynsetTrigramIndex(FUZZY_NAMES)
+        ranked = index.search("hunting dogs", threshold=0.2)
+        similarities = [similarity for _, similarity in ranked]
+        assert ranked[0][0] == "n104"
+        assert similarities == sorted(similarities, reverse=True)
+
+    @pytest.mark.parametrize("keyword, expected", [
+        ("Labrador retriever", ["labrador"]),
+        ("American alligator", ["american"]),
+        ("retriever", ["labrador", "golden", "chesapeake"]),
+    ])
+    def test_multi_word_keyword_needs_whole_synonym(self, keyword, expected):
+        index = SynsetTrigramIndex({
+            "labrador": "Labrador retriever",
+            "golden": "golden retriever",
+            "chesapeake": "Chesapeake Bay retriever",
+            "american": "American alligator, Alligator mississipiensis",
+            "lizard": "alligator lizard",
+        })
+        assert [wnid for wnid, _ in index.search(keyword)] == expected
+
+    def test_threshold_filters(self):
+        index = SynsetTrigramIndex(FUZZY_NAMES)
+        assert index.search("warragal", threshold=0.9) == []
+        assert index.search("+++") == []
+
+    def test_exact_matches_kept(self):
+        index = SynsetTrigramIndex(FUZZY_NAMES)
+        selected = filter_categories(FUZZY_NAMES, FUZZY_NAMES, ["hot", "warragal"], fuzzy_index=index)
+        assert selected == ["n101", "n105"]
+
+    def test_fuzzy_match_wnids_in_mapping_order(self):
+        index = SynsetTrigramIndex(FUZZY_NAMES)
+        assert fuzzy_match_wnids(index, ["retreiver", "warragal"]) == ["n101", "n103"]
@@ -95,6 +95,26 @@ class TestCustomKeywords:
         assert "n01531178" in wnids_found
 
 
+class TestFuzzyKeywords:
+    """Verify the opt-in fuzzy mode matches misspelled keywords."""
+
+    def test_typo_matches_only_when_fuzzy(self, mock_imagenet):
+        """A misspelled keyword finds its category only with fuzzy=True."""
+        assert get_image_paths_by_keywords(mock_imagenet, keywords=["goldfinck"], num_images=100) == []
+        paths = get_image_paths_by_keywords(mock_imagenet, keywords=["goldfinck"], num_images=100, fuzzy=True)
+        assert {p.parent.name for p in paths} == {"n01531178"}
+
+    def test_custom_threshold(self, mock_imagenet):
+        """A strict threshold rejects the misspelling."""
+        paths = get_image_paths_by_keywords(mock_imagenet, keywords=["goldfinck"], num_images=100, fuzzy=0.95)
+        assert paths == []
+
+    def test_invalid_threshold_raises_value_error(self, mock_imagenet):
+        """Thresholds outside (0, 1] raise ValueError."""
+        with pytest.raises(ValueError, match="fuzzy threshold"):
+            get_image_paths_by_keywords(mock_imagenet, keywords=["goldfinch"], fuzzy=1.5)
+
+
 # ---------------------------------------------------------------------------
 # Return values
 # ---------------------------------------------------------------------------
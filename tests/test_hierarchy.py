@@ -0,0 +1,134 @@
+"""Tests for the WordNet hierarchy and hypernym selection."""
+import random
+
+import pytest
+
+from parseimagenet import ImageNetSession, get_image_paths_by_keywords
+from parseimagenet.helpers.cache import default_cache_dir
+from parseimagenet.helpers.hierarchy import WordNetHierarchy, load_hierarchy
+
+
+IS_A_LINES = [
+    "n00015388 n01503061",  # animal -> bird
+    "n01503061 n01525720",  # bird -> passerine
+    "n01525720 n01530575",  # passerine -> indigo bunting
+    "n01525720 n01531178",  # passerine -> goldfinch
+    "n00015388 n01661091",  # animal -> reptile
+    "n01661091 n01726692",  # reptile -> snake
+    "n01726692 n01740131",  # snake -> green mamba
+    "n00015388 n02084071",  # animal -> dog
+    "n02084071 n02099601",  # dog -> golden retriever
+    "n09999999 n02099601",  # pet -> golden retriever (second parent)
+]
+
+
+@pytest.fixture
+def hierarchy_imagenet(mock_imagenet):
+    (mock_imagenet / "wordnet.is_a.txt").write_text("\n".join(IS_A_LINES) + "\n")
+    return mock_imagenet
+
+
+def _reference_is_under(edges, wnid, hypernym):
+    """Walk parent links upward from wnid."""
+    parents = {}
+    for parent, child in edges:
+        parents.setdefault(child, []).append(parent)
+    pending, seen = [wnid], set()
+    while pending:
+        node = pending.pop()
+        if node == hypernym:
+            return True
+        if node not in seen:
+            seen.add(node)
+            pending.extend(parents.get(node, []))
+    return False
+
+
+class TestClosure:
+    """The interval closure answers ancestor queries exactly."""
+
+    def test_tree_membership(self):
+        hierarchy = WordNetHierarchy.from_edges(line.split() for line in IS_A_LINES)
+        assert hierarchy.is_under("n01530575", "n01503061")
+        assert hierarchy.is_under("n01740131", "n00015388")
+        assert hierarchy.is_under("n01503061", "n01503061")
+        assert not hierarchy.is_under("n01740131", "n01503061")
+        assert not hierarchy.is_under("n01503061", "n01530575")
+
+    def test_multiple_parents(self):
+        hierarchy = WordNetHierarchy.from_edges(line.split() for line in IS_A_LINES)
+        assert hierarchy.is_under("n02099601", "n09999999")
+        assert hierarchy.is_under("n02099601", "n02084071")
+        assert not hierarchy.is_under("n01531178", "n09999999")
+
+    def test_random_dag_matches_reference(self):
+        rng = random.Random(3)
+        nodes = [f"n{i:08d}" for i in range(60)]
+        edges = [(nodes[rng.randrange(i)], nodes[i]) for i in range(1, 60) for _ in range(rng.randint(1, 3))]
+        hierarchy = WordNetHierarchy.from_edges(edges)
+        for wnid in nodes:
+            for hypernym in nodes:
+                assert hierarchy.is_under(wnid, hypernym) == _reference_is_under(edges, wnid, hypernym)
+
+    def test_cycles_terminate(self):
+        hierarchy = WordNetHierarchy.from_edges([("a", "b"), ("b", "c"), ("c", "a")])
+        assert len(hierarchy) == 3
+        assert hierarchy.is_under("c", "a")
+
+    def test_unknown_hypernym_raises(self):
+        hierarchy = WordNetHierarchy.from_edges(line.split() for line in IS_A_LINES)
+        with pytest.raises(ValueError, match="n00000000"):
+            hierarchy.select(["n01530575"], ["n00000000"])
+
+    def test_sections_roundtrip(self):
+        hierarchy = WordNetHierarchy.from_edges(line.split() for line in IS_A_LINES)
+        restored = WordNetHierarchy.from_sections(*hierarchy.to_sections())
+        assert restored.wnids == hierarchy.wnids
+        assert restored.starts == hierarchy.starts and restored.ends == hierarchy.ends
+
+
+class TestLoadHierarchy:
+    """The closure is compiled once and cached."""
+
+    def test_cache_file_written_and_reused(self, hierarchy_imagenet, monkeypatch):
+        first = load_hierarchy(hierarchy_imagenet)
+        assert (default_cache_dir(hierarchy_imagenet) / "hierarchy.bin").exists()
+        monkeypatch.setattr(WordNetHierarchy, "from_file", classmethod(lambda cls, path: pytest.fail("reparsed")))
+        second = load_hierarchy(hierarchy_imagenet)
+        assert second.wnids == first.wnids
+
+    def test_missing_file_raises(self, mock_imagenet):
+        with pytest.raises(FileNotFoundError):
+            load_hierarchy(mock_imagenet)
+
+
+class TestHypernymQueries:
+    """hypernyms selects classes by ancestry."""
+
+    def test_birds_by_hypernym(self, hierarchy_imagenet):
+        paths = get_image_paths_by_keywords(hierarchy_imagenet, hypernyms=["n01503061"], num_images=100)
+        assert {path.parent.name for path in paths} == {"n01530575", "n01531178"}
+
+    def test_union_with_keywords(self, hierarchy_imagenet):
+        paths = get_image_paths_by_keywords(hierarchy_imagenet, keywords=["mamba"], hypernyms=["n02084071"],
+                                            num_images=100)
+        assert {path.parent.name for path in paths} == {"n01740131", "n02099601"}
+
+    def test_cold_and_warm_agree(self, hierarchy_imagenet):
+        session = ImageNetSession(hierarchy_imagenet)
+        cold = session.query(hypernyms=["n01661091"], num_images=100)
+        session.category_index("train")
+        warm = session.query(hypernyms=["n01661091"], num_images=100)
+        assert sorted(cold) == sorted(warm)
+        assert len(cold) == 5
+
+    def test_hypernyms_must_be_list(self, hierarchy_imagenet):
+        with pytest.raises(TypeError):
+            get_image_paths_by_keywords(hierarchy_imagenet, hypernyms="n01503061")
+
+    def test_custom_hierarchy_file(self, mock_imagenet, tmp_path_factory):
+        is_a_file = tmp_path_factory.mktemp("wordnet") / "is_a.txt"
+        is_a_file.write_text("n01726692 n01740131\n")
+        paths = get_image_paths_by_keywords(mock_imagenet, hypernyms=["n01726692"], hierarchy_file=is_a_file,
+                                            num_images=100)
+        assert {path.parent.name for path in paths} == {"n01740131"}
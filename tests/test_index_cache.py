@@ -0,0 +1,85 @@
+"""Tests for the compiled on-disk annotation index."""
+import os
+
+from parseimagenet import get_image_paths_by_keywords
+from parseimagenet.helpers.annotations import parse_annotations
+from parseimagenet.helpers.cache import load_index, default_cache_dir
+from parseimagenet.helpers.paths import resolve_paths
+from parseimagenet.helpers.synset import get_synset_mapping
+
+
+def _load(base, source="train", **kwargs):
+    annotations_file, _ = resolve_paths(base, source)
+    return load_index(base, source, annotations_file, **kwargs)
+
+
+class TestCacheRoundTrip:
+    """Cached loads must be identical to a direct text parse."""
+
+    def test_cold_load_writes_index_file(self, mock_imagenet, isolated_cache_dir):
+        _load(mock_imagenet)
+        assert (default_cache_dir(mock_imagenet) / "index-train.bin").exists()
+
+    def test_warm_load_matches_parse(self, mock_imagenet):
+        _load(mock_imagenet)
+        synset_mapping, category_images = _load(mock_imagenet)
+        annotations_file, _ = resolve_paths(mock_imagenet, "train")
+        assert synset_mapping == get_synset_mapping(mock_imagenet)
+        assert dict(category_images) == dict(parse_annotations(annotations_file, mock_imagenet, "train"))
+
+    def test_val_warm_load_matches_parse(self, mock_imagenet):
+        _load(mock_imagenet, "val")
+        _, category_images = _load(mock_imagenet, "val")
+        annotations_file, _ = resolve_paths(mock_imagenet, "val")
+        assert dict(category_images) == dict(parse_annotations(annotations_file, mock_imagenet, "val"))
+
+    def test_warm_load_skips_text_parse(self, mock_imagenet, monkeypatch):
+        _load(mock_imagenet)
+        import parseimagenet.helpers.cache as cache
+
+        def _fail(*args, **kwargs):
+            raise AssertionError("text parse should not run on a warm load")
+
+        monkeypatch.setattr(cache, "parse_annotations", _fail)
+        _, category_images = _load(mock_imagenet)
+        assert len(category_images) == 5
+
+
+class TestInvalidation:
+    """The index is rebuilt whenever a source file changes."""
+
+    def test_rebuilds_when_annotations_change(self, mock_imagenet):
+        _load(mock_imagenet)
+        train_cls = mock_imagenet / "ILSVRC" / "ImageSets" / "CLS-LOC" / "train_cls.txt"
+        with open(train_cls, "a") as f:
+            f.write("n02099601/n02099601_9999 99\n")
+        _, category_images = _load(mock_imagenet)
+        assert "n02099601/n02099601_9999" in category_images["n02099601"]
+
+    def test_rebuilds_when_synset_mapping_changes(self, mock_imagenet):
+        _load(mock_imagenet)
+        mapping = mock_imagenet / "LOC_synset_mapping.txt"
+        stat = mapping.stat()
+        mapping.write_text(mapping.read_text().replace("golden retriever", "golden doodle"))
+        os.utime(mapping, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        synset_mapping, _ = _load(mock_imagenet)
+        assert synset_mapping["n02099601"] == "golden doodle"
+
+    def test_corrupt_index_is_ignored(self, mock_imagenet):
+        _load(mock_imagenet)
+        (default_cache_dir(mock_imagenet) / "index-train.bin").write_bytes(b"garbage")
+        _, category_images = _load(mock_imagenet)
+        assert len(category_images) == 5
+
+
+class TestUseCacheFlag:
+    """use_cache=False bypasses the compiled index entirely."""
+
+    def test_no_index_written_when_disabled(self, mock_imagenet):
+        _load(mock_imagenet, use_cache=False)
+        assert not (default_cache_dir(mock_imagenet) / "index-train.bin").exists()
+
+    def test_results_identical_with_and_without_cache(self, mock_imagenet):
+        uncached = get_image_paths_by_keywords(mock_imagenet, num_images=999, use_cache=False)
+        cached = get_image_paths_by_keywords(mock_imagenet, num_images=999)
+        assert sorted(uncached) == sorted(cached)
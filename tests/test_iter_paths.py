@@ -0,0 +1,73 @@
+"""Tests for iter_image_paths() and ImageNetSession.iter_query()."""
+import random
+import types
+
+import pytest
+
+from parseimagenet import ImageNetSession, get_image_paths_by_keywords, iter_image_paths
+from parseimagenet.helpers.category_index import CategoryIndex
+from parseimagenet.helpers.sampling import PositionStems, sample_stems
+from parseimagenet.helpers.validation import validate_batch_size
+
+
+class TestIterImagePaths:
+    """The generator yields what the list API returns, lazily."""
+
+    @pytest.mark.parametrize("kwargs", [
+        {"preset": "birds"},
+        {"num_images": 7, "source": "val"},
+        {"strategy": "stratified", "per_class": 2},
+        {"num_images": 9, "stream": True},
+        {"num_images": 10, "rank": 1, "world_size": 2},
+    ])
+    def test_same_as_list_api(self, mock_imagenet, kwargs):
+        expected = get_image_paths_by_keywords(mock_imagenet, seed=3, **kwargs)
+        assert list(iter_image_paths(mock_imagenet, seed=3, **kwargs)) == expected
+
+    def test_batches(self, mock_imagenet):
+        batches = list(iter_image_paths(mock_imagenet, num_images=23, batch_size=5, seed=1))
+        assert [len(batch) for batch in batches] == [5, 5, 5, 5, 3]
+        assert [path for batch in batches for path in batch] == get_image_paths_by_keywords(
+            mock_imagenet, num_images=23, seed=1)
+
+    def test_resolves_one_batch_at_a_time(self, mock_imagenet, monkeypatch):
+        session = ImageNetSession(mock_imagenet)
+        resolved = []
+        original = session.resolve_paths
+        monkeypatch.setattr(session, "resolve_paths", lambda stems, source: resolved.append(len(stems))
+                            or original(stems, source))
+        iterator = session.iter_query(num_images=20, batch_size=4, seed=0)
+        assert isinstance(iterator, types.GeneratorType)
+        next(iterator)
+        assert resolved == [4]
+
+    def test_with_boxes(self, mock_imagenet):
+        pairs = list(iter_image_paths(mock_imagenet, num_images=3, source="val", with_boxes=True, seed=0))
+        assert len(pairs) == 3 and all(isinstance(boxes, list) for _, boxes in pairs)
+
+    def test_invalid_arguments_raise_eagerly(self, mock_imagenet):
+        with pytest.raises(ValueError, match="Unknown preset"):
+            iter_image_paths(mock_imagenet, preset="nonexistent")
+        with pytest.raises(ValueError, match="batch_size"):
+            iter_image_paths(mock_imagenet, batch_size=0)
+
+    @pytest.mark.parametrize("batch_size", [0, -1, 2.0, True, "4"])
+    def test_validate_batch_size(self, batch_size):
+        with pytest.raises(ValueError, match="positive int"):
+            validate_batch_size(batch_size)
+        validate_batch_size(None)
+
+
+class TestPositionStems:
+    """The lazy view decodes the same stems as the list."""
+
+    def test_lazy_matches_list(self):
+        index = CategoryIndex.from_pairs((f"n{c}", f"n{c}/img_{i}") for c in range(3) for i in range(10))
+        random.seed(2)
+        expected, _ = sample_stems(index, ["n2", "n0"], 8)
+        random.seed(2)
+        lazy, total = sample_stems(index, ["n2", "n0"], 8, lazy=True)
+        assert isinstance(lazy, PositionStems)
+        assert total == 20
+        assert list(lazy) == lazy[:] == expected
+        assert lazy[3] == expected[3]
@@ -0,0 +1,133 @@
+"""Tests for the memory-mapped binary-search extraction of train classes."""
+import pytest
+
+from parseimagenet import ImageNetSession, get_image_paths_by_keywords
+from parseimagenet.ParseImageNetSubset import get_session
+from parseimagenet.helpers import annotations, cache
+from parseimagenet.helpers.annotations import is_sorted_by_wnid, parse_train_annotations
+from parseimagenet.helpers.cache import default_cache_dir
+
+
+def _write_train_cls(path, wnids, per_class=5, blank_every=None):
+    lines = []
+    for wnid in wnids:
+        for i in range(per_class):
+            lines.append(f"{wnid}/{wnid}_{i:04d} {len(lines) + 1}")
+            if blank_every and len(lines) % blank_every == 0:
+                lines.append("")
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+SORTED_WNIDS = [f"n{i:08d}" for i in range(1, 201)]
+
+
+class TestSortedExtraction:
+    """A sorted file yields exactly the classes a full parse would."""
+
+    @pytest.mark.parametrize("wanted", [
+        ["n00000001"],
+        ["n00000200"],
+        ["n00000050", "n00000007", "n00000123"],
+        ["n00000042", "n99999999"],
+    ])
+    def test_matches_full_parse(self, tmp_path, wanted):
+        train_cls = _write_train_cls(tmp_path / "train_cls.txt", SORTED_WNIDS)
+        lazy = parse_train_annotations(train_cls, wanted)
+        full = parse_train_annotations(train_cls)
+        assert lazy == full.subset(wanted)
+        assert list(lazy) == [wnid for wnid in full if wnid in wanted]
+
+    def test_blank_lines_are_skipped(self, tmp_path):
+        train_cls = _write_train_cls(tmp_path / "train_cls.txt", SORTED_WNIDS, blank_every=7)
+        lazy = parse_train_annotations(train_cls, ["n00000010", "n00000011"])
+        assert lazy.total == 10
+
+    def test_only_requested_blocks_are_decoded(self, tmp_path, monkeypatch):
+        train_cls = _write_train_cls(tmp_path / "train_cls.txt", SORTED_WNIDS)
+        decoded = []
+        original = annotations._add_train_lines
+
+        def _spy(builder, lines, only_wnid=None):
+            decoded.extend(line for line in lines if line.strip())
+            return original(builder, lines, only_wnid)
+
+        monkeypatch.setattr(annotations, "_add_train_lines", _spy)
+        parse_train_annotations(train_cls, ["n00000100"])
+        assert len(decoded) == 5
+
+    def test_empty_file(self, tmp_path):
+        train_cls = tmp_path / "train_cls.txt"
+        train_cls.write_text("")
+        assert len(parse_train_annotations(train_cls, ["n00000001"])) == 0
+
+    def test_no_wanted_wnids(self, tmp_path):
+        train_cls = _write_train_cls(tmp_path / "train_cls.txt", SORTED_WNIDS)
+        assert len(parse_train_annotations(train_cls, [])) == 0
+
+
+class TestUnsortedFallback:
+    """Unsorted files are detected and parsed in full instead."""
+
+    def test_unsorted_file_falls_back(self, tmp_path):
+        train_cls = _write_train_cls(tmp_path / "train_cls.txt", list(reversed(SORTED_WNIDS)))
+        lazy = parse_train_annotations(train_cls, ["n00000001", "n00000150"])
+        assert lazy.total == 10
+        assert set(lazy) == {"n00000001", "n00000150"}
+
+    def test_single_misplaced_line_detected(self, tmp_path):
+        train_cls = _write_train_cls(tmp_path / "train_cls.txt", SORTED_WNIDS, per_class=500)
+        with open(train_cls, "a") as f:
+            f.write("n00000005/n00000005_extra 100001\n")
+        assert not is_sorted_by_wnid(train_cls)
+        assert parse_train_annotations(train_cls, ["n00000005"]).total == 501
+
+    def test_sortedness_cached_per_signature(self, mock_imagenet, monkeypatch):
+        checks = []
+        original = cache.is_sorted_by_wnid
+        monkeypatch.setattr(cache, "is_sorted_by_wnid", lambda path: checks.append(path) or original(path))
+        for _ in range(2):
+            get_image_paths_by_keywords(mock_imagenet, keywords=["green mamba"], num_images=1)
+            get_session(mock_imagenet).clear()
+        assert len(checks) == 1
+
+    def test_sortedness_kept_by_uncached_session(self, mock_imagenet, monkeypatch):
+        checks = []
+        original = cache.is_sorted_by_wnid
+        monkeypatch.setattr(cache, "is_sorted_by_wnid", lambda path: checks.append(path) or original(path))
+        session = ImageNetSession(mock_imagenet, use_cache=False)
+        session.query(keywords=["green mamba"], num_images=1, silent=True)
+        session.query(keywords=["golden retriever"], num_images=1, silent=True)
+        assert len(checks) == 1
+
+    def test_no_order_check_without_a_place_to_keep_it(self, mock_imagenet, monkeypatch):
+        monkeypatch.setattr(cache, "is_sorted_by_wnid", lambda path: pytest.fail("order checked"))
+        train_cls = mock_imagenet / "ILSVRC" / "ImageSets" / "CLS-LOC" / "train_cls.txt"
+        _, category_images = cache.load_index(mock_imagenet, "train", train_cls, use_cache=False,
+                                              select=lambda mapping: pytest.fail("partial parse"))
+        assert category_images.total == 25
+
+
+class TestPipeline:
+    """Keyword queries on a cold index use the lazy path only where it pays off."""
+
+    def test_narrow_query_skips_full_index(self, mock_imagenet):
+        train_cls = mock_imagenet / "ILSVRC" / "ImageSets" / "CLS-LOC" / "train_cls.txt"
+        train_cls.write_text("".join(sorted(train_cls.read_text().splitlines(keepends=True))))
+        paths = get_image_paths_by_keywords(mock_imagenet, keywords=["green mamba"], num_images=100)
+        assert len(paths) == 5
+        assert not (default_cache_dir(mock_imagenet) / "index-train.bin").exists()
+
+    def test_val_keyword_query_builds_index(self, mock_imagenet):
+        get_image_paths_by_keywords(mock_imagenet, keywords=["green mamba"], source="val", num_images=1)
+        assert (default_cache_dir(mock_imagenet) / "index-val.bin").exists()
+
+    def test_unsorted_keyword_query_builds_index(self, mock_imagenet):
+        train_cls = mock_imagenet / "ILSVRC" / "ImageSets" / "CLS-LOC" / "train_cls.txt"
+        assert not is_sorted_by_wnid(train_cls)
+        assert len(get_image_paths_by_keywords(mock_imagenet, keywords=["green mamba"], num_images=100)) == 5
+        assert (default_cache_dir(mock_imagenet) / "index-train.bin").exists()
+
+    def test_all_categories_builds_index(self, mock_imagenet):
+        get_image_paths_by_keywords(mock_imagenet, num_images=1)
+        assert (default_cache_dir(mock_imagenet) / "index-train.bin").exists()
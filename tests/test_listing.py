@@ -0,0 +1,114 @@
+"""Tests for the directory-listing cache used to resolve image files."""
+import os
+
+import pytest
+
+from parseimagenet import ImageNetSession
+from parseimagenet.helpers import listing as listing_module
+from parseimagenet.helpers.cache import default_cache_dir
+from parseimagenet.helpers.listing import DirectoryListingCache
+from parseimagenet.helpers.sampling import resolve_image_paths
+
+
+def _glob_resolve(stems, data_path):
+    """The previous per-image glob implementation."""
+    paths = []
+    for stem in stems:
+        stem_path = data_path / stem
+        matches = list(stem_path.parent.glob(f"{stem_path.name}.*"))
+        paths.append(matches[0] if matches else stem_path)
+    return paths
+
+
+@pytest.fixture
+def scandir_calls(monkeypatch):
+    """Record the directories listed through os.scandir."""
+    calls = []
+    original = os.scandir
+
+    def _counting(path):
+        calls.append(str(path))
+        return original(path)
+
+    monkeypatch.setattr(listing_module.os, "scandir", _counting)
+    return calls
+
+
+class TestResolve:
+    """Listings resolve stems exactly like the per-image glob."""
+
+    def test_matches_glob(self, tmp_path):
+        (tmp_path / "a").mkdir()
+        for name in ["x.JPEG", "y.png", "z.tar.gz", "w.", ".hidden.JPEG", "notes"]:
+            (tmp_path / "a" / name).write_bytes(b"")
+        stems = ["a/x", "a/y", "a/z", "a/z.tar", "a/w", "a/missing", "a/notes", "b/x"]
+        assert resolve_image_paths(stems, tmp_path) == _glob_resolve(stems, tmp_path)
+
+    def test_train_and_val_layouts(self, mock_imagenet):
+        session = ImageNetSession(mock_imagenet)
+        for source in ("train", "val"):
+            stems = list(session.category_index(source)[next(iter(session.category_index(source)))])
+            _, data_path = session.paths(source)
+            assert session.resolve_paths(stems, source) == _glob_resolve(stems, data_path)
+
+    def test_one_listing_per_directory(self, mock_imagenet, scandir_calls):
+        session = ImageNetSession(mock_imagenet)
+        session.query(preset=None, num_images=25)
+        session.query(preset=None, num_images=25)
+        assert len(scandir_calls) == len(set(scandir_calls)) == 5
+
+    def test_relisted_when_directory_changes(self, tmp_path):
+        (tmp_path / "a").mkdir()
+        listings = DirectoryListingCache()
+        assert listings.resolve(["a/new"], tmp_path) == [tmp_path / "a" / "new"]
+        (tmp_path / "a" / "new.JPEG").write_bytes(b"")
+        os.utime(tmp_path / "a", ns=(0, (tmp_path / "a").stat().st_mtime_ns + 10 ** 9))
+        assert listings.resolve(["a/new"], tmp_path) == [tmp_path / "a" / "new.JPEG"]
+
+
+class TestPersistence:
+    """Listings can be saved to and reloaded from the cache directory."""
+
+    def test_roundtrip(self, tmp_path):
+        (tmp_path / "a").mkdir()
+        for name in ["x.JPEG", "x.png", "y.JPEG"]:
+            (tmp_path / "a" / name).write_bytes(b"")
+        listings = DirectoryListingCache()
+        expected = listings.resolve(["a/x", "a/y"], tmp_path)
+        listings.save(tmp_path / "listings.bin")
+        restored = DirectoryListingCache.load(tmp_path / "listings.bin")
+        assert len(restored) == 1
+        assert restored.listing(tmp_path / "a") == listings.listing(tmp_path / "a")
+        assert restored.resolve(["a/x", "a/y"], tmp_path) == expected
+
+    def test_session_reuses_saved_listings(self, mock_imagenet, scandir_calls):
+        ImageNetSession(mock_imagenet, persist_listings=True).query(preset=None, num_images=25)
+        assert (default_cache_dir(mock_imagenet) / "listings.bin").exists()
+        listed = len(scandir_calls)
+        ImageNetSession(mock_imagenet, persist_listings=True).query(preset=None, num_images=25)
+        assert len(scandir_calls) == listed
+
+    def test_unreadable_file_gives_empty_cache(self, tmp_path):
+        (tmp_path / "listings.bin").write_bytes(b"garbage")
+        assert len(DirectoryListingCache.load(tmp_path / "listings.bin")) == 0
+
+
+class TestAssumeExtension:
+    """The dominant-extension fast path is only taken once verified."""
+
+    def test_verified_extension_used(self, mock_imagenet, scandir_calls):
+        session = ImageNetSession(mock_imagenet, assume_extension=True)
+        first = session.query(preset=None, num_images=25)
+        listed = len(scandir_calls)
+        assert session.listings.extensions[str(session.paths("train")[1])] == ".JPEG"
+        second = session.query(preset=None, num_images=25)
+        assert len(scandir_calls) == listed
+        assert sorted(first) == sorted(second)
+
+    def test_mixed_extensions_fall_back(self, mock_imagenet):
+        _, data_path = ImageNetSession(mock_imagenet).paths("train")
+        (data_path / "n01530575" / "n01530575_0000.JPEG").rename(data_path / "n01530575" / "n01530575_0000.png")
+        session = ImageNetSession(mock_imagenet, assume_extension=True)
+        paths = session.resolve_paths(["n01530575/n01530575_0000"], "train")
+        assert session.listings.extensions[str(data_path)] is None
+        assert paths == [data_path / "n01530575" / "n01530575_0000.png"]
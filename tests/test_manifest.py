@@ -0,0 +1,72 @@
+"""Tests for the memory-mapped binary manifest."""
+import pickle
+
+import pytest
+
+from parseimagenet import Manifest, get_selection
+from parseimagenet.helpers.manifest import write_manifest
+
+
+class TestManifestFile:
+    """write_manifest() and Manifest round-trip entries."""
+
+    def test_round_trip(self, tmp_path):
+        entries = [("n1/a.JPEG", 0, 10), ("n2/bé.JPEG", 1, -1), ("n1/c.JPEG", 0, 7)]
+        assert write_manifest(tmp_path / "m.bin", tmp_path, entries, ["n1", "n2"], with_sizes=True) == 3
+        with Manifest(tmp_path / "m.bin") as manifest:
+            assert len(manifest) == 3
+            assert manifest[1] == (tmp_path / "n2/bé.JPEG", 1)
+            assert manifest[-1] == (tmp_path / "n1/c.JPEG", 0)
+            assert manifest[:2] == [(tmp_path / "n1/a.JPEG", 0), (tmp_path / "n2/bé.JPEG", 1)]
+            assert list(manifest.sizes) == [10, -1, 7]
+            assert manifest.classes == ["n1", "n2"]
+            with pytest.raises(IndexError):
+                manifest[3]
+
+    def test_sections_aligned(self, tmp_path):
+        write_manifest(tmp_path / "m.bin", tmp_path, [("x", 0)], ["n1"])
+        with Manifest(tmp_path / "m.bin") as manifest:
+            assert manifest.sizes is None
+            assert all(section["offset"] % 64 == 0 for section in manifest.sections.values())
+            raw = (tmp_path / "m.bin").read_bytes()
+            labels = manifest.sections["labels"]
+            assert int.from_bytes(raw[labels["offset"]:labels["offset"] + 4], "little", signed=True) == 0
+
+    def test_empty(self, tmp_path):
+        write_manifest(tmp_path / "m.bin", tmp_path, [], [])
+        with Manifest(tmp_path / "m.bin") as manifest:
+            assert len(manifest) == 0 and list(manifest) == []
+
+    def test_pickles_as_path(self, tmp_path):
+        write_manifest(tmp_path / "m.bin", tmp_path, [("x", 0)], ["n1"])
+        manifest = Manifest(tmp_path / "m.bin")
+        data = pickle.dumps(manifest)
+        assert len(data) < 200
+        assert pickle.loads(data)[0] == manifest[0]
+        manifest.close()
+
+    def test_not_a_manifest(self, tmp_path):
+        (tmp_path / "m.bin").write_bytes(b"garbage!")
+        with pytest.raises(ValueError, match="not a manifest"):
+            Manifest(tmp_path / "m.bin")
+
+
+class TestSelectionExport:
+    """Selection.export_manifest() writes labelled paths."""
+
+    def test_export_all(self, mock_imagenet, tmp_path):
+        selection = get_selection(mock_imagenet)
+        assert selection.export_manifest(tmp_path / "m.bin", with_sizes=True) == len(selection)
+        with Manifest(tmp_path / "m.bin") as manifest:
+            assert manifest.classes == sorted(selection.wnids)
+            entries = list(manifest)
+            assert [path for path, _ in entries] == selection.paths(range(len(selection)))
+            assert all(manifest.classes[label] == path.parent.name for path, label in entries)
+            assert list(manifest.sizes) == [path.stat().st_size for path, _ in entries]
+
+    def test_export_split(self, mock_imagenet, tmp_path):
+        selection = get_selection(mock_imagenet)
+        train, _ = selection.split((0.6, 0.4), seed=0)
+        selection.export_manifest(tmp_path / "train.bin", ids=train)
+        with Manifest(tmp_path / "train.bin") as manifest:
+            assert [path for path, _ in manifest] == selection.paths(train)
@@ -0,0 +1,128 @@
+"""Tests for materializing selections into an ImageFolder tree."""
+import os
+
+import pytest
+
+from parseimagenet import get_image_paths_by_keywords, get_selection
+from parseimagenet.helpers import materialize as materialize_module
+from parseimagenet.helpers.materialize import JOURNAL_NAME, materialize
+
+
+@pytest.fixture
+def images(tmp_path):
+    """Six hundred small source files over two classes."""
+    source = tmp_path / "source"
+    source.mkdir()
+    items = []
+    for i in range(600):
+        path = source / f"img_{i}.JPEG"
+        path.write_bytes(b"x" * i)
+        items.append((path, "n1" if i % 3 else "n2"))
+    return items
+
+
+def _tree(out_dir):
+    return sorted(str(path.relative_to(out_dir)) for path in out_dir.rglob("*.JPEG"))
+
+
+class TestMaterialize:
+    """Files are placed under out_dir/<wnid>/<name> with each strategy."""
+
+    @pytest.mark.parametrize("strategy", ["hardlink", "symlink", "reflink", "copy"])
+    def test_strategies(self, images, tmp_path, strategy):
+        out_dir = tmp_path / "out"
+        assert materialize(images, out_dir, strategy) == (600, [])
+        assert _tree(out_dir) == sorted(f"{wnid}/{path.name}" for path, wnid in images)
+        path, wnid = images[7]
+        placed = out_dir / wnid / path.name
+        assert placed.read_bytes() == path.read_bytes()
+        assert placed.is_symlink() == (strategy == "symlink")
+        assert os.path.samefile(placed, path) == (strategy in ("hardlink", "symlink"))
+        assert not list(out_dir.rglob("*.tmp"))
+
+    def test_duplicates_placed_once(self, images, tmp_path):
+        assert materialize(images[:5] + images[:5], tmp_path / "out", "copy") == (5, [])
+
+    @pytest.mark.parametrize("strategy", ["hardlink", "symlink", "reflink", "copy"])
+    def test_missing_sources_skipped(self, images, tmp_path, strategy):
+        gone = [images[3][0], images[400][0]]
+        for path in gone:
+            path.unlink()
+        out_dir = tmp_path / "out"
+        assert materialize(images, out_dir, strategy) == (598, gone)
+        assert len(_tree(out_dir)) == 598
+        # Recorded in the journal, so the rerun finishes and reports them again
+        assert materialize(images, out_dir, strategy) == (0, gone)
+
+    def test_unknown_strategy(self, images, tmp_path):
+        with pytest.raises(ValueError, match="strategy"):
+            materialize(images, tmp_path / "out", "move")
+
+
+class TestResume:
+    """The journal lets an interrupted job continue where it stopped."""
+
+    def test_rerun_is_noop(self, images, tmp_path):
+        out_dir = tmp_path / "out"
+        materialize(images, out_dir)
+        assert materialize(images, out_dir) == (0, [])
+        assert materialize(images, out_dir, resume=False) == (600, [])
+
+    def test_resume_after_failure(self, images, tmp_path, monkeypatch):
+        out_dir = tmp_path / "out"
+        place_chunk = materialize_module._place_chunk
+        calls = []
+
+        def failing(chunk, *args):
+            calls.append(chunk)
+            if len(calls) == 2:
+                raise OSError("disk full")
+            return place_chunk(chunk, *args)
+
+        monkeypatch.setattr(materialize_module, "_place_chunk", failing)
+        with pytest.raises(OSError, match="disk full"):
+            materialize(images, out_dir, max_workers=1)
+        monkeypatch.setattr(materialize_module, "_place_chunk", place_chunk)
+        # Only the first chunk finished; the rest was cancelled or failed
+        assert materialize(images, out_dir) == (600 - 256, [])
+        assert len(_tree(out_dir)) == 600
+
+    def test_torn_journal_record_ignored(self, images, tmp_path):
+        out_dir = tmp_path / "out"
+        materialize(images, out_dir)
+        journal = out_dir / JOURNAL_NAME
+        lines = journal.read_text().splitlines()
+        journal.write_text("\n".join(lines[:-1]) + "\n" + lines[-1])
+        assert materialize(images, out_dir)[0] > 0
+        assert len(_tree(out_dir)) == 600
+        assert materialize(images, out_dir) == (0, [])
+
+    def test_different_job_starts_over(self, images, tmp_path):
+        out_dir = tmp_path / "out"
+        materialize(images, out_dir)
+        assert materialize(images, out_dir, "copy") == (600, [])
+        assert not (out_dir / images[0][1] / images[0][0].name).samefile(images[0][0])
+
+
+class TestSelectionMaterialize:
+    """Selections and sampled paths materialize by class."""
+
+    def test_selection(self, mock_imagenet, tmp_path):
+        selection = get_selection(mock_imagenet)
+        assert selection.materialize(tmp_path / "out", strategy="symlink") == (len(selection), [])
+        tree = _tree(tmp_path / "out")
+        assert sorted(path.parent.name for path in (tmp_path / "out").rglob("*.JPEG")) == sorted(
+            wnid for wnid, count in zip(selection.wnids, selection.counts) for _ in range(count))
+        assert len(tree) == len(selection)
+
+    def test_sampled_val_paths(self, mock_imagenet, tmp_path):
+        paths = get_image_paths_by_keywords(mock_imagenet, num_images=6, source="val", seed=0)
+        selection = get_selection(mock_imagenet, source="val")
+        ids = selection.ids_of(paths)
+        assert selection.paths(ids) == paths
+        assert selection.materialize(tmp_path / "out", ids=ids, strategy="copy") == (6, [])
+
+    def test_ids_of_unknown_path(self, mock_imagenet):
+        selection = get_selection(mock_imagenet, preset="birds")
+        with pytest.raises(KeyError):
+            selection.ids_of([mock_imagenet / "ILSVRC/Data/CLS-LOC/train/n99999999/x.JPEG"])
@@ -0,0 +1,62 @@
+"""Tests for multi-process chunked parsing of train_cls.txt."""
+import pytest
+
+from parseimagenet import get_image_paths_by_keywords
+from parseimagenet.helpers import annotations
+from parseimagenet.helpers.annotations import parse_train_annotations, _chunk_ranges
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    """Force multi-chunk splitting on small test files."""
+    monkeypatch.setattr(annotations, "_MIN_CHUNK_BYTES", 64)
+
+
+@pytest.fixture
+def train_cls(tmp_path):
+    lines = []
+    for c in range(30):
+        wnid = f"n{c:08d}"
+        lines.extend(f"{wnid}/{wnid}_{i:04d} {len(lines) + i + 1}" for i in range(7))
+    lines.insert(40, "")
+    path = tmp_path / "train_cls.txt"
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+class TestChunkRanges:
+    """Byte ranges cover the file exactly and start on line boundaries."""
+
+    def test_ranges_are_contiguous_and_aligned(self, train_cls, small_chunks):
+        ranges = _chunk_ranges(train_cls, workers=4)
+        data = train_cls.read_bytes()
+        assert len(ranges) > 1
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+        for (_, stop), (start, _) in zip(ranges, ranges[1:]):
+            assert stop == start
+            assert data[start - 1:start] == b"\n"
+
+    def test_small_file_is_one_range(self, train_cls):
+        assert len(_chunk_ranges(train_cls, workers=4)) == 1
+
+
+class TestParallelParse:
+    """Parallel parsing is identical to the serial parser."""
+
+    @pytest.mark.parametrize("workers", [2, 3])
+    def test_identical_to_serial(self, train_cls, small_chunks, workers):
+        serial = parse_train_annotations(train_cls)
+        parallel = parse_train_annotations(train_cls, workers=workers)
+        assert list(parallel) == list(serial)
+        assert parallel == serial
+        assert bytes(parallel.blob) == bytes(serial.blob)
+
+    def test_unsorted_classes_merge_across_chunks(self, tmp_path, small_chunks):
+        lines = [f"n{c % 3:08d}/img_{i:04d} {i}" for i, c in enumerate(range(60))]
+        path = tmp_path / "train_cls.txt"
+        path.write_text("\n".join(lines) + "\n")
+        assert parse_train_annotations(path, workers=2) == parse_train_annotations(path)
+
+    def test_workers_option_on_main_function(self, mock_imagenet, small_chunks):
+        paths = get_image_paths_by_keywords(mock_imagenet, num_images=999, workers=2, use_cache=False)
+        assert len(paths) == 25
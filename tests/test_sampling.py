@@ -0,0 +1,121 @@
+"""Tests for index-based sampling in helpers/sampling.py."""
+import random
+from collections import Counter
+
+import pytest
+
+from parseimagenet.helpers.category_index import CategoryIndex
+from parseimagenet import get_image_paths_by_keywords
+from parseimagenet.helpers.sampling import allocate_quotas, sample_stems
+
+
+GROUPS = {
+    "n001": [f"n001/n001_{i}" for i in range(7)],
+    "n002": [],
+    "n003": [f"n003/n003_{i}" for i in range(3)],
+    "n004": [f"ILSVRC2012_val_{i:08d}" for i in range(11)],
+}
+
+
+def _reference(category_images, matching_wnids, num_images):
+    """The previous implementation: sample from the concatenated stem list."""
+    pooled = []
+    for wnid in matching_wnids:
+        pooled.extend(category_images[wnid])
+    return random.sample(pooled, min(num_images, len(pooled))) if pooled else [], len(pooled)
+
+
+def _index():
+    return CategoryIndex.from_pairs((wnid, stem) for wnid, stems in GROUPS.items() for stem in stems)
+
+
+class TestSampleStems:
+    """Sampling positions gives the same draw as sampling the concatenated list."""
+
+    @pytest.mark.parametrize("num_images", [0, 1, 5, 21, 100])
+    @pytest.mark.parametrize("container", [dict, CategoryIndex])
+    def test_matches_list_sampling(self, num_images, container):
+        category_images = GROUPS if container is dict else _index()
+        matching = ["n004", "n001", "n002", "n003"] if container is dict else ["n004", "n001", "n003"]
+        random.seed(5)
+        expected = _reference(GROUPS, matching, num_images)
+        random.seed(5)
+        assert sample_stems(category_images, matching, num_images) == expected
+
+    def test_total_without_sampling_everything(self):
+        stems, total = sample_stems(_index(), ["n001", "n003"], 2)
+        assert total == 10
+        assert len(stems) == 2
+
+    def test_no_matches(self):
+        assert sample_stems(_index(), [], 10) == ([], 0)
+        assert sample_stems(GROUPS, ["n002"], 10) == ([], 0)
+
+    def test_uniform_over_images(self):
+        rng_state = random.getstate()
+        random.seed(0)
+        counts = Counter()
+        for _ in range(3000):
+            stems, _ = sample_stems(_index(), ["n001", "n003"], 1)
+            counts[stems[0]] += 1
+        random.setstate(rng_state)
+        assert len(counts) == 10
+        assert min(counts.values()) > 200 and max(counts.values()) < 400
+
+
+class TestAllocateQuotas:
+    """Quotas respect class sizes, minimums and redistribute shortfalls."""
+
+    def test_equal_split(self):
+        assert allocate_quotas([10, 10, 10], 9) == [3, 3, 3]
+
+    def test_short_class_redistributed(self):
+        assert allocate_quotas([1, 10, 10], 9) == [1, 4, 4]
+
+    def test_budget_beyond_available(self):
+        assert allocate_quotas([2, 3, 0], 100) == [2, 3, 0]
+
+    def test_proportional(self):
+        assert allocate_quotas([30, 10, 60], 10, weights=[30, 10, 60]) == [3, 1, 6]
+
+    def test_minimum_per_class(self):
+        assert allocate_quotas([1000, 5, 3], 10, weights=[1000, 5, 3], minimum=2) == [6, 2, 2]
+
+    def test_maximum_caps_redistribution(self):
+        assert allocate_quotas([10, 100, 100], 150, maximum=50) == [10, 50, 50]
+        assert allocate_quotas([10, 100, 100], 150, maximum=50, minimum=60) == [10, 60, 60]
+
+    def test_minimum_beyond_budget(self):
+        assert allocate_quotas([5, 5, 5], 3, minimum=2) == [2, 2, 2]
+
+    def test_largest_remainder_sums_exactly(self):
+        counts = [7, 13, 29, 1, 50]
+        for total in range(0, sum(counts) + 5):
+            quotas = allocate_quotas(counts, total, weights=counts)
+            assert sum(quotas) == min(total, sum(counts))
+            assert all(q <= c for q, c in zip(quotas, counts))
+
+
+class TestStratified:
+    """Stratified sampling draws per-class quotas."""
+
+    def test_per_class(self):
+        stems, total = sample_stems(GROUPS, ["n001", "n002", "n003", "n004"], 0, "stratified", per_class=5)
+        per_class = Counter(stem.split("/")[0] if "/" in stem else "val" for stem in stems)
+        assert total == 21
+        assert per_class == {"n001": 5, "n003": 3, "val": 5}  # per_class caps every class
+
+    def test_equal_split_of_budget(self):
+        stems, _ = sample_stems(_index(), ["n001", "n003", "n004"], 9, "stratified")
+        assert len(stems) == 9 and len(set(stems)) == 9
+        assert sum(stem.startswith("n003/") for stem in stems) == 3
+
+    def test_query_api(self, mock_imagenet):
+        paths = get_image_paths_by_keywords(mock_imagenet, preset=None, strategy="stratified", per_class=2)
+        assert sorted(Counter(path.parent.name for path in paths).values()) == [2] * 5
+
+    def test_quotas_require_stratified(self, mock_imagenet):
+        with pytest.raises(ValueError, match="strategy"):
+            get_image_paths_by_keywords(mock_imagenet, per_class=2)
+        with pytest.raises(ValueError, match="Unknown strategy"):
+            get_image_paths_by_keywords(mock_imagenet, strategy="balanced")
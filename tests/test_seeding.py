@@ -0,0 +1,93 @@
+"""Tests for explicit seeds and private generators."""
+import random
+
+import pytest
+
+from parseimagenet import ImageNetSession, get_image_paths_batch, get_image_paths_by_keywords
+from parseimagenet.helpers.sampling import make_rng, reservoir_sample, sample_stems, substream
+
+
+GROUPS = {f"n{c:03d}": [f"n{c:03d}/n{c:03d}_{i}" for i in range(20)] for c in range(6)}
+
+
+class TestMakeRng:
+    """make_rng() picks the generator a query samples with."""
+
+    def test_defaults_to_global(self):
+        assert make_rng() is None
+
+    def test_seed_and_rng(self):
+        rng = random.Random(1)
+        assert make_rng(rng=rng) is rng
+        assert make_rng(3).random() == random.Random(3).random()
+        with pytest.raises(ValueError, match="seed or rng"):
+            make_rng(3, rng)
+
+    def test_substreams_independent_of_creation_order(self):
+        first = [substream(7, key).random() for key in ("a", "b", "c")]
+        second = [substream(7, key).random() for key in ("c", "b", "a")][::-1]
+        assert first == second
+        assert len(set(first)) == 3
+        assert substream(8, "a").random() != first[0]
+
+
+class TestSeededSampling:
+    """A private generator is reproducible and leaves the global state alone."""
+
+    @pytest.mark.parametrize("strategy", ["uniform", "stratified", "proportional"])
+    def test_global_state_untouched(self, strategy):
+        random.seed(0)
+        expected = random.random()
+        random.seed(0)
+        sample_stems(GROUPS, list(GROUPS), 10, strategy, rng=random.Random(5))
+        reservoir_sample(range(100), 5, rng=random.Random(5))
+        assert random.random() == expected
+
+    @pytest.mark.parametrize("strategy", ["uniform", "stratified"])
+    def test_same_seed_same_sample(self, strategy):
+        first = sample_stems(GROUPS, list(GROUPS), 12, strategy, rng=random.Random(9))
+        second = sample_stems(GROUPS, list(GROUPS), 12, strategy, rng=random.Random(9))
+        assert first == second
+
+    def test_stratified_class_draw_independent_of_order(self):
+        forward, _ = sample_stems(GROUPS, list(GROUPS), 0, "stratified", per_class=3, rng=random.Random(2))
+        backward, _ = sample_stems(GROUPS, list(GROUPS)[::-1], 0, "stratified", per_class=3, rng=random.Random(2))
+        assert sorted(forward) == sorted(backward)
+
+    def test_query_api(self, mock_imagenet):
+        random.seed(0)
+        expected = random.random()
+        random.seed(0)
+        first = get_image_paths_by_keywords(mock_imagenet, num_images=5, seed=123)
+        assert random.random() == expected
+        assert get_image_paths_by_keywords(mock_imagenet, num_images=5, seed=123) == first
+
+    def test_stream_seeded(self, mock_imagenet):
+        session = ImageNetSession(mock_imagenet)
+        first = session.query(preset=None, num_images=5, stream=True, seed=4)
+        assert session.query(preset=None, num_images=5, stream=True, seed=4) == first
+
+    def test_seed_and_rng_rejected(self, mock_imagenet):
+        with pytest.raises(ValueError, match="seed or rng"):
+            get_image_paths_by_keywords(mock_imagenet, seed=1, rng=random.Random(1))
+
+
+class TestSeededBatch:
+    """Seeded batches give the same result whatever the thread count or query order."""
+
+    QUERIES = {
+        "birds": {"preset": "birds", "num_images": 4},
+        "all": {"preset": None, "num_images": 7, "source": "val"},
+        "strat": {"preset": None, "strategy": "stratified", "per_class": 2},
+    }
+
+    def test_independent_of_workers_and_order(self, mock_imagenet):
+        serial = get_image_paths_batch(mock_imagenet, self.QUERIES, seed=3)
+        threaded = get_image_paths_batch(mock_imagenet, self.QUERIES, max_workers=3, seed=3)
+        reordered = get_image_paths_batch(mock_imagenet, dict(reversed(list(self.QUERIES.items()))), seed=3)
+        assert serial == threaded == reordered
+
+    def test_per_query_seed_matches_single_query(self, mock_imagenet):
+        results = get_image_paths_batch(mock_imagenet, {"q": {"preset": None, "num_images": 6, "seed": 8}},
+                                        max_workers=2)
+        assert results["q"] == get_image_paths_by_keywords(mock_imagenet, num_images=6, seed=8)
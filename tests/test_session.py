@@ -0,0 +1,147 @@
+"""Tests for ImageNetSession and the shared session behind get_image_paths_by_keywords()."""
+import os
+import random
+
+import pytest
+
+from parseimagenet import ImageNetSession, get_image_paths_by_keywords
+from parseimagenet import session as session_module
+from parseimagenet.ParseImageNetSubset import get_session
+
+
+@pytest.fixture
+def load_calls(monkeypatch):
+    """Count calls to load_index made by sessions."""
+    calls = []
+    original = session_module.load_index
+
+    def _counting(*args, **kwargs):
+        calls.append(args[1])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(session_module, "load_index", _counting)
+    return calls
+
+
+class TestLazyLoading:
+    """Nothing is read until it is needed."""
+
+    def test_constructor_reads_nothing(self, tmp_path):
+        session = ImageNetSession(tmp_path / "does-not-exist")
+        assert repr(session).startswith("ImageNetSession(")
+
+    def test_synset_mapping_loaded_on_access(self, mock_imagenet):
+        session = ImageNetSession(mock_imagenet)
+        assert len(session.synset_mapping) == 5
+
+    def test_paths_resolved_per_split(self, mock_imagenet):
+        session = ImageNetSession(mock_imagenet)
+        annotations_file, data_path = session.paths("val")
+        assert annotations_file.name == "val.txt"
+        assert data_path.name == "val"
+
+
+class TestReuse:
+    """Repeated queries reuse the parsed state."""
+
+    def test_index_loaded_once_across_queries(self, mock_imagenet, load_calls):
+        session = ImageNetSession(mock_imagenet)
+        for _ in range(5):
+            session.query(num_images=3)
+        assert load_calls == ["train"]
+
+    def test_splits_cached_independently(self, mock_imagenet, load_calls):
+        session = ImageNetSession(mock_imagenet)
+        session.query(num_images=3)
+        session.query(num_images=3, source="val")
+        session.query(num_images=3)
+        session.query(num_images=3, source="val")
+        assert load_calls == ["train", "val"]
+
+    def test_keyword_query_uses_cached_full_index(self, mock_imagenet, load_calls):
+        session = ImageNetSession(mock_imagenet)
+        session.query(num_images=3)
+        paths = session.query(preset="dogs", num_images=100)
+        assert len(paths) == 5
+        assert load_calls == ["train"]
+
+    def test_partial_index_reused_across_queries(self, mock_imagenet, load_calls):
+        session = ImageNetSession(mock_imagenet, use_cache=False)
+        for source in ["val", "val", "train", "val", "train"]:
+            assert len(session.query(keywords=["green mamba"], num_images=100, source=source)) == 5
+        assert load_calls == ["val", "train"]
+        assert len(session.query(keywords=["golden retriever"], num_images=100, source="val")) == 5
+        assert load_calls == ["val", "train", "val"]
+
+    def test_full_index_replaces_partial_ones(self, mock_imagenet):
+        session = ImageNetSession(mock_imagenet, use_cache=False)
+        session.query(keywords=["green mamba"], num_images=1)
+        session.query(num_images=1)
+        assert list(session._cache.keys()) == [("index", "train")]
+
+    def test_query_matches_function(self, mock_imagenet):
+        session = ImageNetSession(mock_imagenet)
+        random.seed(7)
+        from_session = session.query(preset="birds", num_images=4)
+        random.seed(7)
+        from_function = get_image_paths_by_keywords(mock_imagenet, preset="birds", num_images=4)
+        assert from_session == from_function
+
+    def test_token_index_reused_across_queries(self, mock_imagenet):
+        session = ImageNetSession(mock_imagenet)
+        session.query(preset="dogs", num_images=3)
+        token_index = session.token_index
+        session.query(preset="birds", num_images=3)
+        assert session.token_index is token_index
+        assert len(token_index) == len(session.synset_mapping)
+
+    def test_reloads_when_source_changes(self, mock_imagenet):
+        session = ImageNetSession(mock_imagenet)
+        assert session.category_index("train").total == 25
+        train_cls = mock_imagenet / "ILSVRC" / "ImageSets" / "CLS-LOC" / "train_cls.txt"
+        with open(train_cls, "a") as f:
+            f.write("n02099601/n02099601_9999 99\n")
+        os.utime(train_cls, ns=(0, train_cls.stat().st_mtime_ns + 10 ** 9))
+        assert session.category_index("train").total == 26
+
+
+class TestMemoryCap:
+    """Split caches are evicted least-recently-used beyond max_cache_bytes."""
+
+    def test_lru_eviction(self, mock_imagenet, load_calls):
+        train_bytes = ImageNetSession(mock_imagenet).category_index("train").nbytes
+        load_calls.clear()
+        session = ImageNetSession(mock_imagenet, max_cache_bytes=train_bytes)
+        session.category_index("train")
+        session.category_index("val")  # evicts train
+        session.category_index("val")
+        session.category_index("train")  # reloaded
+        assert load_calls == ["train", "val", "train"]
+
+    def test_unbounded_by_default(self, mock_imagenet, load_calls):
+        session = ImageNetSession(mock_imagenet)
+        for source in ["train", "val", "train", "val"]:
+            session.category_index(source)
+        assert load_calls == ["train", "val"]
+
+    def test_clear_drops_state(self, mock_imagenet, load_calls):
+        session = ImageNetSession(mock_imagenet)
+        session.category_index("train")
+        session.clear()
+        session.category_index("train")
+        assert load_calls == ["train", "train"]
+
+
+class TestSharedSessions:
+    """get_image_paths_by_keywords() is a thin wrapper over a per-dataset session."""
+
+    def test_same_base_path_shares_session(self, mock_imagenet):
+        assert get_session(mock_imagenet) is get_session(str(mock_imagenet))
+
+    def test_options_get_separate_sessions(self, mock_imagenet):
+        assert get_session(mock_imagenet) is not get_session(mock_imagenet, use_cache=False)
+
+    def test_function_reuses_parsed_state(self, mock_imagenet, load_calls):
+        for _ in range(3):
+            get_image_paths_by_keywords(mock_imagenet, num_images=2)
+        assert load_calls == ["train"]
@@ -0,0 +1,82 @@
+"""Tests for the Feistel permutation and rank/world_size sharding."""
+from collections import Counter
+
+import pytest
+
+from parseimagenet import get_image_paths_by_keywords
+from parseimagenet.helpers.permutation import FeistelPermutation
+from parseimagenet.helpers.sampling import sample_shard
+
+
+GROUPS = {f"n{c:03d}": [f"n{c:03d}/n{c:03d}_{i}" for i in range(37)] for c in range(9)}
+
+
+class TestFeistelPermutation:
+    """The permutation is a seeded bijection of range(n)."""
+
+    @pytest.mark.parametrize("n", [0, 1, 2, 3, 7, 64, 100, 1023, 1025, 5000])
+    def test_bijection(self, n):
+        assert sorted(FeistelPermutation(n, 11)) == list(range(n))
+
+    def test_seeded(self):
+        assert list(FeistelPermutation(500, "a")) == list(FeistelPermutation(500, "a"))
+        assert list(FeistelPermutation(500, "a")) != list(FeistelPermutation(500, "b"))
+
+    def test_indexing(self):
+        permutation = FeistelPermutation(50, 3)
+        full = list(permutation)
+        assert permutation[-1] == full[-1]
+        assert permutation[5:40:7] == full[5:40:7]
+        with pytest.raises(IndexError):
+            permutation[50]
+
+    def test_positions_spread(self):
+        counts = Counter()
+        for seed in range(400):
+            counts[FeistelPermutation(10, seed)[0]] += 1
+        assert len(counts) == 10 and max(counts.values()) < 80
+
+
+class TestSampleShard:
+    """Shards are disjoint, equally sized pieces of one global sample."""
+
+    @pytest.mark.parametrize("world_size", [1, 2, 3, 8])
+    def test_shards_partition_global_sample(self, world_size):
+        wnids = list(GROUPS)
+        shards = [sample_shard(GROUPS, wnids, 100, rank, world_size, key=5)[0] for rank in range(world_size)]
+        assert len({len(shard) for shard in shards}) == 1
+        assert len(shards[0]) == 100 // world_size
+        stems = [stem for shard in shards for stem in shard]
+        assert len(set(stems)) == len(stems)
+        full, total = sample_shard(GROUPS, wnids, 100, 0, 1, key=5)
+        assert total == 333
+        assert set(stems) <= set(full)
+
+    def test_pool_smaller_than_sample(self):
+        shards = [sample_shard(GROUPS, ["n000"], 1000, rank, 4, key=1)[0] for rank in range(4)]
+        assert [len(shard) for shard in shards] == [9] * 4
+
+
+class TestShardedQueries:
+    """rank/world_size through the query API."""
+
+    @pytest.mark.parametrize("kwargs", [{}, {"stream": True}, {"strategy": "stratified", "per_class": 4}])
+    def test_disjoint_equal_shards(self, mock_imagenet, kwargs):
+        shards = [get_image_paths_by_keywords(mock_imagenet, num_images=20, seed=9, rank=rank, world_size=3,
+                                              **kwargs)
+                  for rank in range(3)]
+        assert [len(shard) for shard in shards] == [6] * 3
+        paths = [path for shard in shards for path in shard]
+        assert len(set(paths)) == len(paths)
+
+    def test_requires_seed(self, mock_imagenet):
+        with pytest.raises(ValueError, match="seed"):
+            get_image_paths_by_keywords(mock_imagenet, rank=0, world_size=2)
+
+    def test_invalid_rank(self, mock_imagenet):
+        with pytest.raises(ValueError, match="together"):
+            get_image_paths_by_keywords(mock_imagenet, rank=0, seed=1)
+        with pytest.raises(ValueError, match="range"):
+            get_image_paths_by_keywords(mock_imagenet, rank=2, world_size=2, seed=1)
+        with pytest.raises(TypeError):
+            get_image_paths_by_keywords(mock_imagenet, rank="0", world_size=2, seed=1)
@@ -0,0 +1,87 @@
+"""Tests for Selection and disjoint split generation."""
+import random
+from collections import Counter
+
+import pytest
+
+from parseimagenet import ImageNetSession, Selection, get_image_paths_by_keywords, get_selection
+from parseimagenet.helpers.splits import split_ids
+
+
+class TestSplitIds:
+    """split_ids() returns disjoint parts of exact size."""
+
+    @pytest.mark.parametrize("stratified", [False, True])
+    @pytest.mark.parametrize("weights", [[0.8, 0.1, 0.1], [1, 1, 1, 1, 1], [0.5, 0.2, 0.3], [3, 1]])
+    def test_disjoint_and_covering(self, weights, stratified):
+        counts = [7, 0, 130, 1, 62]
+        parts = split_ids(counts, weights, random.Random(4), stratified)
+        ids = [i for part in parts for i in part]
+        assert sorted(ids) == list(range(sum(counts)))
+        assert all(list(part) == sorted(part) for part in parts)
+
+    def test_exact_sizes(self):
+        parts = split_ids([1000], [0.7, 0.2, 0.1], random.Random(0))
+        assert [len(part) for part in parts] == [700, 200, 100]
+
+    def test_stratified_sizes_per_class(self):
+        counts = [10, 20, 30]
+        parts = split_ids(counts, [0.5, 0.5], random.Random(0), stratified=True)
+        for part in parts:
+            per_class = Counter(0 if i < 10 else 1 if i < 30 else 2 for i in part)
+            assert per_class == {0: 5, 1: 10, 2: 15}
+
+    def test_stratified_rounding_spread(self):
+        parts = split_ids([6] * 48, [1] * 4, random.Random(0), stratified=True)
+        assert [len(part) for part in parts] == [72] * 4  # not 96, 96, 48, 48
+
+    def test_seeded_and_uniform(self):
+        assert split_ids([50], [0.5, 0.5], random.Random(3)) == split_ids([50], [0.5, 0.5], random.Random(3))
+        hits = Counter()
+        rng = random.Random(1)
+        for _ in range(2000):
+            hits.update(split_ids([10], [0.2, 0.8], rng)[0])
+        assert len(hits) == 10
+        assert min(hits.values()) > 320 and max(hits.values()) < 480
+
+    def test_empty(self):
+        assert [len(part) for part in split_ids([0, 0], [0.5, 0.5])] == [0, 0]
+
+
+class TestSelection:
+    """Selections map ids to stems and paths and split the matching pool."""
+
+    def test_len_and_paths(self, mock_imagenet):
+        selection = get_selection(mock_imagenet, preset="birds")
+        assert isinstance(selection, Selection)
+        assert len(selection) == 10
+        paths = selection.paths(range(len(selection)))
+        assert sorted(paths) == sorted(get_image_paths_by_keywords(mock_imagenet, preset="birds"))
+
+    def test_split_disjoint(self, mock_imagenet):
+        selection = ImageNetSession(mock_imagenet).select()
+        train, val, test = selection.split((0.6, 0.2, 0.2), seed=0)
+        assert (len(train), len(val), len(test)) == (15, 5, 5)
+        paths = [set(selection.paths(part)) for part in (train, val, test)]
+        assert not paths[0] & paths[1] and not paths[0] & paths[2] and not paths[1] & paths[2]
+
+    def test_split_leaves_remainder(self, mock_imagenet):
+        held_out, = get_selection(mock_imagenet).split((0.2,), seed=1)
+        assert len(held_out) == 5
+
+    def test_stratified_kfold(self, mock_imagenet):
+        selection = get_selection(mock_imagenet, source="val")
+        folds = selection.kfold(5, seed=2, stratified=True)
+        assert selection.counts == [5] * 5
+        for fold in folds:
+            assert Counter(i // 5 for i in fold) == {c: 1 for c in range(5)}  # one image of every class
+        assert sorted(i for fold in folds for i in fold) == list(range(25))
+
+    def test_invalid_arguments(self, mock_imagenet):
+        selection = get_selection(mock_imagenet)
+        with pytest.raises(ValueError, match="sum to at most 1"):
+            selection.split((0.8, 0.3))
+        with pytest.raises(ValueError, match="positive"):
+            selection.split((0.8, 0))
+        with pytest.raises(ValueError, match="at least 2"):
+            selection.kfold(1)
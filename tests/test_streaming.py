@@ -0,0 +1,72 @@
+"""Tests for the streaming reservoir-sampling mode."""
+import random
+from collections import Counter
+
+import pytest
+
+from parseimagenet import ImageNetSession, get_image_paths_by_keywords
+from parseimagenet import session as session_module
+from parseimagenet.helpers.annotations import iter_annotations
+from parseimagenet.helpers.sampling import reservoir_sample
+
+
+class TestReservoirSample:
+    """Algorithm L draws uniform samples in O(k) memory."""
+
+    @pytest.mark.parametrize("n, k", [(0, 5), (3, 5), (5, 5), (100, 1), (1000, 37), (50, 0)])
+    def test_size_and_count(self, n, k):
+        sample, count = reservoir_sample(iter(range(n)), k)
+        assert count == n
+        assert len(sample) == min(n, k)
+        assert len(set(sample)) == len(sample)
+        assert set(sample) <= set(range(n))
+
+    def test_uniform_inclusion(self):
+        random.seed(1)
+        hits = Counter()
+        trials = 4000
+        for _ in range(trials):
+            sample, _ = reservoir_sample(range(40), 5)
+            hits.update(sample)
+        expected = trials * 5 / 40
+        assert all(abs(hits[i] - expected) < 0.2 * expected for i in range(40))
+
+    def test_uniform_order(self):
+        random.seed(2)
+        first = Counter(reservoir_sample(range(4), 4)[0][0] for _ in range(4000))
+        assert all(800 < first[i] < 1200 for i in range(4))
+
+
+class TestIterAnnotations:
+    """Annotation streams match the indexed parse."""
+
+    @pytest.mark.parametrize("source", ["train", "val"])
+    def test_same_stems_as_index(self, mock_imagenet, source):
+        session = ImageNetSession(mock_imagenet)
+        annotations_file, _ = session.paths(source)
+        index = session.category_index(source)
+        wnids = ["n02099601", "n01530575"]
+        streamed = list(iter_annotations(annotations_file, mock_imagenet, source, wnids))
+        assert sorted(streamed) == sorted(stem for wnid in wnids for stem in index[wnid])
+        assert len(list(iter_annotations(annotations_file, mock_imagenet, source))) == index.total
+
+
+class TestStreamQuery:
+    """stream=True samples without building the index."""
+
+    def test_no_index_built(self, mock_imagenet, monkeypatch):
+        monkeypatch.setattr(session_module, "load_index", lambda *args, **kwargs: pytest.fail("index loaded"))
+        paths = get_image_paths_by_keywords(mock_imagenet, preset="birds", num_images=3, stream=True)
+        assert len(paths) == 3
+        assert {path.parent.name for path in paths} <= {"n01530575", "n01531178"}
+
+    @pytest.mark.parametrize("source", ["train", "val"])
+    def test_same_population_as_indexed(self, mock_imagenet, source):
+        streamed = get_image_paths_by_keywords(mock_imagenet, preset=None, num_images=100, source=source,
+                                               stream=True)
+        indexed = get_image_paths_by_keywords(mock_imagenet, preset=None, num_images=100, source=source)
+        assert sorted(streamed) == sorted(indexed)
+
+    def test_rejects_stratified(self, mock_imagenet):
+        with pytest.raises(ValueError, match="stream"):
+            get_image_paths_by_keywords(mock_imagenet, stream=True, strategy="stratified")
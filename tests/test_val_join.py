@@ -0,0 +1,126 @@
+"""Tests for the streaming val.txt / LOC_val_solution.csv join."""
+import random
+
+import pytest
+
+from parseimagenet.helpers import annotations
+from parseimagenet.helpers.annotations import iter_annotations, parse_val_annotations
+
+
+WNIDS = ["n01", "n02", "n03"]
+
+
+def _write_val(base, ids, labels, shuffle_csv=False, shuffle_val=False, seed=0):
+    rows = [f"{image_id},{labels[image_id]} 1 2 3 4 {labels[image_id]} 5 6 7 8" for image_id in ids]
+    val_ids = list(ids)
+    rng = random.Random(seed)
+    if shuffle_csv:
+        rng.shuffle(rows)
+    if shuffle_val:
+        rng.shuffle(val_ids)
+    (base / "LOC_val_solution.csv").write_text("ImageId,PredictionString\n" + "\n".join(rows) + "\n")
+    val_txt = base / "val.txt"
+    val_txt.write_text("\n".join(f"{image_id} {i}" for i, image_id in enumerate(val_ids, 1)) + "\n")
+    return val_txt
+
+
+def _expected(val_ids, labels, wanted=None):
+    grouped = {}
+    for image_id in val_ids:
+        wnid = labels.get(image_id)
+        if wnid is not None and (wanted is None or wnid in wanted):
+            grouped.setdefault(wnid, []).append(image_id)
+    return grouped
+
+
+@pytest.fixture
+def val_ids():
+    return [f"ILSVRC2012_val_{i:08d}" for i in range(1, 61)]
+
+
+@pytest.fixture
+def labels(val_ids):
+    rng = random.Random(1)
+    return {image_id: rng.choice(WNIDS) for image_id in val_ids}
+
+
+class TestJoinResults:
+    """Merge and hash joins produce the same grouping as a plain dict join."""
+
+    @pytest.mark.parametrize("shuffle_csv,shuffle_val", [
+        (False, False), (True, False), (False, True), (True, True),
+    ])
+    def test_grouping_matches_dict_join(self, tmp_path, val_ids, labels, shuffle_csv, shuffle_val):
+        val_txt = _write_val(tmp_path, val_ids, labels, shuffle_csv, shuffle_val)
+        order = [line.split()[0] for line in val_txt.read_text().splitlines()]
+        index = parse_val_annotations(val_txt, tmp_path)
+        assert {wnid: list(stems) for wnid, stems in index.items()} == _expected(order, labels)
+        assert list(index) == list(_expected(order, labels))
+
+    @pytest.mark.parametrize("shuffle_csv", [False, True])
+    def test_wnid_filter(self, tmp_path, val_ids, labels, shuffle_csv):
+        val_txt = _write_val(tmp_path, val_ids, labels, shuffle_csv)
+        index = parse_val_annotations(val_txt, tmp_path, wnids=["n02"])
+        assert list(index) == ["n02"]
+        assert list(index["n02"]) == _expected(val_ids, labels)["n02"]
+
+    def test_unlabelled_rows_skipped(self, tmp_path, val_ids, labels):
+        val_txt = _write_val(tmp_path, val_ids, labels)
+        (tmp_path / "LOC_val_solution.csv").write_text(
+            "ImageId,PredictionString\nILSVRC2012_val_00000001,\nILSVRC2012_val_00000002,n03 0 0 1 1\n"
+        )
+        index = parse_val_annotations(val_txt, tmp_path)
+        assert {wnid: list(stems) for wnid, stems in index.items()} == {"n03": ["ILSVRC2012_val_00000002"]}
+
+    def test_val_ids_missing_from_csv(self, tmp_path, val_ids, labels):
+        partial = {image_id: labels[image_id] for image_id in val_ids[::2]}
+        val_txt = _write_val(tmp_path, val_ids[::2], partial)
+        val_txt.write_text("\n".join(val_ids) + "\n")
+        index = parse_val_annotations(val_txt, tmp_path)
+        assert index.total == len(partial)
+
+
+class TestStreamedJoin:
+    """iter_annotations() yields the joined val IDs in val.txt order."""
+
+    @pytest.mark.parametrize("shuffle_csv,shuffle_val", [
+        (False, False), (True, False), (False, True), (True, True),
+    ])
+    def test_matches_parse(self, tmp_path, val_ids, labels, shuffle_csv, shuffle_val):
+        val_txt = _write_val(tmp_path, val_ids, labels, shuffle_csv, shuffle_val)
+        order = [line.split()[0] for line in val_txt.read_text().splitlines()]
+        streamed = list(iter_annotations(val_txt, tmp_path, "val", wnids=["n01", "n03"]))
+        assert streamed == [image_id for image_id in order if labels[image_id] in ("n01", "n03")]
+
+    def test_sorted_inputs_stream_without_hash(self, tmp_path, val_ids, labels, monkeypatch):
+        val_txt = _write_val(tmp_path, val_ids, labels)
+        monkeypatch.setattr(annotations, "_hash_join_val", pytest.fail)
+        assert len(list(iter_annotations(val_txt, tmp_path, "val"))) == len(val_ids)
+
+    def test_val_txt_unordered_part_way(self, tmp_path, val_ids, labels):
+        val_txt = _write_val(tmp_path, val_ids, labels)
+        order = val_ids[:30] + val_ids[45:] + val_ids[30:45]
+        val_txt.write_text("\n".join(order) + "\n")
+        assert list(iter_annotations(val_txt, tmp_path, "val")) == order
+
+
+class TestJoinStrategy:
+    """Ordered inputs never fall back to the hash join."""
+
+    def test_sorted_inputs_use_merge_join(self, tmp_path, val_ids, labels, monkeypatch):
+        val_txt = _write_val(tmp_path, val_ids, labels)
+
+        def _fail(*args):
+            raise AssertionError("hash join should not run for sorted inputs")
+
+        monkeypatch.setattr(annotations, "_hash_join_val", _fail)
+        assert parse_val_annotations(val_txt, tmp_path).total == len(val_ids)
+
+    def test_out_of_order_tail_is_detected(self, tmp_path, val_ids, labels):
+        """A CSV row past the last val.txt ID that belongs earlier must still be joined."""
+        val_txt = _write_val(tmp_path, val_ids, labels)
+        rows = (tmp_path / "LOC_val_solution.csv").read_text().splitlines()
+        rows.append(rows.pop(5))
+        (tmp_path / "LOC_val_solution.csv").write_text("\n".join(rows) + "\n")
+        val_txt.write_text("\n".join(val_ids[:10]) + "\n")
+        assert parse_val_annotations(val_txt, tmp_path).total == 10
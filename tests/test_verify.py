@@ -0,0 +1,100 @@
+"""Tests for existence verification of selected files."""
+import random
+from collections import Counter
+
+import pytest
+
+from parseimagenet import ImageNetSession, get_image_paths_by_keywords
+from parseimagenet.helpers.sampling import count_existing, sample_excluding, verify_paths
+
+
+@pytest.fixture
+def files(tmp_path):
+    """Twenty files in one directory, three in another and some missing paths."""
+    (tmp_path / "big").mkdir()
+    (tmp_path / "small").mkdir()
+    paths = []
+    for i in range(20):
+        (tmp_path / "big" / f"{i}.JPEG").write_bytes(b"")
+        paths.append(tmp_path / "big" / f"{i}.JPEG")
+    for i in range(3):
+        (tmp_path / "small" / f"{i}.JPEG").write_bytes(b"")
+        paths.append(tmp_path / "small" / f"{i}.JPEG")
+    missing = [tmp_path / "big" / "gone.JPEG", tmp_path / "small" / "gone.JPEG", tmp_path / "nodir" / "x.JPEG"]
+    return paths, missing
+
+
+class TestVerifyPaths:
+    """verify_paths() agrees with Path.exists()."""
+
+    @pytest.mark.parametrize("max_workers", [None, 4])
+    @pytest.mark.parametrize("scan_threshold", [1, 16, 1000])
+    def test_counts_and_missing_in_order(self, files, max_workers, scan_threshold):
+        paths, missing = files
+        mixed = [missing[0]] + paths[:10] + [missing[2]] + paths[10:] + [missing[1]]
+        existing, reported = verify_paths(mixed, max_workers, scan_threshold)
+        assert existing == len(paths)
+        assert reported == [missing[0], missing[2], missing[1]]
+
+    def test_empty(self):
+        assert verify_paths([]) == (0, [])
+
+    def test_count_existing(self, files):
+        paths, missing = files
+        assert count_existing(paths + missing, max_workers=2) == len(paths)
+
+
+class TestSampleExcluding:
+    """sample_excluding() draws distinct free values from a range."""
+
+    @pytest.mark.parametrize("excluded", [set(), set(range(10, 20)), set(range(0, 100, 2)), set(range(1, 100))])
+    def test_free_and_distinct(self, excluded):
+        rng = random.Random(3)
+        for k in (1, 5, 40, 200):
+            drawn = sample_excluding(10, 110, k, excluded, rng)
+            free = 100 - len(excluded & set(range(10, 110)))
+            assert len(drawn) == len(set(drawn)) == min(k, free)
+            assert all(10 <= value < 110 and value not in excluded for value in drawn)
+
+    def test_known_taken(self):
+        excluded = {0, 1, 500}
+        assert len(sample_excluding(0, 10, 20, excluded, random.Random(0), taken=2)) == 8
+
+
+class TestVerifyQueries:
+    """verify=True drops missing files and draws replacements."""
+
+    @staticmethod
+    def _delete(mock_imagenet, count):
+        deleted = sorted((mock_imagenet / "ILSVRC" / "Data" / "CLS-LOC" / "train").glob("*/*.JPEG"))[:count]
+        for path in deleted:
+            path.unlink()
+        return set(deleted)
+
+    def test_missing_replaced(self, mock_imagenet):
+        deleted = self._delete(mock_imagenet, 3)
+        for seed in range(5):
+            paths = get_image_paths_by_keywords(mock_imagenet, num_images=20, verify=True, seed=seed)
+            assert len(paths) == len(set(paths)) == 20
+            assert not deleted & set(paths)
+
+    def test_pool_exhausted(self, mock_imagenet):
+        deleted = self._delete(mock_imagenet, 4)
+        paths = get_image_paths_by_keywords(mock_imagenet, num_images=100, verify=True)
+        assert len(paths) == 25 - len(deleted)
+
+    def test_stratified_replaced_within_class(self, mock_imagenet):
+        self._delete(mock_imagenet, 2)  # both from the first class
+        paths = get_image_paths_by_keywords(mock_imagenet, strategy="stratified", per_class=3, verify=True, seed=1)
+        counts = Counter(path.parent.name for path in paths)
+        assert sorted(counts.values()) == [3] * 5
+
+    def test_stream_drops(self, mock_imagenet):
+        deleted = self._delete(mock_imagenet, 5)
+        paths = ImageNetSession(mock_imagenet).query(preset=None, num_images=100, stream=True, verify=True)
+        assert len(paths) == 20 and not deleted & set(paths)
+
+    def test_without_verify_unchanged(self, mock_imagenet):
+        self._delete(mock_imagenet, 3)
+        paths = get_image_paths_by_keywords(mock_imagenet, num_images=100, seed=0)
+        assert len(paths) == 25
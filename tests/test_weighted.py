@@ -0,0 +1,105 @@
+"""Tests for the alias table and class-weighted sampling."""
+import random
+from collections import Counter
+
+import pytest
+
+from parseimagenet import get_image_paths_by_keywords
+from parseimagenet.ParseImageNetSubset import parse_class_weights
+from parseimagenet.helpers.alias import AliasTable
+from parseimagenet.helpers.category_index import CategoryIndex
+from parseimagenet.helpers.sampling import sample_weighted
+
+
+GROUPS = {"a": [f"a/{i}" for i in range(4)], "b": [f"b/{i}" for i in range(200)], "c": []}
+
+
+def _index():
+    return CategoryIndex.from_pairs((wnid, stem) for wnid, stems in GROUPS.items() for stem in stems)
+
+
+class TestAliasTable:
+    """Draws follow the weights."""
+
+    def test_frequencies(self):
+        table = AliasTable([1, 2, 0, 7])
+        counts = Counter(table.sample(50000, random.Random(0)))
+        assert 2 not in counts
+        for outcome, weight in [(0, 0.1), (1, 0.2), (3, 0.7)]:
+            assert abs(counts[outcome] / 50000 - weight) < 0.01
+
+    def test_single_outcome(self):
+        assert set(AliasTable([5]).sample(10)) == {0}
+
+    def test_invalid_weights(self):
+        with pytest.raises(ValueError):
+            AliasTable([0, 0])
+        with pytest.raises(ValueError):
+            AliasTable([1, -1])
+
+
+class TestSampleWeighted:
+    """Class weights set class probabilities, with or without replacement."""
+
+    @pytest.mark.parametrize("container", [dict, CategoryIndex])
+    def test_with_replacement_frequencies(self, container):
+        category_images = GROUPS if container is dict else _index()
+        stems, total = sample_weighted(category_images, ["a", "b"], 20000, {"a": 3}, replacement=True,
+                                       rng=random.Random(1))
+        assert total == 204 and len(stems) == 20000
+        share = sum(stem.startswith("a/") for stem in stems) / len(stems)
+        assert abs(share - 0.75) < 0.02
+        assert set(stems) >= set(GROUPS["a"])
+
+    @pytest.mark.parametrize("container", [dict, CategoryIndex])
+    def test_without_replacement_exhausts_classes(self, container):
+        category_images, wnids = (GROUPS, ["a", "b", "c"]) if container is dict else (_index(), ["a", "b"])
+        stems, _ = sample_weighted(category_images, wnids, 50, lambda wnid, count: 100.0,
+                                   rng=random.Random(2))
+        assert len(stems) == len(set(stems)) == 50
+        assert set(GROUPS["a"]) <= set(stems)
+
+    def test_without_replacement_all(self):
+        stems, _ = sample_weighted(_index(), ["a", "b"], 1000, {"a": 1, "b": 1})
+        assert sorted(stems) == sorted(GROUPS["a"] + GROUPS["b"])
+
+    def test_zero_weight_classes_skipped(self):
+        stems, total = sample_weighted(GROUPS, ["a", "b"], 100, {"b": 0})
+        assert total == 204 and sorted(stems) == GROUPS["a"]
+        assert sample_weighted(GROUPS, ["a", "b"], 5, {"a": 0, "b": 0}) == ([], 204)
+
+    @pytest.mark.parametrize("weight, share", [(lambda wnid, count: 1.0, 0.5), (lambda wnid, count: count, 0.02)])
+    def test_callable_weights(self, weight, share):
+        stems, _ = sample_weighted(GROUPS, ["a", "b"], 10000, weight, replacement=True, rng=random.Random(3))
+        assert abs(sum(stem.startswith("a/") for stem in stems) / 10000 - share) < 0.02
+
+    def test_negative_weight(self):
+        with pytest.raises(ValueError, match="non-negative"):
+            sample_weighted(GROUPS, ["a", "b"], 5, {"a": -1})
+
+
+class TestWeightedQueries:
+    """class_weights through the query API."""
+
+    def test_oversample_class(self, mock_imagenet):
+        paths = get_image_paths_by_keywords(mock_imagenet, preset=None, num_images=500, seed=0,
+                                            class_weights={"n01530575": 20}, replacement=True)
+        counts = Counter(path.parent.name for path in paths)
+        assert len(paths) == 500
+        assert counts["n01530575"] > 350
+
+    def test_without_replacement_unique(self, mock_imagenet):
+        paths = get_image_paths_by_keywords(mock_imagenet, num_images=12, class_weights={"n01530575": 50}, seed=1)
+        assert len(set(paths)) == 12
+        assert sum(path.parent.name == "n01530575" for path in paths) == 5
+
+    def test_invalid_combinations(self, mock_imagenet):
+        with pytest.raises(ValueError, match="requires class_weights"):
+            get_image_paths_by_keywords(mock_imagenet, replacement=True)
+        with pytest.raises(ValueError, match="stratified"):
+            get_image_paths_by_keywords(mock_imagenet, class_weights={}, strategy="stratified")
+        with pytest.raises(TypeError):
+            get_image_paths_by_keywords(mock_imagenet, class_weights=[1, 2])
+
+    def test_parse_cli_weights(self):
+        assert parse_class_weights("n001=2, n002=0.5") == {"n001": 2.0, "n002": 0.5}